@@ -1,7 +1,9 @@
 from structure_and_landscapes.run_management import run
 from structure_and_landscapes.run_management import persistence
+from structure_and_landscapes.run_management import run_store
 from scipy import stats
 import itertools
+import os
 
 """
 write tests...
@@ -11,7 +13,16 @@ go through all runs just once and pull out data!
 
 def filter_runs(runs, parameters_dictionary):
     """
+    runs is an iterable of runs or the path of a shelf (or run store)
+    of them. The runs of a shelf are picked from its index and loaded as
+    iterated.
     """
+    if isinstance(runs, basestring):
+        if os.path.isdir(runs):
+            return run_store.values(runs, parameters_dictionary)
+        return persistence.values(
+            runs, persistence.matching_keys(runs, parameters_dictionary))
+
     def same_parameters(run):
         same_values = [run.parameters.get(key) == value
                        for key, value in parameters_dictionary.items()]
@@ -45,9 +56,7 @@ def max_fitness_for_each_run(run_list):
 
 if __name__ == "__main__":
     shelf_path = '/vagrant/saved_runs.dat'
-    runs = persistence.values(shelf_path)
-
-    filtered_runs = filter_runs(runs, {'Organism Type': 'NK Model'})
+    filtered_runs = filter_runs(shelf_path, {'Organism Type': 'NK Model'})
     #runs1, runs2 = itertools.tee(filtered_runs, 2)
     #print mean_fitness_for_each_run(runs1)
     #print max_fitness_for_each_run(runs2)
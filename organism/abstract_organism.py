@@ -2,32 +2,102 @@
 Generic organism class for inheritance.
 
 Immutable class. Hashable. Equalible. Printable.
+
+Organisms are slotted (no instance __dict__); subclasses declare the
+__slots__ they add. Ids are integers counted up from the start of a run.
 """
-import uuid
+import itertools
 from abc import ABCMeta, abstractmethod
+from collections import OrderedDict
 from ..utility import mixins
 
 
+_organism_ids = itertools.count(1)
+
+
+def reset_organism_ids(start=1, step=1):
+    """
+    Restarts the counter giving organisms their ids (once per run), at
+    start and counting by step.
+    """
+    global _organism_ids
+    _organism_ids = itertools.count(start, step)
+
+
+def next_organism_id():
+    """
+    Returns the id the next organism would get (taking it from the
+    counter, so reset it to continue from there).
+    """
+    return next(_organism_ids)
+
+
+# Called with every new mutant when set (as by a LineageRecorder)
+_birth_listener = None
+
+
+def set_birth_listener(listener):
+    """
+    Sets the function called with each organism made with a parent_id
+    (None stops the calls).
+    """
+    global _birth_listener
+    _birth_listener = listener
+
+
 class AbstractOrganism(mixins.KeyedHashingMixin):
     __metaclass__ = ABCMeta
+    __slots__ = ("value", "_fitness", "self_id", "parent_id")
+
+    # Opt-in FitnessCache shared by all organisms of a type (one landscape)
+    fitness_cache = None
 
     def __init__(self, value, *args, **kwargs):
         """
         The value argument is the state that is used for evaluating fitness
-        parent_id is a uuid marking the parent (for inheritance tracking)
-        id is the self marker (passed to offspring)
+        parent_id is the id of the parent (for inheritance tracking)
+        self_id is the self marker (passed to offspring), the next id of
+        the run unless given
         """
-        self.value = value
-        self._fitness = None
-        for attr, set_value in kwargs.items():
-            setattr(self, attr, set_value)
-        if not hasattr(self, "parent_id"):
-            self.parent_id = None
         if args:
             raise ValueError(
                 "Organisms can only take the value an unnamed argument")
-        if not hasattr(self, "self_id") or self.self_id is None:
-            self.self_id = uuid.uuid4()
+        self.value = value
+        self._fitness = None
+        self.parent_id = kwargs.pop("parent_id", None)
+        self.self_id = kwargs.pop("self_id", None)
+        if kwargs:
+            raise TypeError("Unexpected organism arguments: {}".format(
+                ", ".join(sorted(kwargs))))
+        if self.self_id is None:
+            self.self_id = next(_organism_ids)
+        if self.parent_id is not None and _birth_listener is not None:
+            _birth_listener(self)
+
+    def __getstate__(self):
+        """
+        Pickles the slots (organisms have no __dict__).
+        """
+        state = {}
+        for cls in type(self).__mro__:
+            for name in cls.__dict__.get("__slots__", ()):
+                if hasattr(self, name):
+                    state[name] = getattr(self, name)
+        return state
+
+    def __setstate__(self, state):
+        """
+        Also accepts the __dict__ of organisms pickled before they were
+        slotted (whose ids are UUIDs, kept as they are).
+        """
+        for name, value in state.items():
+            try:
+                setattr(self, name, value)
+            except AttributeError:
+                pass
+        for name in ("_fitness", "self_id", "parent_id"):
+            if name not in state:
+                setattr(self, name, None)
 
     @abstractmethod
     def _mutated_value(self):  # pragma: no cover
@@ -54,14 +124,38 @@ class AbstractOrganism(mixins.KeyedHashingMixin):
         """
         pass
 
+    @classmethod
+    def _evaluate_fitness_batch(cls, orgs):
+        """
+        Evaluates and caches the fitness of each of orgs (all of this type).
+        Subclasses that can evaluate many organisms at once override this.
+        """
+        for org in orgs:
+            org.fitness
+
+    def _fitness_cache(self):
+        """
+        Returns the FitnessCache for this organism's landscape (or None).
+        """
+        return self.fitness_cache
+
     @property
     def fitness(self):
         """
         fitness is the property that enquiring objects should query
-        It implements a very simple form of caching.
+        It implements a very simple form of caching, consulting the
+        landscape's fitness cache (if any) before evaluating.
         """
         if self._fitness is None:
-            self._fitness = self._evaluate_fitness()
+            cache = self._fitness_cache()
+            if cache is None:
+                self._fitness = self._evaluate_fitness()
+            else:
+                fitness = cache.get(self.value)
+                if fitness is None:
+                    fitness = self._evaluate_fitness()
+                    cache.store(self.value, fitness)
+                self._fitness = fitness
         return self._fitness
 
     def __key__(self):
@@ -82,3 +176,17 @@ class AbstractOrganism(mixins.KeyedHashingMixin):
             self.value,
             self.self_id,
             self.parent_id)
+
+
+def evaluate_fitness_batch(orgs):
+    """
+    Evaluates the fitness of every organism in orgs that hasn't been
+    evaluated yet, a batch per organism type.
+    Objects that aren't organisms are left alone.
+    """
+    unevaluated = OrderedDict()
+    for org in orgs:
+        if isinstance(org, AbstractOrganism) and org._fitness is None:
+            unevaluated.setdefault(type(org), OrderedDict())[id(org)] = org
+    for organism_type, orgs_by_id in unevaluated.items():
+        organism_type._evaluate_fitness_batch(orgs_by_id.values())
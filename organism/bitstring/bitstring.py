@@ -1,9 +1,15 @@
 """
-This module implements a crude Bitstring with boolean values
-in python tuples. Bitstring instances are immutable.
+This module implements a Bitstring packed into a single python integer
+(bit i of the integer is position i of the bitstring) along with its
+length. Bitstring instances are immutable.
+
+Flipping a position is an xor, hamming distance is a popcount and hashing
+or equality is a single comparison of (length, integer).
 """
 from structure_and_landscapes.utility import mixins
+import binascii
 import random
+import numpy
 
 
 class Bitstring(mixins.KeyedComparisonMixin, mixins.KeyedHashingMixin):
@@ -25,15 +31,30 @@ class Bitstring(mixins.KeyedComparisonMixin, mixins.KeyedHashingMixin):
         """
 
         if isinstance(iterable, str):
-            self._value = tuple(char == "1" for char in reversed(iterable))
+            bits = "".join("1" if char == "1" else "0" for char in iterable)
+            self._length = len(bits)
+            self._int = int(bits, 2) if bits else 0
         else:
-            self._value = tuple(bool(value) for value in iterable)
+            values = tuple(bool(value) for value in iterable)
+            self._length = len(values)
+            self._int = _int_from_bools(values)
+
+    @classmethod
+    def from_int(cls, value, length):
+        """
+        Returns a bitstring of the given length whose i'th position is
+        the i'th bit of value (bits beyond length are discarded).
+        """
+        bitstring = cls.__new__(cls)
+        bitstring._length = length
+        bitstring._int = value & ((1 << length) - 1)
+        return bitstring
 
     def __len__(self):
         """
         length of a bitstring is the number of elements
         """
-        return len(self._value)
+        return self._length
 
     def __getitem__(self, key):
         """
@@ -41,38 +62,73 @@ class Bitstring(mixins.KeyedComparisonMixin, mixins.KeyedHashingMixin):
         for example:
             Bitstring("100")[0] = False
             Bitstring("100")[2] = True
+        slices return a tuple of booleans
         """
-        return self._value[key]
+        if isinstance(key, slice):
+            return tuple(self)[key]
+        if key < 0:
+            key += self._length
+        if not 0 <= key < self._length:
+            raise IndexError("Bitstring index out of range")
+        return bool((self._int >> key) & 1)
 
     def __iter__(self):
         """
         Bitstrings are iterable
         """
-        return iter(self._value)
+        value = self._int
+        for _ in range(self._length):
+            yield bool(value & 1)
+            value >>= 1
 
     def __key__(self):
         """
-        Returns a key object that can be compared, hashed and equaled.
+        Returns a key object that can be hashed and equaled.
         """
-        return tuple(self._value)
+        return (self._length, self._int)
+
+    def __lt__(self, other):
+        """
+        Bitstrings are ordered as the tuples of booleans they represent
+        (position 0 first, a shorter prefix before a longer string).
+        """
+        if type(self) != type(other):
+            return super(Bitstring, self).__lt__(other)
+        shared_length = min(self._length, other._length)
+        differences = (self._int ^ other._int) & ((1 << shared_length) - 1)
+        if differences:
+            lowest_difference = differences & -differences
+            return not self._int & lowest_difference
+        return self._length < other._length
+
+    def __setstate__(self, state):
+        """
+        Accepts pickles of the older tuple of booleans representation.
+        """
+        if "_value" in state:
+            values = state.pop("_value")
+            state["_length"] = len(values)
+            state["_int"] = _int_from_bools(values)
+        self.__dict__.update(state)
 
     def __repr__(self):
         """
         Bitstrings can be printed
         """
-        def bool_to_str(boolean):
-            """
-            Helper Function converting a bool to the characters 1 or 0
-            """
-            if boolean:
-                return "1"
-            return "0"
-
-        value_as_string = "".join(bool_to_str(pos) for pos in reversed(self))
+        if not self._length:
+            value_as_string = ""
+        else:
+            value_as_string = format(self._int, "0{}b".format(self._length))
         return "{}({!r})".format(self.__class__.__name__, value_as_string)
 
     def __int__(self):
-        return sum(2 ** i for i, value in enumerate(self) if value)
+        return self._int
+
+    def popcount(self):
+        """
+        Returns the number of True positions.
+        """
+        return bin(self._int).count("1")
 
     def hamming_distance(self, other):
         """
@@ -80,18 +136,19 @@ class Bitstring(mixins.KeyedComparisonMixin, mixins.KeyedHashingMixin):
         note bitstrings must be the same length
         if different lengths only compare to the length of the shorter
         """
-        return len(tuple(None for (self_pos, other_pos) in zip(
-            self, other) if self_pos != other_pos))
+        shared_length = min(len(self), len(other))
+        differences = (int(self) ^ int(other)) & ((1 << shared_length) - 1)
+        return bin(differences).count("1")
 
     def selected_loci_as_int(self, loci):
         """
         Coverts an iterable (loci) into an integer representing the state of
         the bitstring at those positions.
         """
+        value = self._int
         tally = 0
         for i, locus in enumerate(loci):
-            if self[locus]:
-                tally += (2 ** i)
+            tally |= ((value >> locus) & 1) << i
         return tally
 
     def single_step_mutant(self):
@@ -103,22 +160,113 @@ class Bitstring(mixins.KeyedComparisonMixin, mixins.KeyedHashingMixin):
         return flip_position(self, position)
 
 
+def _int_from_bools(values):
+    """
+    Packs an iterable of booleans (position 0 first) into an integer.
+    """
+    tally = 0
+    for i, value in enumerate(values):
+        if value:
+            tally |= 1 << i
+    return tally
+
+
+def as_bit_array(bitstring_instance):
+    """
+    Returns a numpy uint8 array of 0s and 1s, position 0 first.
+    """
+    length = len(bitstring_instance)
+    if not length:
+        return numpy.zeros(0, dtype=numpy.uint8)
+    number_of_bytes = (length + 7) // 8
+    packed = binascii.unhexlify(
+        "{:0{}x}".format(int(bitstring_instance), number_of_bytes * 2))
+    bits = numpy.unpackbits(numpy.frombuffer(packed, dtype=numpy.uint8))
+    return bits[::-1][:length]
+
+
+def as_bit_matrix(bitstrings):
+    """
+    Returns a numpy uint8 matrix with a row of 0s and 1s (position 0 first)
+    for every bitstring. All of the bitstrings must be the same length.
+    """
+    bitstrings = list(bitstrings)
+    length = len(bitstrings[0]) if bitstrings else 0
+    if any(len(bitstring) != length for bitstring in bitstrings):
+        raise ValueError("Bitstrings must all be the same length")
+    if not length:
+        return numpy.zeros((len(bitstrings), 0), dtype=numpy.uint8)
+    number_of_bytes = (length + 7) // 8
+    hex_format = "{{:0{}x}}".format(number_of_bytes * 2)
+    packed = binascii.unhexlify("".join(
+        hex_format.format(int(bitstring)) for bitstring in bitstrings))
+    packed_rows = numpy.frombuffer(packed, dtype=numpy.uint8).reshape(
+        len(bitstrings), number_of_bytes)
+    return numpy.unpackbits(packed_rows, axis=1)[:, ::-1][:, :length]
+
+
+def pack_bit_matrix(bit_matrix):
+    """
+    Packs a matrix of 0s and 1s (as from as_bit_matrix) into bytes along
+    the rows, position 0 being the high bit of the first byte.
+    """
+    return numpy.packbits(numpy.asarray(bit_matrix, dtype=numpy.uint8),
+                          axis=1)
+
+
+def unpack_bit_matrix(packed_matrix, length):
+    """
+    Inverse of pack_bit_matrix for rows of the given length.
+    """
+    return numpy.unpackbits(
+        numpy.asarray(packed_matrix, dtype=numpy.uint8), axis=1)[:, :length]
+
+
+def as_byte_matrix(bitstrings, length):
+    """
+    Returns a numpy uint8 matrix with a row for every bitstring (of the
+    given length), holding its integer in big endian bytes.
+    """
+    bitstrings = list(bitstrings)
+    if any(len(bitstring) != length for bitstring in bitstrings):
+        raise ValueError("Bitstrings must all be the same length")
+    number_of_bytes = (length + 7) // 8
+    if not bitstrings or not number_of_bytes:
+        return numpy.zeros((len(bitstrings), number_of_bytes),
+                           dtype=numpy.uint8)
+    hex_format = "{{:0{}x}}".format(number_of_bytes * 2)
+    packed = binascii.unhexlify("".join(
+        hex_format.format(int(bitstring)) for bitstring in bitstrings))
+    return numpy.frombuffer(packed, dtype=numpy.uint8).reshape(
+        len(bitstrings), number_of_bytes)
+
+
+def from_byte_matrix(byte_matrix, length):
+    """
+    Inverse of as_byte_matrix, returning a list of bitstrings.
+    """
+    return [Bitstring.from_int(int(binascii.hexlify(row.tobytes()) or "0",
+                                   16), length)
+            for row in numpy.asarray(byte_matrix, dtype=numpy.uint8)]
+
+
 def flip_position(bitstring_instance, position_to_flip):
     """
     Function takes a bitstring and an index to
     flip (True --> False), (False-->True)
     returns a new bitstring with the modification
     """
-    values = list(bitstring_instance)
-    values[position_to_flip] = not values[position_to_flip]
-    return Bitstring(values)
+    length = len(bitstring_instance)
+    if not -length <= position_to_flip < length:
+        raise IndexError("Bitstring index out of range")
+    position_to_flip %= length
+    return Bitstring.from_int(
+        int(bitstring_instance) ^ (1 << position_to_flip), length)
 
 
 def random_string(length):
     """
     Returns a random bitstring of the desired length
     """
-    bits = ["1", "0"]
-    sequence = [random.choice(bits) for _ in range(length)]
-    seq = "".join(sequence)
-    return Bitstring(seq)
+    return Bitstring.from_int(random.getrandbits(length) if length else 0,
+                              length)
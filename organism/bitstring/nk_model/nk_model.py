@@ -13,21 +13,32 @@ following with wrapping about ends).
 
 The outcome of each function is drawn from a  uniformly
 distribution. The mean contribution of each locus is the fitness.
+
+Contributions are either drawn lazily as genotypes are visited
+(NKModelSimple) or all drawn up front into a dense table (NKModelDense).
 """
 import collections
 import itertools
 from random import Random
 import random
-from ..bitstring import Bitstring
+import numpy
+from ..bitstring import Bitstring, as_bit_array, unpack_bit_matrix
 
 
 class NKModelFactory(object):
     """
     Returns instances of NK models.
     """
-    def __init__(self, random_generator=None):
+    def __init__(self, random_generator=None, dense_tables=False):
+        """
+        random_generator is used for dependencies and seeding dense tables.
+        If dense_tables is True, models have every contribution drawn
+        up front (NKModelDense) instead of lazily (NKModelSimple).
+        """
         if random_generator is None:
-            self.random_generator = Random()
+            random_generator = Random()
+        self.random_generator = random_generator
+        self.dense_tables = dense_tables
 
     def no_dependencies(self, n):
         """
@@ -158,9 +169,24 @@ class NKModelFactory(object):
         corresponding to the numerical value of the subbitstring
         (locus + k neighbors).
         """
+        if self.dense_tables:
+            return self._model_with_dense_contribution_lookup_table(
+                dependency_lists)
         clt = [{} for dep_list in dependency_lists]
         return NKModelSimple(dependency_lists, clt)
 
+    def _model_with_dense_contribution_lookup_table(self, dependency_lists):
+        """
+        Same as the uniform lookup table, but every entry is drawn now
+        from a generator seeded by this factory's random_generator.
+        """
+        number_of_entries = 2 ** len(dependency_lists[0])
+        seed = self.random_generator.getrandbits(32)
+        table_generator = numpy.random.RandomState(seed)
+        clt = table_generator.random_sample(
+            (len(dependency_lists), number_of_entries))
+        return NKModelDense(dependency_lists, clt)
+
 
 class NKModelSimple(object):
     def __init__(self, dependency_lists,
@@ -170,9 +196,29 @@ class NKModelSimple(object):
         list of loci needed to determine the fitness contribution) and a
         contribution_lookup_tables (for each loci, the fitness
         contribution of each possible genotype string).
+        dependent_loci is the reverse index, for each locus the loci whose
+        contributions depend on it.
+        fitness_cache is an optional FitnessCache for organisms on this
+        landscape (it isn't pickled with the model).
         """
         self.dependency_lists = dependency_lists
         self.contribution_lookup_tables = contribution_lookup_tables
+        self.dependent_loci = dependent_loci_index(dependency_lists)
+        self.fitness_cache = None
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state["fitness_cache"] = None
+        return state
+
+    def __setstate__(self, state):
+        """
+        Models pickled before the reverse index existed rebuild it.
+        """
+        self.__dict__.update(state)
+        if "dependent_loci" not in state:
+            self.dependent_loci = dependent_loci_index(self.dependency_lists)
+        self.__dict__.setdefault("fitness_cache", None)
 
     def calculate_fitness(self, bitstring):
         """
@@ -194,3 +240,160 @@ class NKModelSimple(object):
                 lookup_table[contribution_index] = part_fit
             fitness_tally += lookup_table[contribution_index]
         return fitness_tally / num_loci
+
+    def calculate_contributions(self, bitstring):
+        """
+        Returns a list of the contribution of every locus of a bitstring.
+        The fitness is their mean.
+        """
+        return [self._contribution(locus, bitstring)
+                for locus in range(len(self.dependency_lists))]
+
+    def mutant_contributions(self, contributions, mutant, position):
+        """
+        Returns the contributions of mutant, a bitstring differing only at
+        position from a bitstring with the given contributions.
+        Only the loci depending on position are looked up again.
+        """
+        mutant_contributions = list(contributions)
+        for locus in self.dependent_loci[position]:
+            mutant_contributions[locus] = self._contribution(locus, mutant)
+        return mutant_contributions
+
+    def _contribution(self, locus, bitstring):
+        """
+        Returns the contribution of a single locus (drawing it if new).
+        """
+        contribution_index = bitstring.selected_loci_as_int(
+            self.dependency_lists[locus])
+        lookup_table = self.contribution_lookup_tables[locus]
+        if contribution_index not in lookup_table:
+            lookup_table[contribution_index] = random.random()
+        return lookup_table[contribution_index]
+
+    def calculate_fitness_batch(self, genomes, packed=False):
+        """
+        Returns a vector of the fitnesses of many genomes at once.
+        genomes is a matrix with a row of 0s and 1s for each genome
+        (see bitstring.as_bit_matrix) or, if packed, the rows packed into
+        bytes (see bitstring.pack_bit_matrix).
+        """
+        bits = self._bit_rows(genomes, packed)
+        fitnesses = numpy.zeros(len(bits))
+        for row, bit_row in enumerate(bits.tolist()):
+            fitness_tally = 0.0
+            for locus, dependency_list in enumerate(self.dependency_lists):
+                contribution_index = 0
+                for i, dependency in enumerate(dependency_list):
+                    contribution_index |= bit_row[dependency] << i
+                lookup_table = self.contribution_lookup_tables[locus]
+                if contribution_index not in lookup_table:
+                    lookup_table[contribution_index] = random.random()
+                fitness_tally += lookup_table[contribution_index]
+            fitnesses[row] = fitness_tally / len(self.dependency_lists)
+        return fitnesses
+
+    def _bit_rows(self, genomes, packed):
+        """
+        Returns genomes as an unpacked matrix with a row per genome.
+        """
+        number_of_loci = len(self.dependency_lists)
+        if packed:
+            bits = unpack_bit_matrix(genomes, number_of_loci)
+        else:
+            bits = numpy.asarray(genomes, dtype=numpy.uint8)
+        if bits.ndim != 2 or bits.shape[1] != number_of_loci:
+            raise ValueError("Genomes must be a matrix with a row of "
+                             "{} loci per genome".format(number_of_loci))
+        return bits
+
+
+class NKModelDense(NKModelSimple):
+    def __init__(self, dependency_lists, contribution_lookup_tables):
+        """
+        Every locus must have the same number of dependencies (k + 1).
+        dependency_matrix is the (n, k + 1) array of the dependency_lists
+        and contribution_lookup_tables is a (n, 2 ** (k + 1)) float array.
+        """
+        super(NKModelDense, self).__init__(
+            dependency_lists,
+            numpy.ascontiguousarray(
+                contribution_lookup_tables, dtype=numpy.float64))
+        self.dependency_matrix = numpy.array(
+            dependency_lists, dtype=numpy.intp)
+        number_of_loci, number_of_dependencies = self.dependency_matrix.shape
+        if (self.contribution_lookup_tables.shape !=
+                (number_of_loci, 2 ** number_of_dependencies)):
+            raise ValueError("Lookup tables must be n by 2 ** (k + 1)")
+        self._loci = numpy.arange(number_of_loci)
+        self._place_values = 2 ** numpy.arange(number_of_dependencies)
+
+    def calculate_fitness(self, bitstring):
+        """
+        Returns the fitness of a bitstring, the mean of the contributions
+        gathered from the table at each locus's dependency state.
+        """
+        bits = as_bit_array(bitstring)
+        assert(len(bits) == len(self.dependency_lists))
+        contribution_indices = bits[self.dependency_matrix].dot(
+            self._place_values)
+        contributions = self.contribution_lookup_tables[
+            self._loci, contribution_indices]
+        return float(_sum_in_locus_order(contributions)) / len(contributions)
+
+    def calculate_fitness_batch(self, genomes, packed=False):
+        """
+        Returns a vector of the fitnesses of many genomes at once,
+        vectorized over the genomes and the loci.
+        genomes is a matrix with a row of 0s and 1s for each genome
+        (see bitstring.as_bit_matrix) or, if packed, the rows packed into
+        bytes (see bitstring.pack_bit_matrix).
+        """
+        bits = self._bit_rows(genomes, packed)
+        contribution_indices = bits[:, self.dependency_matrix].dot(
+            self._place_values)
+        contributions = self.contribution_lookup_tables[
+            self._loci, contribution_indices]
+        return (_sum_in_locus_order(contributions) /
+                len(self.dependency_lists))
+
+    def calculate_contributions(self, bitstring):
+        """
+        Returns a list of the contribution of every locus of a bitstring.
+        """
+        bits = as_bit_array(bitstring)
+        contribution_indices = bits[self.dependency_matrix].dot(
+            self._place_values)
+        return self.contribution_lookup_tables[
+            self._loci, contribution_indices].tolist()
+
+    def _contribution(self, locus, bitstring):
+        """
+        Returns the contribution of a single locus.
+        """
+        contribution_index = bitstring.selected_loci_as_int(
+            self.dependency_lists[locus])
+        return float(
+            self.contribution_lookup_tables[locus, contribution_index])
+
+
+def _sum_in_locus_order(contributions):
+    """
+    Sums contributions (along the last axis) one locus after the other, as
+    sum() does for organisms' contributions: numpy's sum adds pairwise,
+    which can differ in the last bits, and organisms evaluated alone,
+    in batches or from their parent's contributions must agree exactly.
+    """
+    return numpy.cumsum(contributions, axis=-1)[..., -1]
+
+
+def dependent_loci_index(dependency_lists):
+    """
+    Returns, for each locus, the ascending list of the loci whose
+    dependency lists include it.
+    """
+    dependent_loci = [set() for _ in dependency_lists]
+    for locus, dependency_list in enumerate(dependency_lists):
+        for dependency in dependency_list:
+            dependent_loci[dependency].add(locus)
+    return [sorted(loci) for loci in dependent_loci]
@@ -1,21 +1,87 @@
+import random
+from collections import OrderedDict
 from structure_and_landscapes.utility import mixins
 from ..organism import Organism as BOrg
 from .. import organism as bitstring_organism
+from ..bitstring import as_bit_matrix, flip_position
 from nk_model import NKModelSimple
 
 
 class Organism(BOrg):
+    __slots__ = ("nk_model", "_contributions", "_delta_source")
+
     def __init__(self, *args, **kwargs):
+        self.nk_model = kwargs.pop("nk_model", None)
         super(Organism, self).__init__(*args, **kwargs)
-        if (not hasattr(self, "nk_model") or
-                not isinstance(self.nk_model, NKModelSimple)):
+        if not isinstance(self.nk_model, NKModelSimple):
             raise ValueError("NK Organisms need a nk_model")
+        self._contributions = None
+        self._delta_source = None
+
+    def __setstate__(self, state):
+        super(Organism, self).__setstate__(state)
+        for name in ("_contributions", "_delta_source"):
+            if name not in state:
+                setattr(self, name, None)
 
     def mutate(self):
-        return type(self)(
-            value=self._mutated_value(),
+        """
+        Returns a single step mutant that, when evaluated, only looks up
+        the contributions of the loci depending on the flipped position.
+        """
+        position = random.randrange(len(self.value))
+        mutant = type(self)(
+            value=flip_position(self.value, position),
             parent_id=self.self_id,
             nk_model=self.nk_model)
+        mutant._delta_source = (self.contributions, position)
+        return mutant
+
+    @property
+    def contributions(self):
+        """
+        The fitness contribution of each locus (computed once).
+        """
+        if self._contributions is None:
+            if self._delta_source is None:
+                self._contributions = self.nk_model.calculate_contributions(
+                    self.value)
+            else:
+                parent_contributions, position = self._delta_source
+                self._contributions = self.nk_model.mutant_contributions(
+                    parent_contributions, self.value, position)
+                self._delta_source = None
+        return self._contributions
+
+    def _fitness_cache(self):
+        return self.nk_model.fitness_cache
 
     def _evaluate_fitness(self):
-        return self.nk_model.calculate_fitness(self.value)
+        contributions = self.contributions
+        return float(sum(contributions)) / len(contributions)
+
+    @classmethod
+    def _evaluate_fitness_batch(cls, orgs):
+        """
+        Evaluates organisms sharing a nk_model with one batched call.
+        Mutants are left to their cheaper single locus updates.
+        """
+        orgs_by_model = OrderedDict()
+        for org in orgs:
+            cache = org._fitness_cache()
+            if cache is not None:
+                org._fitness = cache.get(org.value)
+            if org._fitness is not None:
+                continue
+            if org._delta_source is not None:
+                org.fitness
+            else:
+                orgs_by_model.setdefault(id(org.nk_model), []).append(org)
+        for same_model_orgs in orgs_by_model.values():
+            model = same_model_orgs[0].nk_model
+            genomes = as_bit_matrix(org.value for org in same_model_orgs)
+            fitnesses = model.calculate_fitness_batch(genomes)
+            for org, fitness in zip(same_model_orgs, fitnesses):
+                org._fitness = float(fitness)
+                if model.fitness_cache is not None:
+                    model.fitness_cache.store(org.value, org._fitness)
@@ -1,29 +1,32 @@
 from unittest import TestCase as TC
+from random import Random
+import numpy
 import nk_model
 from nk_model import *
-from ..bitstring import Bitstring
+from ..bitstring import Bitstring, as_bit_matrix, pack_bit_matrix, \
+    flip_position
 
 
 class TestSimpleNKModel(TC):
     def test_init(self):
         dep = [[0, 1], [1, 0]]
-        clt = [{0:1, 1:2, 2:3, 3:4}, {0:5, 1:6, 2:7, 3:8}]
+        clt = [{0: 1, 1: 2, 2: 3, 3: 4}, {0: 5, 1: 6, 2: 7, 3: 8}]
         model = NKModelSimple(dep, clt)
         self.assertEqual(dep, model.dependency_lists)
         self.assertEqual(clt, model.contribution_lookup_tables)
 
     def test_calculate_fitness_hard(self):
         dep = [[0, 1], [1, 0], [2, 1]]
-        clt = [{0:.1, 1:.2, 2:.3, 3:.4},
-               {0:.5, 1:.6, 2:.7, 3:.8},
-               {0:.9, 1:1.0, 2:.15, 3:.25}]
+        clt = [{0: .1, 1: .2, 2: .3, 3: .4},
+               {0: .5, 1: .6, 2: .7, 3: .8},
+               {0: .9, 1: 1.0, 2: .15, 3: .25}]
         model = NKModelSimple(dep, clt)
         bs = Bitstring("010")
         expected_fitness = (.3 + .6 + .15) / 3.0
         self.assertAlmostEqual(expected_fitness, model.calculate_fitness(bs))
 
     def test_calculate_fitness_easy(self):
-        model = NKModelSimple([[0], [1]], [{0:.2, 1:.3}, {0:.6, 1:.7}])
+        model = NKModelSimple([[0], [1]], [{0: .2, 1: .3}, {0: .6, 1: .7}])
         bs = Bitstring("01")
         expected_fitness = (.3 + .6) / 2.0
         self.assertAlmostEqual(expected_fitness, model.calculate_fitness(bs))
@@ -41,6 +44,101 @@ class TestSimpleNKModel(TC):
         self.assertNotEqual(model.calculate_fitness(bs),
                             model.calculate_fitness(bs3))
 
+    def test_dependent_loci(self):
+        model = NKModelSimple([[0, 1], [1, 0], [2, 1]], [{}, {}, {}])
+        self.assertEqual([[0, 1], [0, 1, 2], [2]], model.dependent_loci)
+
+    def test_dependent_loci_after_unpickling_old_model(self):
+        model = NKModelSimple.__new__(NKModelSimple)
+        model.__setstate__({'dependency_lists': [[0, 1], [1, 0]],
+                            'contribution_lookup_tables': [{}, {}]})
+        self.assertEqual([[0, 1], [0, 1]], model.dependent_loci)
+
+    def test_mutant_contributions(self):
+        model = NKModelFactory().non_consecutive_dependencies(10, 3)
+        bs = Bitstring("0110100101")
+        contributions = model.calculate_contributions(bs)
+        self.assertAlmostEqual(sum(contributions) / 10,
+                               model.calculate_fitness(bs))
+        for position in range(10):
+            mutant = flip_position(bs, position)
+            self.assertEqual(
+                model.calculate_contributions(mutant),
+                model.mutant_contributions(contributions, mutant, position))
+
+    def test_calculate_fitness_batch(self):
+        dep = [[0, 1], [1, 0], [2, 1]]
+        clt = [{0: .1, 1: .2, 2: .3, 3: .4},
+               {0: .5, 1: .6, 2: .7, 3: .8},
+               {0: .9, 1: 1.0, 2: .15, 3: .25}]
+        model = NKModelSimple(dep, clt)
+        bitstrings = [Bitstring("010"), Bitstring("111"), Bitstring("000")]
+        fitnesses = model.calculate_fitness_batch(as_bit_matrix(bitstrings))
+        for bs, fitness in zip(bitstrings, fitnesses):
+            self.assertAlmostEqual(model.calculate_fitness(bs), fitness)
+
+    def test_calculate_fitness_batch_wrong_shape(self):
+        model = NKModelSimple([[0], [1]], [{}, {}])
+        with self.assertRaises(ValueError):
+            model.calculate_fitness_batch([[0, 1, 1]])
+
+
+class TestDenseNKModel(TC):
+    def setUp(self):
+        self.dep = [[0, 1], [1, 2], [2, 0]]
+        self.clt = [[.1, .2, .3, .4],
+                    [.5, .6, .7, .8],
+                    [.9, 1.0, .15, .25]]
+        self.model = NKModelDense(self.dep, self.clt)
+
+    def test_init(self):
+        self.assertEqual(self.model.dependency_matrix.shape, (3, 2))
+        self.assertEqual(self.model.contribution_lookup_tables.dtype,
+                         numpy.float64)
+        self.assertEqual(self.dep, self.model.dependency_lists)
+
+    def test_init_wrong_table_shape(self):
+        with self.assertRaises(ValueError):
+            NKModelDense(self.dep, [[.1, .2], [.3, .4], [.5, .6]])
+
+    def test_calculate_fitness(self):
+        bs = Bitstring("010")
+        expected_fitness = (.3 + .6 + .9) / 3.0
+        self.assertAlmostEqual(expected_fitness,
+                               self.model.calculate_fitness(bs))
+
+    def test_calculate_fitness_batch(self):
+        bitstrings = [Bitstring.from_int(value, 3) for value in range(8)]
+        fitnesses = self.model.calculate_fitness_batch(
+            as_bit_matrix(bitstrings))
+        self.assertEqual(fitnesses.shape, (8,))
+        for bs, fitness in zip(bitstrings, fitnesses):
+            self.assertAlmostEqual(self.model.calculate_fitness(bs), fitness)
+
+    def test_mutant_contributions(self):
+        bs = Bitstring("010")
+        contributions = self.model.calculate_contributions(bs)
+        self.assertEqual([.3, .6, .9], contributions)
+        mutant = flip_position(bs, 2)
+        self.assertEqual(
+            self.model.calculate_contributions(mutant),
+            self.model.mutant_contributions(contributions, mutant, 2))
+
+    def test_calculate_fitness_batch_packed(self):
+        bits = as_bit_matrix([Bitstring("010"), Bitstring("110")])
+        fitnesses = self.model.calculate_fitness_batch(bits)
+        packed_fitnesses = self.model.calculate_fitness_batch(
+            pack_bit_matrix(bits), packed=True)
+        self.assertTrue(numpy.allclose(fitnesses, packed_fitnesses))
+
+    def test_same_as_simple(self):
+        lazy = NKModelSimple(
+            self.dep, [dict(enumerate(row)) for row in self.clt])
+        for value in range(8):
+            bs = Bitstring.from_int(value, 3)
+            self.assertAlmostEqual(lazy.calculate_fitness(bs),
+                                   self.model.calculate_fitness(bs))
+
 
 class TestNKModelFactory(TC):
     def setUp(self):
@@ -104,3 +202,37 @@ class TestNKModelFactory(TC):
         len_of_set_deps_is_11 = [len(set(dep_list)) == 11 for dep in deps]
         self.assertTrue(all(len_of_deps_is_11))
         self.assertTrue(all(len_of_set_deps_is_11))
+
+    def test_factory_random_generator(self):
+        generator = Random(3)
+        factory = NKModelFactory(random_generator=generator)
+        self.assertIs(factory.random_generator, generator)
+
+
+class TestDenseNKModelFactory(TC):
+    def setUp(self):
+        self.factory = NKModelFactory(Random(1), dense_tables=True)
+
+    def test_tables_drawn_up_front(self):
+        model = self.factory.non_consecutive_dependencies(6, 2)
+        self.assertIsInstance(model, NKModelDense)
+        self.assertEqual(model.contribution_lookup_tables.shape, (6, 8))
+        self.assertEqual(model.dependency_matrix.shape, (6, 3))
+
+    def test_reproducible(self):
+        model = self.factory.non_consecutive_dependencies(6, 2)
+        model_again = NKModelFactory(
+            Random(1), dense_tables=True).non_consecutive_dependencies(6, 2)
+        self.assertEqual(model.dependency_lists,
+                         model_again.dependency_lists)
+        self.assertTrue(numpy.array_equal(
+            model.contribution_lookup_tables,
+            model_again.contribution_lookup_tables))
+
+    def test_multigene(self):
+        model = self.factory.non_consecutive_dependencies_multigene(
+            6, 3, 2, 10)
+        self.assertEqual(model.contribution_lookup_tables.shape,
+                         (18, 2 ** 11))
+        fitness = model.calculate_fitness(Bitstring("1" * 18))
+        self.assertTrue(0 <= fitness <= 1)
@@ -3,13 +3,16 @@ import nk_model
 import organism as nk_organism
 from organism import Organism
 from .. import bitstring
+from ...abstract_organism import evaluate_fitness_batch
+from ....utility.fitness_cache import FitnessCache
+import pickle
 import random
 
 
 class TestOrganism(TC):
     def setUp(self):
         self.value = bitstring.Bitstring("100")
-        lookup = [{0:1, 1:0.5}, {0:0.2, 1:0.4}, {0:0.1, 1:0.8}]
+        lookup = [{0: 1, 1: 0.5}, {0: 0.2, 1: 0.4}, {0: 0.1, 1: 0.8}]
         deps = [[0], [1], [2]]
         model = nk_model.NKModelSimple(deps, lookup)
         self.org = Organism(self.value, nk_model=model)
@@ -27,3 +30,64 @@ class TestOrganism(TC):
     def test_fitness(self):
         expected_fit = (1 + 0.2 + 0.8) / float(3)
         self.assertEqual(expected_fit, self.org.fitness)
+
+    def test_evaluate_fitness_batch(self):
+        orgs = [self.org.mutate() for _ in range(5)]
+        orgs.append(Organism(self.value, nk_model=self.org.nk_model))
+        evaluate_fitness_batch(orgs)
+        for org in orgs:
+            self.assertIsNotNone(org._fitness)
+            expected = self.org.nk_model.calculate_fitness(org.value)
+            self.assertAlmostEqual(expected, org.fitness)
+
+    def test_contributions(self):
+        self.assertEqual([1, 0.2, 0.8], self.org.contributions)
+
+    def test_mutant_fitness_matches_full_evaluation(self):
+        model = nk_model.NKModelFactory(random.Random(2)).\
+            non_consecutive_dependencies(20, 4)
+        org = Organism(bitstring.random_string(20), nk_model=model)
+        for _ in range(50):
+            org = org.mutate()
+            self.assertIsNotNone(org._delta_source)
+            self.assertEqual(model.calculate_fitness(org.value), org.fitness)
+            self.assertIsNone(org._delta_source)
+
+    def test_dense_fitness_paths_agree(self):
+        model = nk_model.NKModelFactory(
+            random.Random(3), dense_tables=True).\
+            non_consecutive_dependencies(40, 5)
+        orgs = [Organism(bitstring.random_string(40), nk_model=model)
+                for _ in range(100)]
+        mutants = [org.mutate() for org in orgs]
+        batch = model.calculate_fitness_batch(
+            bitstring.as_bit_matrix(org.value for org in mutants))
+        for mutant, batch_fitness in zip(mutants, batch.tolist()):
+            self.assertEqual(mutant.fitness, batch_fitness)
+            self.assertEqual(model.calculate_fitness(mutant.value),
+                             batch_fitness)
+            alone = Organism(mutant.value, nk_model=model)
+            self.assertEqual(alone.fitness, batch_fitness)
+
+    def test_fitness_cache(self):
+        self.org.nk_model.fitness_cache = FitnessCache(10)
+        self.org.fitness
+        same_genotype = Organism(self.value, nk_model=self.org.nk_model)
+        self.assertEqual(self.org.fitness, same_genotype.fitness)
+        self.assertEqual(self.org.nk_model.fitness_cache.hits, 1)
+        evaluate_fitness_batch(
+            [Organism(self.value, nk_model=self.org.nk_model)])
+        self.assertEqual(self.org.nk_model.fitness_cache.hits, 2)
+
+    def test_pickle(self):
+        mutant = self.org.mutate()
+        for protocol in (0, 2):
+            copy = pickle.loads(pickle.dumps(mutant, protocol))
+            self.assertEqual(copy.value, mutant.value)
+            self.assertEqual(copy.parent_id, self.org.self_id)
+            self.assertEqual(copy.fitness, mutant.fitness)
+
+    def test_fitness_cache_not_pickled(self):
+        self.org.nk_model.fitness_cache = FitnessCache(10)
+        model = pickle.loads(pickle.dumps(self.org.nk_model, 2))
+        self.assertIsNone(model.fitness_cache)
@@ -10,6 +10,7 @@ from ..abstract_organism import AbstractOrganism
 
 
 class Organism(AbstractOrganism):
+    __slots__ = ()
 
     def __init__(self, *args, **kwargs):
         super(Organism, self).__init__(*args, **kwargs)
@@ -30,7 +31,7 @@ class Organism(AbstractOrganism):
         fitness of this organism is the hamming distance of
         its bitstring from a bitstring composed of all False's
         """
-        return 1 + sum(self.value)
+        return 1 + self.value.popcount()
 
 
 default_organism = Organism(Bitstring(False for _ in range(10)))
@@ -3,6 +3,7 @@ This module tests the bitstring class.
 """
 import unittest
 import copy
+import pickle
 
 import bitstring
 from bitstring import Bitstring
@@ -90,6 +91,43 @@ class TestBitstring(unittest.TestCase):
         mutant = bs.single_step_mutant()
         self.assertNotEqual(bs, mutant)
 
+    def test_from_int(self):
+        self.assertEqual(Bitstring.from_int(6, 4), Bitstring("0110"))
+        self.assertEqual(Bitstring.from_int(6, 2), Bitstring("10"))
+        self.assertEqual(len(Bitstring.from_int(0, 3)), 3)
+
+    def test_getitem_negative_and_slice(self):
+        b = Bitstring("100")
+        self.assertEqual(True, b[-1])
+        self.assertEqual((False, False), b[:2])
+        with self.assertRaises(IndexError):
+            b[3]
+
+    def test_ordering(self):
+        strings = ["", "0", "1", "00", "01", "10", "11", "010", "101"]
+        bitstrings = [Bitstring(s) for s in strings]
+        as_tuples = [tuple(b) for b in bitstrings]
+        self.assertEqual([tuple(b) for b in sorted(bitstrings)],
+                         sorted(as_tuples))
+
+    def test_popcount(self):
+        self.assertEqual(Bitstring("10110").popcount(), 3)
+        self.assertEqual(Bitstring("").popcount(), 0)
+
+    def test_hamming_distance_unequal_lengths(self):
+        b = Bitstring("111")
+        b2 = Bitstring("10")
+        self.assertEqual(b.hamming_distance(b2), 1)
+
+    def test_pickle(self):
+        b = Bitstring("0110")
+        self.assertEqual(b, pickle.loads(pickle.dumps(b, 2)))
+
+    def test_unpickle_tuple_representation(self):
+        b = Bitstring.__new__(Bitstring)
+        b.__setstate__({"_value": (False, True, True)})
+        self.assertEqual(b, Bitstring("110"))
+
 
 class TestModule(unittest.TestCase):
 
@@ -102,3 +140,44 @@ class TestModule(unittest.TestCase):
         length = 4
         b = bitstring.random_string(length)
         self.assertEqual(length, len(b))
+        self.assertEqual(0, len(bitstring.random_string(0)))
+
+    def test_as_bit_array(self):
+        b = Bitstring("1000000110")
+        self.assertEqual(list(bitstring.as_bit_array(b)),
+                         [0, 1, 1, 0, 0, 0, 0, 0, 0, 1])
+        self.assertEqual(len(bitstring.as_bit_array(Bitstring(""))), 0)
+
+    def test_as_bit_matrix(self):
+        bitstrings = [Bitstring("0000000001"), Bitstring("1000000110")]
+        matrix = bitstring.as_bit_matrix(bitstrings)
+        self.assertEqual(matrix.shape, (2, 10))
+        self.assertEqual(list(matrix[0]), [1, 0, 0, 0, 0, 0, 0, 0, 0, 0])
+        self.assertEqual(list(matrix[1]),
+                         list(bitstring.as_bit_array(bitstrings[1])))
+
+    def test_as_bit_matrix_unequal_lengths(self):
+        with self.assertRaises(ValueError):
+            bitstring.as_bit_matrix([Bitstring("01"), Bitstring("1")])
+
+    def test_pack_unpack_bit_matrix(self):
+        bitstrings = [bitstring.random_string(13) for _ in range(5)]
+        matrix = bitstring.as_bit_matrix(bitstrings)
+        packed = bitstring.pack_bit_matrix(matrix)
+        self.assertEqual(packed.shape, (5, 2))
+        unpacked = bitstring.unpack_bit_matrix(packed, 13)
+        self.assertTrue((unpacked == matrix).all())
+
+    def test_byte_matrix(self):
+        bitstrings = [Bitstring("1000000001"), Bitstring("0000000011")]
+        matrix = bitstring.as_byte_matrix(bitstrings, 10)
+        self.assertEqual(matrix.tolist(), [[2, 1], [0, 3]])
+        self.assertEqual(bitstring.from_byte_matrix(matrix, 10), bitstrings)
+        self.assertEqual(bitstring.as_byte_matrix([], 10).shape, (0, 2))
+        with self.assertRaises(ValueError):
+            bitstring.as_byte_matrix([Bitstring("1")], 10)
+
+    def test_flip_position_negative(self):
+        b = Bitstring("00000")
+        b_mutated = bitstring.flip_position(b, -1)
+        self.assertEqual(b_mutated, Bitstring("10000"))
@@ -8,6 +8,7 @@ from ..abstract_organism import AbstractOrganism
 
 
 class Organism(AbstractOrganism):
+    __slots__ = ()
 
     def __init__(self, *args, **kwargs):
         super(Organism, self).__init__(*args, **kwargs)
@@ -1,7 +1,10 @@
 from unittest import TestCase as TC
+import uuid
 from organism import Organism
 import organism
+from ..abstract_organism import next_organism_id, reset_organism_ids
 from ..test_abstract_organism import MixinTestOrganism, MixinTestModule
+from ...utility.fitness_cache import FitnessCache
 
 
 class TestModule(MixinTestModule, TC):
@@ -21,8 +24,45 @@ class TestOrganism(MixinTestOrganism, TC):
         with self.assertRaises(ValueError):
             self.Organism("1")
 
+    def test_legacy_state(self):
+        # Organisms pickled with a __dict__ and UUID ids
+        self_id, parent_id = uuid.uuid4(), uuid.uuid4()
+        org = Organism.__new__(Organism)
+        org.__setstate__({"value": 3, "self_id": self_id,
+                          "parent_id": parent_id, "original_pop": 1})
+        self.assertEqual(org.value, 3)
+        self.assertEqual(org.self_id, self_id)
+        self.assertEqual(org.mutate().parent_id, self_id)
+        self.assertEqual(org.fitness, 4)
+
+    def test_reset_organism_ids(self):
+        # The counter continues from where it was for the other tests
+        next_id = next_organism_id()
+        try:
+            reset_organism_ids(100)
+            self.assertEqual(self.Organism(self.value_0).self_id, 100)
+            self.assertEqual(self.Organism(self.value_0).self_id, 101)
+        finally:
+            reset_organism_ids(next_id)
+        self.assertEqual(self.Organism(self.value_0).self_id, next_id)
+
     def test_fitness(self):
         g0 = self.Organism(self.value_0)
         self.assertAlmostEqual(1, g0.fitness)
         g1 = self.Organism(self.value_1)
         self.assertAlmostEqual(2, g1.fitness)
+
+
+class TestFitnessCache(TC):
+    def setUp(self):
+        Organism.fitness_cache = FitnessCache(10)
+
+    def tearDown(self):
+        Organism.fitness_cache = None
+
+    def test_shared_between_organisms(self):
+        self.assertEqual(Organism(3).fitness, 4)
+        self.assertEqual(Organism.fitness_cache.misses, 1)
+        self.assertEqual(Organism(3).fitness, 4)
+        self.assertEqual(Organism.fitness_cache.hits, 1)
+        self.assertEqual(len(Organism.fitness_cache), 1)
@@ -1,23 +1,182 @@
+"""
+Vienna RNA through its command line programs (RNAfold and RNAdistance).
+
+A FoldingPool keeps the programs running, writing sequences (or pairs of
+structures) to their stdin and reading answers line by line, so a process
+isn't started for every fold. The module level functions share a default
+pool, which is shut down when the interpreter exits.
+"""
+import atexit
 import subprocess
 
+RNAFOLD_COMMAND = ('RNAfold', '--noPS')
+RNADISTANCE_COMMAND = ('RNAdistance',)
+
+# Bytes written to a worker before its answers are read, within the
+# smallest pipe buffers (16 KiB), so writing never waits on a worker
+# itself waiting for its answers to be read
+CHUNK_BYTES = 16384
+
+
+class _LineWorker(object):
+    """
+    A long lived process answering each request written to its stdin
+    with a fixed number of lines on its stdout.
+    """
+    def __init__(self, command, lines_per_answer):
+        self.lines_per_answer = lines_per_answer
+        self.process = subprocess.Popen(
+            list(command), stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            universal_newlines=True)
+
+    def send(self, lines):
+        for line in lines:
+            self.process.stdin.write(line + '\n')
+        self.process.stdin.flush()
+
+    def receive(self):
+        answer = []
+        for _ in range(self.lines_per_answer):
+            line = self.process.stdout.readline()
+            if not line:
+                raise IOError("Vienna RNA process ended unexpectedly")
+            answer.append(line.rstrip('\n'))
+        return answer
+
+    def close(self):
+        try:
+            self.process.stdin.close()
+        except IOError:
+            # Lines still buffered for a process that has exited
+            pass
+        self.process.wait()
+        self.process.stdout.close()
+
+
+def _chunks(items, sizes, limit):
+    """
+    Splits items into consecutive chunks of at most limit in total size
+    (sizes being those of the items), a larger item making a chunk alone.
+    """
+    chunks = []
+    chunk_size = 0
+    for item, size in zip(items, sizes):
+        if not chunks or chunk_size + size > limit:
+            chunks.append([])
+            chunk_size = 0
+        chunks[-1].append(item)
+        chunk_size += size
+    return chunks
+
+
+class FoldingPool(object):
+    def __init__(self, number_of_workers=1, fold_command=RNAFOLD_COMMAND,
+                 distance_command=RNADISTANCE_COMMAND,
+                 chunk_bytes=CHUNK_BYTES):
+        """
+        Starts number_of_workers folding processes (the distance process
+        is started when first needed).
+        chunk_bytes bounds the bytes written to a worker before its
+        answers are read (so the pipes never fill up).
+        """
+        if number_of_workers < 1:
+            raise ValueError("A folding pool needs at least one worker")
+        self.distance_command = distance_command
+        self.chunk_bytes = chunk_bytes
+        self._fold_workers = [_LineWorker(fold_command, 2)
+                              for _ in range(number_of_workers)]
+        self._distance_worker = None
+
+    def fold_many(self, seqs):
+        """
+        Returns the minimum free energy structure (dot bracket) of each
+        sequence, in order. Sequences are spread over the workers.
+        """
+        seqs = list(seqs)
+        if not all(seqs):
+            raise ValueError("Can't fold an empty sequence")
+        structures = []
+        chunks = _chunks(seqs, [len(seq) + 1 for seq in seqs],
+                         self.chunk_bytes)
+        number_of_workers = len(self._fold_workers)
+        for round_start in range(0, len(chunks), number_of_workers):
+            round_chunks = chunks[round_start:round_start + number_of_workers]
+            for worker, chunk in zip(self._fold_workers, round_chunks):
+                worker.send(chunk)
+            for worker, chunk in zip(self._fold_workers, round_chunks):
+                for seq in chunk:
+                    _, structure_line = worker.receive()
+                    structures.append(structure_line[0:len(seq)])
+        return structures
+
+    def distance_many(self, structure_pairs):
+        """
+        Returns the RNAdistance of each pair of dot bracket structures.
+        """
+        if self._distance_worker is None:
+            self._distance_worker = _LineWorker(self.distance_command, 1)
+        structure_pairs = list(structure_pairs)
+        distances = []
+        for chunk in _chunks(structure_pairs,
+                             [len(first) + len(second) + 2
+                              for first, second in structure_pairs],
+                             self.chunk_bytes):
+            self._distance_worker.send(
+                [structure for pair in chunk for structure in pair])
+            for _ in chunk:
+                answer, = self._distance_worker.receive()
+                distances.append(int(answer.strip()[2:]))
+        return distances
+
+    def close(self):
+        """
+        Stops all of the processes (safe to call more than once).
+        """
+        for worker in self._fold_workers:
+            worker.close()
+        if self._distance_worker is not None:
+            self._distance_worker.close()
+
+
+_default_pool = None
+
+
+def get_pool():
+    """
+    Returns the default pool, starting it if needed.
+    """
+    global _default_pool
+    if _default_pool is None:
+        _default_pool = FoldingPool()
+        atexit.register(_default_pool.close)
+    return _default_pool
+
 
 def fold(seq):
-    #subprocess.call(['RNAfold'])
-    fold = subprocess.Popen(
-        ['RNAfold', '--noPS'], stdin=subprocess.PIPE, stdout=subprocess.PIPE)
-    output = fold.communicate(seq)
-    print output
-    structure = output[0].split('\n')
-    return structure[1][0:len(seq)]
+    return get_pool().fold_many([seq])[0]
+
+
+def fold_many(seqs):
+    return get_pool().fold_many(seqs)
+
+
+def fold_batch(seqs, n_threads=1):
+    """
+    Same as fold_many; the default pool's workers fold in parallel, so
+    n_threads (kept to match vienna_distance) is only checked.
+    """
+    if n_threads < 1:
+        raise ValueError("Folding needs at least one thread")
+    return fold_many(seqs)
+
+
+def distance_many(structure_pairs):
+    return get_pool().distance_many(structure_pairs)
 
 
 def get_distance(seq1, seq2):
-    structure1 = fold(seq1)
-    structure2 = fold(seq2)
-    distance = subprocess.Popen(
-        ['RNAdistance'], stdin=subprocess.PIPE, stdout=subprocess.PIPE)
-    ouput = distance.communicate(structure1 + '\n' + structure2)
-    return int(ouput[0][2:])
+    structure1, structure2 = fold_many([seq1, seq2])
+    return distance_many([(structure1, structure2)])[0]
 
 
 def get_tRNA_sequence():
@@ -25,11 +184,46 @@ def get_tRNA_sequence():
             "TAACGCGGGGATCAGCGGTTCGATCCCGCTAGAGACCA")
 
 
+TRNA_TARGET_STRUCTURE = ('(((((((.(((((....))........(((((' +
+                         '.......)))))(((((........))))).)))))))))).')
+
+
+_target_structure = TRNA_TARGET_STRUCTURE
+
+
 def get_distance_from_tRNA_sequence(seq):
     org_struct = fold(seq)
-    target_struct = ('(((((((.(((((....))........(((((' +
-                     '.......)))))(((((........))))).)))))))))).')
-    distance = subprocess.Popen(
-        ['RNAdistance'], stdin=subprocess.PIPE, stdout=subprocess.PIPE)
-    ouput = distance.communicate(org_struct + '\n' + target_struct)
-    return int(ouput[0][2:])
+    return distance_many([(org_struct, TRNA_TARGET_STRUCTURE)])[0]
+
+
+def set_target(sequence=None, structure=None):
+    """
+    Sets the target of distance_to_target, either a sequence (folded once
+    here) or a dot bracket structure. The default target is the tRNA.
+    """
+    global _target_structure
+    if (sequence is None) == (structure is None):
+        raise ValueError("Give exactly one of a sequence or a structure")
+    if structure is not None:
+        if set(structure) - set("()."):
+            raise ValueError("Structures are in dot bracket notation")
+        _target_structure = structure
+    else:
+        _target_structure = fold(sequence)
+
+
+def distance_to_target(seq):
+    """
+    Returns the distance between the structure of seq and the target
+    structure (only seq is folded).
+    """
+    return distance_many([(fold(seq), _target_structure)])[0]
+
+
+def distance_to_target_batch(seqs, n_threads=1):
+    """
+    Returns distance_to_target of each of seqs.
+    """
+    structures = fold_batch(seqs, n_threads)
+    return distance_many((structure, _target_structure)
+                         for structure in structures)
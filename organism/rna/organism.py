@@ -10,6 +10,10 @@ RNA_SEQUENCE_LENGTH = len(OPTIMAL_RNA_SEQUENCE)
 
 
 class Organism(AbstractOrganism):
+    __slots__ = ()
+
+    # Threads used to fold the sequences of a batch of organisms
+    folding_threads = 1
 
     def __init__(self, *args, **kwargs):
         super(Organism, self).__init__(*args, **kwargs)
@@ -33,10 +37,33 @@ class Organism(AbstractOrganism):
         This is where calls to vienna RNA will have to come in folding it to
         a predefined structure or seeing it's distance from tRNA
         """
-        num_diffs = vienna_distance.get_distance_from_tRNA_sequence(
-            self.value)
-        a = 0.01
-        return 1 / (a + (float(num_diffs) / len(self.value)))
+        num_diffs = vienna_distance.distance_to_target(self.value)
+        return _fitness_from_distance(num_diffs, len(self.value))
+
+    @classmethod
+    def _evaluate_fitness_batch(cls, orgs):
+        """
+        Folds every organism not found in the fitness cache in one call,
+        with folding_threads threads.
+        """
+        cache = cls.fitness_cache
+        unevaluated = []
+        for org in orgs:
+            if cache is not None:
+                org._fitness = cache.get(org.value)
+            if org._fitness is None:
+                unevaluated.append(org)
+        distances = vienna_distance.distance_to_target_batch(
+            [org.value for org in unevaluated], cls.folding_threads)
+        for org, num_diffs in zip(unevaluated, distances):
+            org._fitness = _fitness_from_distance(num_diffs, len(org.value))
+            if cache is not None:
+                cache.store(org.value, org._fitness)
+
+
+def _fitness_from_distance(num_diffs, length):
+    a = 0.01
+    return 1 / (a + (float(num_diffs) / length))
 
 
 default_organism = Organism(OPTIMAL_RNA_SEQUENCE)
@@ -1,7 +1,110 @@
 from unittest import TestCase as TC
+import os
+import shutil
+import sys
+import tempfile
 import cmd_vienna_distance
 import test_vienna_distance
 
+# Stand-ins answering like RNAfold (sequence line then structure line)
+# and RNAdistance ("f: <distance>" for each pair of structures)
+FAKE_RNAFOLD = """
+import sys
+for line in iter(sys.stdin.readline, ''):
+    seq = line.strip()
+    structure = ''.join('(' if base == 'G' else
+                        ')' if base == 'C' else '.' for base in seq)
+    sys.stdout.write(seq + '\\n' + structure + ' ( -1.00)\\n')
+    sys.stdout.flush()
+"""
+FAKE_RNADISTANCE = """
+import sys
+while True:
+    first, second = sys.stdin.readline(), sys.stdin.readline()
+    if not second:
+        break
+    distance = sum(a != b for a, b in zip(first.strip(), second.strip()))
+    sys.stdout.write('f: {}\\n'.format(distance))
+    sys.stdout.flush()
+"""
+
 
 class TestModule(test_vienna_distance.TestModule):
     module = cmd_vienna_distance
+
+
+class TestFoldingPool(TC):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        fold_path = os.path.join(self.temp_dir, "RNAfold.py")
+        distance_path = os.path.join(self.temp_dir, "RNAdistance.py")
+        with open(fold_path, "w") as fold_file:
+            fold_file.write(FAKE_RNAFOLD)
+        with open(distance_path, "w") as distance_file:
+            distance_file.write(FAKE_RNADISTANCE)
+        self.fold_command = (sys.executable, fold_path)
+        self.pool = cmd_vienna_distance.FoldingPool(
+            number_of_workers=2,
+            fold_command=self.fold_command,
+            distance_command=(sys.executable, distance_path),
+            chunk_bytes=12)
+
+    def tearDown(self):
+        self.pool.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_fold_many(self):
+        seqs = ["G" * i + "A" + "C" * i for i in range(1, 12)]
+        structures = self.pool.fold_many(seqs)
+        expected = ["(" * i + "." + ")" * i for i in range(1, 12)]
+        self.assertEqual(expected, structures)
+
+    def test_fold_empty_sequence(self):
+        with self.assertRaises(ValueError):
+            self.pool.fold_many(["GAC", ""])
+
+    def test_workers_persist(self):
+        pids = [worker.process.pid for worker in self.pool._fold_workers]
+        self.pool.fold_many(["GAC"] * 10)
+        self.pool.fold_many(["GAC"] * 10)
+        self.assertEqual(
+            pids, [worker.process.pid for worker in self.pool._fold_workers])
+
+    def test_chunks(self):
+        chunks = cmd_vienna_distance._chunks(
+            "abcdef", [2, 3, 9, 1, 1, 4], 5)
+        self.assertEqual(chunks, [["a", "b"], ["c"], ["d", "e"], ["f"]])
+
+    def test_fold_many_long(self):
+        # Far more than a pipe holds, written in chunks of CHUNK_BYTES
+        pool = cmd_vienna_distance.FoldingPool(
+            fold_command=self.fold_command)
+        try:
+            structures = pool.fold_many(["GAC" * 400] * 200)
+        finally:
+            pool.close()
+        self.assertEqual(structures, ["(.)" * 400] * 200)
+
+    def test_distance_many(self):
+        pairs = [("((..))", "((..))"), ("((..))", "......"), ("(.)", "..)")]
+        self.assertEqual([0, 4, 1], self.pool.distance_many(pairs))
+
+    def test_close(self):
+        self.pool.distance_many([("()", "..")])
+        self.pool.close()
+        for worker in self.pool._fold_workers:
+            self.assertIsNotNone(worker.process.poll())
+        self.assertIsNotNone(self.pool._distance_worker.process.poll())
+        self.pool.close()
+
+    def test_close_exited(self):
+        worker = self.pool._fold_workers[0]
+        worker.process.kill()
+        worker.process.wait()
+        self.pool.close()
+        self.assertTrue(worker.process.stdin.closed)
+        self.assertTrue(worker.process.stdout.closed)
+
+    def test_zero_workers(self):
+        with self.assertRaises(ValueError):
+            cmd_vienna_distance.FoldingPool(number_of_workers=0)
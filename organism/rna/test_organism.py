@@ -2,6 +2,7 @@ from unittest import TestCase as TC
 import organism
 from organism import Organism
 from ..test_abstract_organism import MixinTestOrganism, MixinTestModule
+from ..abstract_organism import evaluate_fitness_batch
 import cmd_vienna_distance as vienna_distance
 
 OPTIMAL_RNA_SEQUENCE = vienna_distance.get_tRNA_sequence()
@@ -38,3 +39,11 @@ class TestOrganism(MixinTestOrganism, TC):
         all_As = "".join('A' for _ in organism.value)
         a_org = self.Organism(all_As)
         self.assertLess(a_org.fitness, organism.fitness)
+
+    def test_fitness_batch(self):
+        values = [self.value_0, self.value_1, self.value_2]
+        orgs = [self.Organism(value) for value in values]
+        evaluate_fitness_batch(orgs)
+        for org, value in zip(orgs, values):
+            self.assertIsNotNone(org._fitness)
+            self.assertEqual(org.fitness, self.Organism(value).fitness)
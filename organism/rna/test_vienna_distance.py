@@ -28,3 +28,81 @@ class TestModule(TC):
         seq = "ACTGAAATTGACCCTGTTAAAACTCGCTCGCTAGCTAGCTC"
         struc = self.module.fold(seq)
         self.assertEqual(len(struc), len(seq))
+
+    def test_fold_batch(self):
+        seqs = ["CGAUGCC", "CGCAGGGAUACCCGCG", "GCGCCCAUAGGGACGC"] * 3
+        self.assertEqual([self.module.fold(seq) for seq in seqs],
+                         self.module.fold_batch(seqs, n_threads=2))
+        self.assertEqual([], self.module.fold_batch([]))
+
+    def test_fold_batch_exceptions(self):
+        with self.assertRaises(ValueError):
+            self.module.fold_batch(["CGAUGCC"], n_threads=0)
+        with self.assertRaises(ValueError):
+            self.module.fold_batch(["CGAUGCC", ""])
+
+    def test_distance_to_target_batch(self):
+        target = self.module.get_tRNA_sequence()
+        seqs = [target, "A" * len(target), "C" * 10 + target[10:]]
+        self.assertEqual(
+            [self.module.distance_to_target(seq) for seq in seqs],
+            self.module.distance_to_target_batch(seqs, n_threads=3))
+
+    def test_distance_to_target(self):
+        target = self.module.get_tRNA_sequence()
+        self.assertEqual(self.module.distance_to_target(target), 0)
+        self.assertEqual(
+            self.module.distance_to_target("A" * len(target)),
+            self.module.get_distance_from_tRNA_sequence("A" * len(target)))
+
+    def test_set_target(self):
+        seq = "CGCAGGGAUACCCGCG"
+        try:
+            self.module.set_target(sequence=seq)
+            self.assertEqual(self.module.distance_to_target(seq), 0)
+            self.module.set_target(structure=self.module.fold(seq))
+            self.assertEqual(self.module.distance_to_target(seq), 0)
+        finally:
+            self.module.set_target(
+                sequence=self.module.get_tRNA_sequence())
+
+    def test_set_target_exceptions(self):
+        with self.assertRaises(ValueError):
+            self.module.set_target()
+        with self.assertRaises(ValueError):
+            self.module.set_target(sequence="CGAU", structure="....")
+        with self.assertRaises(ValueError):
+            self.module.set_target(structure="((xx))")
+
+
+class TestFoldContext(TC):
+    def setUp(self):
+        self.context = vienna_distance.FoldContext()
+
+    def tearDown(self):
+        self.context.close()
+
+    def test_fold(self):
+        # Longer then shorter sequences reuse the grown buffers
+        for seq in ["CGAUGCC", "CGCAGGGAUACCCGCGCGCAGGGAUACCCGCG", "GCGC"]:
+            self.assertEqual(vienna_distance.fold(seq),
+                             self.context.fold(seq))
+
+    def test_distance(self):
+        seq1, seq2 = "CGCAGGGAUACCCGCG", "GCGCCCAUAGGGACGC"
+        self.assertEqual(vienna_distance.get_distance(seq1, seq2),
+                         self.context.distance(seq1, seq2))
+        self.assertEqual(self.context.distance(seq1, seq1), 0)
+
+    def test_distance_to_target(self):
+        seq = "CGCAGGGAUACCCGCG"
+        with self.assertRaises(ValueError):
+            self.context.distance_to_target(seq)
+        self.context.set_target(sequence=seq)
+        self.assertEqual(self.context.distance_to_target(seq), 0)
+
+    def test_close(self):
+        self.context.close()
+        self.context.close()
+        with self.assertRaises(ValueError):
+            self.context.fold("CGAUGCC")
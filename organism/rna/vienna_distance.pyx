@@ -1,20 +1,223 @@
+from libc.stdlib cimport malloc, calloc, free
+
+
 cdef extern from "vienna_utils.h":
     cdef float partition_distance(char *, char *)
     cdef char * tRNA_sequence()
     cdef float partition_distance_from_tRNA_sequence(char * seq)
     cdef int get_bp_distance(char * seq1, char * seq2)
-    cdef int get_bp_distance_from_tRNA(char * seq)
-    cdef char * fold_string(char * seq)
+    ctypedef struct fold_context:
+        pass
+    cdef fold_context * fold_context_new()
+    cdef void fold_context_free(fold_context * context)
+    cdef char * fold_context_fold(fold_context * context, char * seq)
+    cdef int fold_context_distance(fold_context * context,
+                                   char * seq1, char * seq2)
+    cdef int fold_context_set_target_structure(fold_context * context,
+                                               char * structure)
+    cdef int fold_context_set_target_sequence(fold_context * context,
+                                              char * seq)
+    cdef int fold_context_distance_to_target(fold_context * context,
+                                             char * seq)
+    cdef void fold_release_arrays()
+    cdef int fold_threads_supported()
+    cdef void c_fold_batch "fold_batch"(char ** seqs, char ** structures,
+                                        int count, int n_threads) nogil
+    cdef int fold_context_distance_to_target_batch(
+        fold_context * context, char ** seqs, int * distances,
+        int count, int n_threads) nogil
+
+
+# Whether batches can fold on several threads (ViennaRNA built with OpenMP)
+PARALLEL_FOLDING = bool(fold_threads_supported())
+
+
+def _batch_of_sequences(seqs, n_threads):
+    seqs = list(seqs)
+    if n_threads < 1:
+        raise ValueError("Folding needs at least one thread")
+    if not all(seqs):
+        raise ValueError("Can't fold an empty sequence")
+    return seqs
+
+
+cdef class FoldContext:
+    """
+    Folds sequences reusing the same structure buffers call after call,
+    freed by close, or when the context is garbage collected. Vienna's
+    folding arrays are shared by every context (see release_fold_arrays).
+    """
+    cdef fold_context * context
+
+    def __cinit__(self):
+        self.context = fold_context_new()
+        if self.context is NULL:
+            raise MemoryError()
+
+    def __dealloc__(self):
+        self.close()
+
+    def close(self):
+        """
+        Frees the buffers (safe to call more than once).
+        """
+        if self.context is not NULL:
+            fold_context_free(self.context)
+            self.context = NULL
+
+    cdef fold_context * _open_context(self) except NULL:
+        if self.context is NULL:
+            raise ValueError("The fold context is closed")
+        return self.context
+
+    def fold(self, seq):
+        cdef char * structure = fold_context_fold(self._open_context(), seq)
+        if structure is NULL:
+            raise MemoryError()
+        return structure
+
+    def distance(self, seq1, seq2):
+        distance = fold_context_distance(self._open_context(), seq1, seq2)
+        if distance < 0:
+            raise MemoryError()
+        return distance
+
+    def set_target(self, sequence=None, structure=None):
+        """
+        Sets the target of distance_to_target, either a sequence (folded
+        once here) or a dot bracket structure.
+        """
+        cdef fold_context * context = self._open_context()
+        if (sequence is None) == (structure is None):
+            raise ValueError("Give exactly one of a sequence or a structure")
+        if structure is not None:
+            if set(structure) - set("()."):
+                raise ValueError("Structures are in dot bracket notation")
+            if not fold_context_set_target_structure(context, structure):
+                raise MemoryError()
+        elif not fold_context_set_target_sequence(context, sequence):
+            raise MemoryError()
+
+    def distance_to_target(self, seq):
+        """
+        Returns the base pair distance between the structure of seq and the
+        target structure (only seq is folded).
+        """
+        distance = fold_context_distance_to_target(self._open_context(), seq)
+        if distance < 0:
+            raise ValueError("No target set (or out of memory)")
+        return distance
+
+    def distance_to_target_batch(self, seqs, n_threads=1):
+        """
+        Returns distance_to_target of each of seqs, folding them in
+        parallel with n_threads threads (the GIL is released meanwhile).
+        """
+        seqs = _batch_of_sequences(seqs, n_threads)
+        cdef fold_context * context = self._open_context()
+        cdef int count = len(seqs)
+        cdef int threads = n_threads
+        cdef char ** c_seqs = NULL
+        cdef int * distances = NULL
+        cdef int succeeded
+        cdef int i
+        if not count:
+            return []
+        try:
+            c_seqs = <char **> malloc(count * sizeof(char *))
+            distances = <int *> malloc(count * sizeof(int))
+            if c_seqs is NULL or distances is NULL:
+                raise MemoryError()
+            for i in range(count):
+                c_seqs[i] = seqs[i]
+            with nogil:
+                succeeded = fold_context_distance_to_target_batch(
+                    context, c_seqs, distances, count, threads)
+            if not succeeded:
+                raise ValueError("No target set (or out of memory)")
+            return [distances[i] for i in range(count)]
+        finally:
+            free(c_seqs)
+            free(distances)
+
+
+# The module level functions share these contexts, the tRNA one keeping
+# the tRNA as its target while the other's target can be changed
+_context = FoldContext()
+_context.set_target(sequence=tRNA_sequence())
+_tRNA_context = FoldContext()
+_tRNA_context.set_target(sequence=tRNA_sequence())
 
 
 def fold(seq):
-    return fold_string(seq)
+    return _context.fold(seq)
+
+def fold_batch(seqs, n_threads=1):
+    """
+    Returns the structure of each of seqs, folding them in parallel with
+    n_threads threads (the GIL is released meanwhile).
+    """
+    seqs = _batch_of_sequences(seqs, n_threads)
+    cdef int count = len(seqs)
+    cdef int threads = n_threads
+    cdef char ** c_seqs = NULL
+    cdef char ** structures = NULL
+    cdef int i
+    if not count:
+        return []
+    try:
+        c_seqs = <char **> malloc(count * sizeof(char *))
+        structures = <char **> calloc(count, sizeof(char *))
+        if c_seqs is NULL or structures is NULL:
+            raise MemoryError()
+        for i in range(count):
+            c_seqs[i] = seqs[i]
+            structures[i] = <char *> malloc(len(seqs[i]) + 1)
+            if structures[i] is NULL:
+                raise MemoryError()
+        with nogil:
+            c_fold_batch(c_seqs, structures, count, threads)
+        return [structures[i] for i in range(count)]
+    finally:
+        if structures is not NULL:
+            for i in range(count):
+                free(structures[i])
+        free(structures)
+        free(c_seqs)
+
+def release_fold_arrays():
+    """
+    Frees Vienna's folding arrays (kept between folds of every context),
+    which the next fold allocates again.
+    """
+    fold_release_arrays()
 
 def get_distance(seq1, seq2):
-    return get_bp_distance(seq1, seq2)
+    return _context.distance(seq1, seq2)
 
 def get_tRNA_sequence():
     return tRNA_sequence()
 
 def get_distance_from_tRNA_sequence(seq):
-    return get_bp_distance_from_tRNA(seq)
+    return _tRNA_context.distance_to_target(seq)
+
+def set_target(sequence=None, structure=None):
+    """
+    Sets the target of distance_to_target, either a sequence (folded once
+    here) or a dot bracket structure. The default target is the tRNA.
+    """
+    _context.set_target(sequence=sequence, structure=structure)
+
+def distance_to_target(seq):
+    """
+    Returns the base pair distance between the structure of seq and the
+    target structure (only seq is folded).
+    """
+    return _context.distance_to_target(seq)
+
+def distance_to_target_batch(seqs, n_threads=1):
+    """
+    Returns distance_to_target of each of seqs, folding them in parallel
+    with n_threads threads.
+    """
+    return _context.distance_to_target_batch(seqs, n_threads)
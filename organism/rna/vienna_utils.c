@@ -7,6 +7,19 @@
 #include  "profiledist.h"
 #include "vienna_utils.h"
 
+/* Set by the Makefile when libRNA keeps its folding arrays per thread */
+#ifndef VIENNA_OPENMP
+#define VIENNA_OPENMP 0
+#endif
+
+/* Reusable buffers for folding; see vienna_utils.h */
+struct fold_context {
+    size_t capacity;
+    char * structure;
+    char * other_structure;
+    char * target_structure;
+};
+
 
 const char* tRNA_sequence()
 {
@@ -20,32 +33,197 @@ float partition_distance_from_tRNA_sequence(const char * seq)
     return partition_distance(tRNA_sequence(), seq);
 }
 
-const char * fold_string(const char * seq)
+/* Grows the structure buffers so they hold a structure of length */
+static int reserve(fold_context * context, size_t length)
 {
-    char * struc;
-    struc = (char *) space(sizeof(char)*(strlen(seq)+1));
-    fold(seq, struc);
-    return struc;
+    char * structure;
+    char * other_structure;
+
+    if (length <= context->capacity) {
+        return 1;
+    }
+    structure = (char *) realloc(context->structure, length + 1);
+    if (structure == NULL) {
+        return 0;
+    }
+    context->structure = structure;
+    other_structure = (char *) realloc(context->other_structure, length + 1);
+    if (other_structure == NULL) {
+        return 0;
+    }
+    context->other_structure = other_structure;
+    context->capacity = length;
+    return 1;
 }
 
-int get_bp_distance(const char * seq1, const char * seq2)
+fold_context * fold_context_new()
 {
+    return (fold_context *) calloc(1, sizeof(fold_context));
+}
 
-   char *struct1,* struct2;
+void fold_context_free(fold_context * context)
+{
+    if (context == NULL) {
+        return;
+    }
+    free(context->structure);
+    free(context->other_structure);
+    free(context->target_structure);
+    free(context);
+}
 
-   struct1 = (char* ) space(sizeof(char)*(strlen(seq1)+1));
-   struct2 = (char* ) space(sizeof(char)*(strlen(seq2)+1));
+void fold_release_arrays()
+{
+    /* fold() allocates these again (at the needed size) on its next call */
+    free_arrays();
+}
 
-   fold(seq1, struct1);
-   fold(seq2, struct2);
-   free_arrays();
+const char * fold_context_fold(fold_context * context, const char * seq)
+{
+    if (!reserve(context, strlen(seq))) {
+        return NULL;
+    }
+    fold(seq, context->structure);
+    return context->structure;
+}
+
+int fold_context_distance(fold_context * context,
+                          const char * seq1, const char * seq2)
+{
+    size_t length1 = strlen(seq1);
+    size_t length2 = strlen(seq2);
 
-   return bp_distance(struct1, struct2);
+    if (!reserve(context, length1 > length2 ? length1 : length2)) {
+        return -1;
+    }
+    fold(seq1, context->structure);
+    fold(seq2, context->other_structure);
+    return bp_distance(context->structure, context->other_structure);
 }
 
-int get_bp_distance_from_tRNA(const char * seq)
+int fold_context_set_target_structure(fold_context * context,
+                                      const char * structure)
 {
-    return get_bp_distance(tRNA_sequence(), seq);
+    char * copy;
+
+    copy = (char *) malloc(strlen(structure) + 1);
+    if (copy == NULL) {
+        return 0;
+    }
+    strcpy(copy, structure);
+    free(context->target_structure);
+    context->target_structure = copy;
+    return 1;
+}
+
+int fold_context_set_target_sequence(fold_context * context, const char * seq)
+{
+    const char * structure = fold_context_fold(context, seq);
+
+    if (structure == NULL) {
+        return 0;
+    }
+    return fold_context_set_target_structure(context, structure);
+}
+
+int fold_context_distance_to_target(fold_context * context, const char * seq)
+{
+    const char * structure;
+
+    if (context->target_structure == NULL) {
+        return -1;
+    }
+    structure = fold_context_fold(context, seq);
+    if (structure == NULL) {
+        return -1;
+    }
+    return bp_distance(structure, context->target_structure);
+}
+
+/*
+ * The batch functions fold in parallel with OpenMP. An OpenMP build of
+ * Vienna keeps its folding arrays per thread (threadprivate), so each
+ * thread only needs its own structure buffer; each thread frees its
+ * arrays when the batch is done. A serial build shares one set of arrays
+ * between all threads, so its batches fold on one thread.
+ */
+int fold_threads_supported()
+{
+    return VIENNA_OPENMP;
+}
+
+static int usable_threads(int n_threads)
+{
+    return VIENNA_OPENMP ? n_threads : 1;
+}
+
+void fold_batch(const char ** seqs, char ** structures,
+                int count, int n_threads)
+{
+    int i;
+
+    #pragma omp parallel num_threads(usable_threads(n_threads))
+    {
+        #pragma omp for schedule(dynamic)
+        for (i = 0; i < count; i++) {
+            fold(seqs[i], structures[i]);
+        }
+        free_arrays();
+    }
+}
+
+int fold_context_distance_to_target_batch(fold_context * context,
+                                          const char ** seqs, int * distances,
+                                          int count, int n_threads)
+{
+    const char * target = context->target_structure;
+    size_t longest = 0;
+    int failed = 0;
+    int i;
+
+    if (target == NULL) {
+        return 0;
+    }
+    for (i = 0; i < count; i++) {
+        if (strlen(seqs[i]) > longest) {
+            longest = strlen(seqs[i]);
+        }
+    }
+    #pragma omp parallel num_threads(usable_threads(n_threads)) \
+        reduction(|:failed)
+    {
+        char * structure = (char *) malloc(longest + 1);
+
+        if (structure == NULL) {
+            failed = 1;
+        }
+        #pragma omp for schedule(dynamic)
+        for (i = 0; i < count; i++) {
+            if (structure == NULL) {
+                distances[i] = -1;
+                continue;
+            }
+            fold(seqs[i], structure);
+            distances[i] = bp_distance(structure, target);
+        }
+        free(structure);
+        free_arrays();
+    }
+    return !failed;
+}
+
+int get_bp_distance(const char * seq1, const char * seq2)
+{
+    fold_context * context;
+    int distance;
+
+    context = fold_context_new();
+    if (context == NULL) {
+        return -1;
+    }
+    distance = fold_context_distance(context, seq1, seq2);
+    fold_context_free(context);
+    return distance;
 }
 
 float partition_distance(const char *seq1, const char *seq2)
@@ -75,5 +253,6 @@ float partition_distance(const char *seq1, const char *seq2)
 
    profile_dist = profile_edit_distance(pf1, pf2);
    free_profile(pf1); free_profile(pf2);
+   free(struct1); free(struct2);
    return abs(profile_dist);
 }
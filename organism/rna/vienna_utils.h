@@ -4,6 +4,43 @@ const char* tRNA_sequence();
 float partition_distance_from_tRNA_sequence(const char * seq);
 float partition_distance(const char *, const char *);
 int get_bp_distance(const char * seq1, const char * seq2);
-int get_bp_distance_from_tRNA(const char * seq);
-const char * fold_string(const char * seq);
+
+/*
+ * A fold context owns the structure buffers used while folding (grown to
+ * the longest sequence seen, then reused) and an optional target
+ * structure, freed by fold_context_free.
+ * Vienna's folding arrays aren't the context's: the library keeps them
+ * (global to the process, or to the thread) between calls of every
+ * context, until fold_release_arrays.
+ * Structures returned by fold_context_fold belong to the context and are
+ * overwritten by its next fold. Failures return NULL, 0 or -1.
+ */
+typedef struct fold_context fold_context;
+fold_context * fold_context_new();
+void fold_context_free(fold_context * context);
+const char * fold_context_fold(fold_context * context, const char * seq);
+int fold_context_distance(fold_context * context,
+                          const char * seq1, const char * seq2);
+int fold_context_set_target_structure(fold_context * context,
+                                      const char * structure);
+int fold_context_set_target_sequence(fold_context * context,
+                                     const char * seq);
+int fold_context_distance_to_target(fold_context * context,
+                                    const char * seq);
+void fold_release_arrays();
+
+/*
+ * Fold count sequences with n_threads OpenMP threads. That needs a
+ * ViennaRNA built with OpenMP (keeping its folding arrays per thread),
+ * which the Makefile detects and passes as VIENNA_OPENMP; without it the
+ * batches fold on one thread whatever n_threads is, and
+ * fold_threads_supported returns 0. fold_batch writes into structures
+ * allocated by the caller to the length of each sequence plus one.
+ */
+int fold_threads_supported();
+void fold_batch(const char ** seqs, char ** structures,
+                int count, int n_threads);
+int fold_context_distance_to_target_batch(fold_context * context,
+                                          const char ** seqs, int * distances,
+                                          int count, int n_threads);
 #endif
@@ -1,6 +1,7 @@
 """
 Generic Tests for all Organism Classes.
 """
+import pickle
 
 
 class MixinTestOrganism(object):
@@ -58,6 +59,29 @@ class MixinTestOrganism(object):
         g_ = g0.mutate()
         self.assertEqual(g0.self_id, g_.parent_id)
 
+    def test_ids(self):
+        g0 = self.Organism(self.value_0)
+        g_ = g0.mutate()
+        self.assertIsInstance(g0.self_id, (int, long))
+        self.assertGreater(g_.self_id, g0.self_id)
+        self.assertIsNone(g0.parent_id)
+
+    def test_slots(self):
+        org = self.Organism(self.value_0)
+        self.assertFalse(hasattr(org, "__dict__"))
+        with self.assertRaises(TypeError):
+            self.Organism(self.value_0, unknown=True)
+
+    def test_pickle(self):
+        org = self.Organism(self.value_0).mutate()
+        org.fitness
+        for protocol in (0, 2):
+            copy = pickle.loads(pickle.dumps(org, protocol))
+            self.assertEqual(copy, org)
+            self.assertEqual(copy.self_id, org.self_id)
+            self.assertEqual(copy.parent_id, org.parent_id)
+            self.assertEqual(copy.fitness, org.fitness)
+
 
 class MixinTestModule(object):
     def test_default_organism(self):
@@ -0,0 +1,180 @@
+"""
+A population stored as its distinct genotypes with the number of
+individuals carrying each, rather than one entry per individual.
+
+Organisms with equal values are the same genotype (organisms hash and
+compare by value), one organism standing for all of its copies, so its
+cached fitness is shared by them. Iterating, len and indexing behave as
+for the expanded list of individuals (genotypes in the order they were
+first added), which is all MetaPopulation migration needs.
+"""
+import bisect
+import random
+from collections import OrderedDict
+import numpy
+from structure_and_landscapes.utility import selection
+from structure_and_landscapes.organism.abstract_organism import \
+    evaluate_fitness_batch
+from population import SELECTION_MODELS
+
+
+class CompressedPopulation(object):
+    def __init__(self, init_pop, mutation_rate=1.0, carrying_capacity=None,
+                 selection_model="Moran"):
+        self.counts = OrderedDict()
+        self._size = 0
+        self._index = None
+        self._add_counts((org, 1) for org in init_pop)
+        if carrying_capacity is None:
+            self.carrying_capacity = len(self)
+        else:
+            self.carrying_capacity = carrying_capacity
+        self.mutation_rate = mutation_rate
+        if selection_model not in SELECTION_MODELS:
+            raise ValueError("Not a valid selection model")
+        self.selection_model = selection_model
+
+    @classmethod
+    def from_counts(cls, counts, mutation_rate=1.0, carrying_capacity=None,
+                    selection_model="Moran"):
+        """
+        Makes a population from (org, count) pairs.
+        """
+        population = cls([], mutation_rate=mutation_rate,
+                         carrying_capacity=carrying_capacity,
+                         selection_model=selection_model)
+        population._add_counts(counts)
+        if carrying_capacity is None:
+            population.carrying_capacity = len(population)
+        return population
+
+    def __iter__(self):
+        for org, count in self.counts.items():
+            for _ in range(count):
+                yield org
+
+    def __len__(self):
+        return self._size
+
+    def _genotype_at(self, key):
+        """
+        Returns the genotype of the key'th individual.
+        """
+        if self._index is None:
+            self._index = (list(self.counts),
+                           numpy.cumsum(list(self.counts.values())).tolist())
+        genotypes, cumulative_counts = self._index
+        if key < 0:
+            key += self._size
+        if not 0 <= key < self._size:
+            raise IndexError("Population index out of range")
+        return genotypes[bisect.bisect_right(cumulative_counts, key)]
+
+    def __getitem__(self, key):
+        return self._genotype_at(key)
+
+    def __setitem__(self, key, item):
+        self.replace([key], [item])
+
+    def replace(self, indices, orgs):
+        """
+        Puts each of orgs in place of the individual at the index paired
+        with it (the last of the orgs paired with an index repeated is the
+        one kept). Writing one at a time would renumber the individuals
+        after each write, so the individuals replaced are all found before
+        any is.
+        """
+        latest = OrderedDict()
+        for index, org in zip(indices, orgs):
+            latest[index + self._size if index < 0 else index] = org
+        replaced = [self._genotype_at(index) for index in latest]
+        orgs = list(latest.values())
+        for org in replaced:
+            if self.counts[org] == 1:
+                del self.counts[org]
+            else:
+                self.counts[org] -= 1
+        self._size -= len(replaced)
+        self._add_counts((org, 1) for org in orgs)
+
+    def _add_counts(self, counts):
+        for org, count in counts:
+            if count:
+                self.counts[org] = self.counts.get(org, 0) + count
+                self._size += count
+        self._index = None
+
+    def _replace_counts(self, counts):
+        self.counts = OrderedDict()
+        self._size = 0
+        self._add_counts(counts)
+
+    def number_of_genotypes(self):
+        return len(self.counts)
+
+    def is_full(self):
+        return len(self) == self.carrying_capacity
+
+    def replicate(self):
+        """
+        Creates one mutant for every member of the population
+        and adds them to the population
+        """
+        mutants = [org.mutate() for org in self]
+        evaluate_fitness_batch(mutants)
+        self._add_counts((mutant, 1) for mutant in mutants)
+
+    def remove_at_random(self):
+        """
+        Keeps carrying_capacity orgs drawn at random (without replacement,
+        as for a Population). The number kept of each genotype is drawn
+        from those left to keep among the orgs of the genotypes after it.
+        """
+        if len(self) > self.carrying_capacity:
+            random_state = numpy.random.RandomState(random.getrandbits(32))
+            to_keep = self.carrying_capacity
+            others = len(self)
+            kept = []
+            for org, count in self.counts.items():
+                others -= count
+                number_kept = 0
+                if to_keep:
+                    number_kept = random_state.hypergeometric(
+                        count, others, to_keep)
+                kept.append((org, int(number_kept)))
+                to_keep -= number_kept
+            self._replace_counts(kept)
+
+    def remove_least_fit(self):
+        survivors = selection.select(list(self), self.carrying_capacity)
+        self._replace_counts((org, 1) for org in survivors)
+
+    def moran_selection(self):
+        """
+        Moran needs a death and a birth per individual, so the individuals
+        are expanded for the generation (and compressed again after).
+        """
+        orgs = selection.moran_death_birth(
+            list(self), mutation_rate=self.mutation_rate,
+            desired_number_of_orgs=self.carrying_capacity)
+        self._replace_counts((org, 1) for org in orgs)
+
+    def wright_fisher_selection(self):
+        self._replace_counts(selection.wright_fisher_counts(
+            self.counts, self.mutation_rate, self.carrying_capacity))
+
+    def advance_generation(self):
+        if self.selection_model == "Wright-Fisher":
+            self.wright_fisher_selection()
+        else:
+            self.moran_selection()
+
+    def add_to_pop(self, org):
+        self._add_counts([(org, 1)])
+
+    def max_fitness(self):
+        return max([org.fitness for org in self.counts])
+
+    def mean_fitness(self):
+        total = sum(org.fitness * count for org, count in self.counts.items())
+        return float(total) / len(self)
@@ -0,0 +1,150 @@
+"""
+Shared memory holding the organisms of every subpopulation of a meta
+population, so that processes can read and copy them without pickling.
+
+Every subpopulation has a region of deme_capacity slots and every slot
+a fixed width row: the genome (a bitstring packed into bytes), the
+fitness and the ids of the organism and of its parent. Migrating is then
+a copy of rows between regions.
+
+The arrays are allocated once (multiprocessing RawArrays, shared with
+the worker processes forked after), so the memory taken is known, and
+can be bounded, before a run starts. Only Bitstring organisms (and NK
+organisms) with integer ids can be stored.
+"""
+import ctypes
+import multiprocessing.sharedctypes
+import numpy
+from structure_and_landscapes.organism.bitstring.bitstring import \
+    as_byte_matrix, from_byte_matrix
+
+# parent_id of organisms without a parent
+NO_ID = -1
+
+# Slots organisms of a landscape share (the others follow from the value)
+SHARED_SLOTS = ("nk_model",)
+
+
+def _shared_array(ctype, dtype, shape):
+    size = int(numpy.prod(shape))
+    raw = multiprocessing.sharedctypes.RawArray(ctype, max(size, 1))
+    return numpy.frombuffer(raw, dtype=dtype)[:size].reshape(shape)
+
+
+class GenomeArena(object):
+    def __init__(self, number_of_demes, deme_capacity, genome_length,
+                 max_bytes=None):
+        """
+        Allocates deme_capacity slots for each of number_of_demes
+        subpopulations of organisms with genome_length bits, raising
+        ValueError if that takes more than max_bytes.
+        """
+        needed = self.bytes_needed(number_of_demes, deme_capacity,
+                                   genome_length)
+        if max_bytes is not None and needed > max_bytes:
+            raise ValueError(
+                "The genome arena needs {} bytes, more than {}".format(
+                    needed, max_bytes))
+        self.deme_capacity = deme_capacity
+        self.genome_length = genome_length
+        self.row_width = (genome_length + 7) // 8
+        shape = (number_of_demes, deme_capacity)
+        self.genomes = _shared_array(ctypes.c_uint8, numpy.uint8,
+                                     shape + (self.row_width,))
+        self.fitnesses = _shared_array(ctypes.c_double, numpy.float64, shape)
+        self.self_ids = _shared_array(ctypes.c_int64, numpy.int64, shape)
+        self.parent_ids = _shared_array(ctypes.c_int64, numpy.int64, shape)
+        self.sizes = _shared_array(ctypes.c_int64, numpy.int64,
+                                   (number_of_demes,))
+        self.nbytes = needed
+        # type and SHARED_SLOTS of the organisms, to rebuild them
+        self._organism_type = None
+        self._shared_state = {}
+
+    @staticmethod
+    def bytes_needed(number_of_demes, deme_capacity, genome_length):
+        """
+        Bytes taken by an arena of these dimensions
+        """
+        row_bytes = (genome_length + 7) // 8 + 3 * 8
+        return number_of_demes * (deme_capacity * row_bytes + 8)
+
+    @classmethod
+    def for_meta_population(cls, meta_population, max_bytes=None):
+        """
+        Makes an arena fitting the subpopulations of meta_population (each
+        up to its carrying capacity) and writes them into it.
+        """
+        capacity = max(max(len(pop), getattr(pop, "carrying_capacity", 0))
+                       for pop in meta_population)
+        genome_length = len(next(iter(meta_population[0])).value)
+        arena = cls(len(meta_population), capacity, genome_length,
+                    max_bytes=max_bytes)
+        for deme, pop in enumerate(meta_population):
+            arena.write_deme(deme, pop)
+        return arena
+
+    def __len__(self):
+        return len(self.sizes)
+
+    def write_deme(self, deme, orgs):
+        """
+        Replaces the region of deme with orgs.
+        """
+        orgs = list(orgs)
+        if len(orgs) > self.deme_capacity:
+            raise ValueError("More orgs than slots for the subpopulation")
+        if orgs and self._organism_type is None:
+            self._organism_type = type(orgs[0])
+            self._shared_state = dict(
+                (name, getattr(orgs[0], name)) for name in SHARED_SLOTS
+                if hasattr(orgs[0], name))
+        size = len(orgs)
+        self.genomes[deme, :size] = as_byte_matrix(
+            (org.value for org in orgs), self.genome_length)
+        self.fitnesses[deme, :size] = [org.fitness for org in orgs]
+        self.self_ids[deme, :size] = [org.self_id for org in orgs]
+        self.parent_ids[deme, :size] = [
+            NO_ID if org.parent_id is None else org.parent_id
+            for org in orgs]
+        self.sizes[deme] = size
+
+    def read_org(self, deme, slot):
+        """
+        Returns a new organism from a slot of deme (its fitness already
+        known).
+        """
+        if not 0 <= slot < self.sizes[deme]:
+            raise IndexError("Slot out of range of the subpopulation")
+        value, = from_byte_matrix(self.genomes[deme, slot:slot + 1],
+                                  self.genome_length)
+        parent_id = int(self.parent_ids[deme, slot])
+        state = dict(self._shared_state,
+                     value=value,
+                     _fitness=float(self.fitnesses[deme, slot]),
+                     self_id=int(self.self_ids[deme, slot]),
+                     parent_id=None if parent_id == NO_ID else parent_id)
+        org = self._organism_type.__new__(self._organism_type)
+        org.__setstate__(state)
+        return org
+
+    def read_deme(self, deme):
+        """
+        Returns new organisms for all of deme's slots.
+        """
+        return [self.read_org(deme, slot)
+                for slot in range(self.sizes[deme])]
+
+    def copy_rows(self, moves):
+        """
+        Copies rows for each (source deme, source slot, dest deme, dest slot)
+        of moves (each dest slot at most once). Rows are all read before
+        any is written.
+        """
+        if not moves:
+            return
+        source_demes, source_slots, dest_demes, dest_slots = (
+            numpy.array(column, dtype=numpy.intp) for column in zip(*moves))
+        for array in (self.genomes, self.fitnesses, self.self_ids,
+                      self.parent_ids):
+            array[dest_demes, dest_slots] = array[source_demes, source_slots]
@@ -10,24 +10,47 @@ experiencing a migration event
 
 Proportion of population migrated is proportion of
 population duplicated from the source subpopulation on top of the
-destination subpopulation in each migration event
+destination subpopulation in each migration event (the Proportion
+migration model). With the Binomial model each org of the source
+migrates with that probability instead, and with the Poisson model the
+number of migrants is Poisson distributed around the proportion.
+
+All of a generation's migrations are drawn at once, and migrants are
+copied from the subpopulations as they were before any of them. An org
+drawn to be replaced by several migrants (as when several subpopulations
+migrate to the same neighbor) is replaced by the last of them only.
 
 Migrations in the MetaPopulation are not localized, populations
 have no spatial nearness.
 """
 
 import random
+from collections import OrderedDict
+import numpy
 from structure_and_landscapes.utility.selection import select
 from population import Population
-from neighborhood import nearest_4_neighbors_by_linear_position
+from topology import Topology
+
+
+MIGRATION_MODELS = ("Proportion", "Binomial", "Poisson")
 
 
 class MetaPopulation(object):
+    # Meta populations pickled before there were migration models
+    migration_model = "Proportion"
+
     def __init__(self, sub_populations, migration_rate,
-                 proportion_of_pop_migrated):
+                 proportion_of_pop_migrated, migration_model="Proportion"):
+        """
+        migration_model picks how many orgs each migration moves, one of
+        MIGRATION_MODELS.
+        """
         self.list_of_populations = list(sub_populations)
         self.mig_rate = migration_rate
         self.prop_miged = proportion_of_pop_migrated
+        if migration_model not in MIGRATION_MODELS:
+            raise ValueError("Not a valid migration model")
+        self.migration_model = migration_model
 
     def __iter__(self):
         return iter(self.list_of_populations)
@@ -40,32 +63,81 @@ class MetaPopulation(object):
 
     def migrate(self):
         """
-        Perform migrations in population
+        Perform migrations in population (those of migration_plan, each
+        org replaced at most once)
         """
-        number_migrating_pops = int(
-            self.mig_rate * len(self.list_of_populations))
+        source_pops, source_indices, dest_pops, dest_indices = (
+            column.tolist() for column in self.migration_plan())
+        migrants = [self.list_of_populations[pop][index]
+                    for pop, index in zip(source_pops, source_indices)]
+        replace_in_each(self.list_of_populations,
+                        zip(dest_pops, dest_indices, migrants))
 
-        source_pops = random.sample(
-            self.list_of_populations,
-            number_migrating_pops)
+    def migration_pairs(self, random_state=None):
+        """
+        Returns the (source, dest) subpopulation indices of this
+        generation's migrations
+        random_state is a numpy RandomState (seeded from random if None).
+        """
+        if random_state is None:
+            random_state = numpy.random.RandomState(random.getrandbits(32))
+        number_of_pops = len(self.list_of_populations)
+        number_migrating_pops = int(self.mig_rate * number_of_pops)
+        source_pop_indices = random_state.choice(
+            number_of_pops, number_migrating_pops, replace=False)
+        dest_pop_indices = random_state.choice(
+            number_of_pops, number_migrating_pops, replace=False)
+        return list(zip(source_pop_indices.tolist(),
+                        dest_pop_indices.tolist()))
 
-        dest_pops = random.sample(
-            self.list_of_populations, number_migrating_pops)
-        for source, dest in zip(source_pops, dest_pops):
-            self.subpop_migrate(source, dest)
+    def migration_plan(self, sizes=None):
+        """
+        Draws all of this generation's migrations, returning arrays of the
+        source subpopulation, source org index, dest subpopulation and
+        dest org index of every migrant.
+        No dest org is replaced twice: of the migrants drawn to the same
+        dest org, only the last drawn is in the plan (every backend
+        migrating by the plan resolves such collisions the same way).
+        sizes are the numbers of orgs in the subpopulations (their
+        lengths if None).
+        """
+        if sizes is None:
+            sizes = [len(pop) for pop in self.list_of_populations]
+        sizes = numpy.asarray(sizes, dtype=numpy.intp)
+        random_state = numpy.random.RandomState(random.getrandbits(32))
+        pairs = numpy.array(self.migration_pairs(random_state),
+                            dtype=numpy.intp).reshape(-1, 2)
+        source_pops, dest_pops = pairs[:, 0], pairs[:, 1]
+        source_sizes, dest_sizes = sizes[source_pops], sizes[dest_pops]
+        if self.migration_model == "Binomial":
+            counts = random_state.binomial(source_sizes, self.prop_miged)
+        elif self.migration_model == "Poisson":
+            counts = random_state.poisson(self.prop_miged * source_sizes)
+        else:
+            counts = (self.prop_miged * source_sizes).astype(numpy.intp)
+        counts = numpy.minimum(numpy.minimum(counts, source_sizes),
+                               dest_sizes)
+        plan = (numpy.repeat(source_pops, counts),
+                _sample_each(source_sizes, counts, random_state),
+                numpy.repeat(dest_pops, counts),
+                _sample_each(dest_sizes, counts, random_state))
+        last = _last_of_each(plan[2] * (int(sizes.max()) + 1) + plan[3])
+        return tuple(column[last] for column in plan)
 
     def subpop_migrate(self, source, dest):
         """
         Performs a migration (between two subpopulations)
         from source to dest
         """
-        number_migrating_orgs = int(self.prop_miged * len(source))
-        source_indices = random.sample(
-            list(range(len(source))), number_migrating_orgs)
-        dest_indices = random.sample(
-            list(range(len(dest))), number_migrating_orgs)
-        for source_index, dest_index in zip(source_indices, dest_indices):
-            dest[dest_index] = source[source_index]
+        random_state = numpy.random.RandomState(random.getrandbits(32))
+        number_migrating_orgs = min(int(self.prop_miged * len(source)),
+                                    len(dest))
+        source_indices = random_state.choice(
+            len(source), number_migrating_orgs, replace=False)
+        dest_indices = random_state.choice(
+            len(dest), number_migrating_orgs, replace=False)
+        migrants = [source[index] for index in source_indices.tolist()]
+        dest.replace(dest_indices.tolist(), migrants)
 
     def replicate(self):
         for pop in self.list_of_populations:
@@ -85,7 +157,8 @@ class MetaPopulation(object):
             pop.moran_selection()
 
     def advance_generation(self):
-        self.moran_cull()
+        for pop in self.list_of_populations:
+            pop.advance_generation()
         self.migrate()
 
     def max_fitness(self):
@@ -99,34 +172,129 @@ class MetaPopulation(object):
 class StructuredPopulation(MetaPopulation):
     """
     Very similar to the MetaPopulation, except that the subpopulations
-    are arranged in a grid and that migrations are limited
-    to the nearest four neighbors.
+    are arranged in a topology (by default a grid) and that migrations
+    are limited to neighbors (by default the nearest four).
     """
     def __init__(self, sub_populations, migration_rate,
-                 proportion_of_pop_migrated, width, height):
+                 proportion_of_pop_migrated, width=None, height=None,
+                 topology=None, migration_model="Proportion"):
+        """
+        topology is a Topology of the subpopulations, the nearest four
+        neighbors on a width by height grid when None.
+        """
         super(StructuredPopulation, self).__init__(
-            sub_populations, migration_rate, proportion_of_pop_migrated)
-        self.width = int(width)
-        self.height = int(height)
-        assert(self.width > 1)
-        assert(self.height > 0)
-        assert(self.height * self.width == len(self.list_of_populations))
+            sub_populations, migration_rate, proportion_of_pop_migrated,
+            migration_model)
+        if topology is None:
+            self.width = int(width)
+            self.height = int(height)
+            assert(self.width > 1)
+            assert(self.height > 0)
+            assert(self.height * self.width == len(self.list_of_populations))
+            topology = Topology.grid_4(self.width, self.height)
+        else:
+            self.width = width
+            self.height = height
+        assert(len(topology) == len(self.list_of_populations))
+        self.topology = topology
 
-    def migrate(self):
+    def __setstate__(self, state):
         """
-        Perform migrations in population
+        Structured populations pickled before topologies were on a grid.
         """
-        number_migrating_pops = int(
-            self.mig_rate * len(self.list_of_populations))
+        self.__dict__.update(state)
+        if "topology" not in state:
+            self.topology = Topology.grid_4(self.width, self.height)
 
-        source_pop_indices = random.sample(
-            list(range(len(self.list_of_populations))),
-            number_migrating_pops)
+    def migration_pairs(self, random_state=None):
+        """
+        Returns the (source, dest) subpopulation indices of this
+        generation's migrations, each to one of the source's neighbors
+        random_state is a numpy RandomState (seeded from random if None).
+        """
+        if random_state is None:
+            random_state = numpy.random.RandomState(random.getrandbits(32))
+        number_of_pops = len(self.list_of_populations)
+        number_migrating_pops = int(self.mig_rate * number_of_pops)
+        source_pop_indices = random_state.choice(
+            number_of_pops, number_migrating_pops, replace=False)
+        dest_pop_indices = self.topology.choose_neighbors(
+            source_pop_indices, random_state)
+        return list(zip(source_pop_indices.tolist(),
+                        dest_pop_indices.tolist()))
 
-        for source_pop_index in source_pop_indices:
-            neighbors = nearest_4_neighbors_by_linear_position(
-                self.width, self.height, source_pop_index)
-            dest_pop_index = random.choice(neighbors)
-            source_pop = self.list_of_populations[source_pop_index]
-            dest_pop = self.list_of_populations[dest_pop_index]
-            self.subpop_migrate(source_pop, dest_pop)
+
+def replace_in_each(populations, replacements):
+    """
+    Replaces orgs for each (population, index, org) of replacements, the
+    replacements in each of populations (indexed by population) made at
+    once, as writes to a compressed population renumber its orgs. The
+    last of the replacements of the same org is the one kept.
+    """
+    by_population = OrderedDict()
+    for pop, index, org in replacements:
+        indices, orgs = by_population.setdefault(pop, ([], []))
+        indices.append(index)
+        orgs.append(org)
+    for pop, (indices, orgs) in by_population.items():
+        populations[pop].replace(indices, orgs)
+
+
+def _last_of_each(keys):
+    """
+    Returns the positions of the last occurrence of each of keys, in
+    order.
+    """
+    _, first_reversed = numpy.unique(keys[::-1], return_index=True)
+    return numpy.sort(len(keys) - 1 - first_reversed)
+
+
+def _sample_each(sizes, counts, random_state):
+    """
+    Draws counts[i] distinct indices below sizes[i] for every i, returning
+    them all in one array (those for i = 0 first), in work proportional
+    to the number of indices drawn.
+    """
+    sizes = numpy.asarray(sizes, dtype=numpy.intp)
+    counts = numpy.asarray(counts, dtype=numpy.intp)
+    samples = numpy.empty(counts.sum(), dtype=numpy.intp)
+    starts = numpy.cumsum(counts) - counts
+    # Groups drawing more than half their indices take the first counts of
+    # a permutation (at most twice the indices drawn), the others redraw
+    # repeated indices (each draw repeats with probability under a half)
+    dense = 2 * counts > sizes
+    if dense.any():
+        dense_sizes, dense_counts = sizes[dense], counts[dense]
+        groups = numpy.repeat(numpy.arange(len(dense_sizes)), dense_sizes)
+        offsets = _ranges(numpy.zeros_like(dense_sizes), dense_sizes)
+        # Sorting each group's indices by a random key (in [0, 1) added to
+        # the group) permutes them
+        order = numpy.argsort(groups + random_state.random_sample(
+            len(groups)))
+        first = offsets < dense_counts[groups]
+        samples[_ranges(starts[dense], dense_counts)] = (
+            order - (numpy.cumsum(dense_sizes) - dense_sizes)[groups])[first]
+    sparse = ~dense
+    positions = _ranges(starts[sparse], counts[sparse])
+    groups = numpy.repeat(numpy.flatnonzero(sparse), counts[sparse])
+    values = numpy.empty(len(groups), dtype=numpy.intp)
+    pending = numpy.arange(len(groups))
+    largest = int(sizes.max()) if len(sizes) else 0
+    while len(pending):
+        values[pending] = (random_state.random_sample(len(pending)) *
+                           sizes[groups[pending]]).astype(numpy.intp)
+        order = numpy.argsort(groups.astype(numpy.int64) * largest + values,
+                              kind="mergesort")
+        repeats = ((values[order[1:]] == values[order[:-1]]) &
+                   (groups[order[1:]] == groups[order[:-1]]))
+        pending = numpy.sort(order[1:][repeats])
+    samples[positions] = values
+    return samples
+
+
+def _ranges(starts, lengths):
+    """
+    Concatenates range(start, start + length) for each start and length.
+    """
+    return (numpy.arange(lengths.sum(), dtype=numpy.intp) +
+            numpy.repeat(starts - (numpy.cumsum(lengths) - lengths), lengths))
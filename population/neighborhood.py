@@ -23,7 +23,7 @@ def convert_linear_ordering_to_coordinate_pair(
     Converts a single dimensional position to a 2 dimensional
     coordinate pair
     """
-    return (position % grid_width, position / grid_width)
+    return (position % grid_width, position // grid_width)
 
 
 def convert_coordinate_pair_to_linear_ordering(grid_width, x, y):
@@ -0,0 +1,297 @@
+"""
+Advances the subpopulations of a MetaPopulation in worker processes.
+
+Subpopulations are independent between migrations, so each worker owns
+a share of them for the whole run and advances them in parallel; only
+migrants go through this process, which draws the migrations just as
+the MetaPopulation would.
+
+Every subpopulation has its own random state and its own organism ids
+(the k'th of n subpopulations counts k, k + n, k + 2n, ... from the
+first free id), so a run depends on its seed but not on the number of
+workers. With no workers the subpopulations are advanced in this
+process.
+
+Given a GenomeArena, the subpopulations are also written to shared
+memory after every generation and migrating copies rows of the arena,
+the workers only being told which slots to read back (rather than
+being sent the pickled migrants).
+
+Fitness has to be the same whichever process evaluates it: landscapes
+drawing contributions as genotypes are first seen (lazy NK tables)
+can't be shared between workers.
+"""
+import multiprocessing
+import random
+from structure_and_landscapes.organism import abstract_organism
+from meta_population import replace_in_each
+
+
+class _Deme(object):
+    """
+    A subpopulation with its random state and organism ids
+    """
+    def __init__(self, population, seed, first_id, id_step):
+        self.population = population
+        self.random_state = random.Random(seed).getstate()
+        self.next_id = first_id
+        self.id_step = id_step
+
+    def advance_generation(self):
+        outer_state = random.getstate()
+        random.setstate(self.random_state)
+        abstract_organism.reset_organism_ids(self.next_id, self.id_step)
+        try:
+            self.population.advance_generation()
+        finally:
+            self.next_id = abstract_organism.next_organism_id()
+            self.random_state = random.getstate()
+            random.setstate(outer_state)
+
+
+def _populations(demes):
+    return dict((index, deme.population) for index, deme in demes.items())
+
+
+def _run_command(demes, arena, command, argument):
+    """
+    Runs command on demes (a dict of _Deme by subpopulation index) and
+    their arena (None without one)
+    """
+    if command == "advance":
+        for index, deme in demes.items():
+            deme.advance_generation()
+            if arena is not None:
+                arena.write_deme(index, deme.population)
+        return dict((index, len(deme.population))
+                    for index, deme in demes.items())
+    elif command == "take":
+        return [demes[index].population[org_index]
+                for index, org_index in argument]
+    elif command == "put":
+        replace_in_each(_populations(demes), argument)
+    elif command == "read":
+        replace_in_each(_populations(demes),
+                        [(index, org_index, arena.read_org(index, org_index))
+                         for index, org_index in argument])
+    elif command == "call":
+        return dict((index, getattr(deme.population, argument)())
+                    for index, deme in demes.items())
+    elif command == "map":
+        return dict((index, argument(deme.population))
+                    for index, deme in demes.items())
+    elif command == "close":
+        return demes
+    else:
+        raise ValueError("Unknown command {}".format(command))
+
+
+def _worker(connection, demes, arena):
+    while True:
+        command, argument = connection.recv()
+        try:
+            connection.send(
+                (None, _run_command(demes, arena, command, argument)))
+        except Exception as error:
+            connection.send((error, None))
+        if command == "close":
+            connection.close()
+            return
+
+
+class _LocalShard(object):
+    """
+    Runs the commands of a shard in this process
+    """
+    def __init__(self, demes, arena):
+        self.demes = demes
+        self.arena = arena
+
+    def send(self, command, argument=None):
+        self._result = _run_command(self.demes, self.arena, command,
+                                    argument)
+
+    def receive(self):
+        return self._result
+
+    def join(self):
+        pass
+
+
+class _WorkerShard(object):
+    """
+    Runs the commands of a shard in a worker process
+    """
+    def __init__(self, demes, arena):
+        self.connection, worker_connection = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(
+            target=_worker, args=(worker_connection, demes, arena))
+        self.process.daemon = True
+        self.process.start()
+        worker_connection.close()
+
+    def send(self, command, argument=None):
+        self.connection.send((command, argument))
+
+    def receive(self):
+        error, result = self.connection.recv()
+        if error is not None:
+            raise error
+        return result
+
+    def join(self):
+        self.connection.close()
+        self.process.join()
+
+
+class ParallelMetaPopulation(object):
+    def __init__(self, meta_population, workers=0, seed=None, arena=None):
+        """
+        Shares the subpopulations of meta_population (a MetaPopulation
+        or StructuredPopulation, which still draws the migrations) among
+        workers processes (0 advances them in this process).
+        seed seeds the random state of every subpopulation (drawn from
+        random when None).
+        arena is a GenomeArena holding the subpopulations (as from
+        GenomeArena.for_meta_population) to migrate through.
+        close() must be called to get the subpopulations back.
+        """
+        if workers < 0:
+            raise ValueError("The number of workers can't be negative")
+        self.meta_population = meta_population
+        self.arena = arena
+        if seed is None:
+            seed = random.getrandbits(32)
+        seeds = random.Random(seed)
+        first_id = abstract_organism.next_organism_id()
+        number_of_pops = len(meta_population)
+        demes = [_Deme(pop, seeds.getrandbits(32), first_id + index,
+                       number_of_pops)
+                 for index, pop in enumerate(meta_population)]
+        self._sizes = [len(pop) for pop in meta_population]
+        number_of_shards = min(workers, number_of_pops) or 1
+        self._shard_of = [index % number_of_shards
+                          for index in range(number_of_pops)]
+        shard_demes = [dict((index, deme) for index, deme in enumerate(demes)
+                            if self._shard_of[index] == shard)
+                       for shard in range(number_of_shards)]
+        if workers:
+            self._shards = [_WorkerShard(shard, arena)
+                            for shard in shard_demes]
+        else:
+            self._shards = [_LocalShard(shard, arena)
+                            for shard in shard_demes]
+
+    def __len__(self):
+        return len(self._sizes)
+
+    def _broadcast(self, command, argument=None):
+        """
+        Runs command on every shard, returning the merged dicts of results
+        """
+        for shard in self._shards:
+            shard.send(command, argument)
+        results = {}
+        for shard in self._shards:
+            results.update(shard.receive())
+        return results
+
+    def _scatter(self, command, arguments):
+        """
+        Runs command on each shard with its list of arguments (arguments
+        is a list of (shard, argument) pairs), returning the results of
+        each shard
+        """
+        by_shard = [[] for _ in self._shards]
+        for shard, argument in arguments:
+            by_shard[shard].append(argument)
+        for shard, shard_arguments in zip(self._shards, by_shard):
+            shard.send(command, shard_arguments)
+        return [shard.receive() for shard in self._shards]
+
+    def advance_generation(self):
+        sizes = self._broadcast("advance")
+        self._sizes = [sizes[index] for index in range(len(self))]
+        self.migrate()
+
+    def migrate(self):
+        """
+        Draws the migrations of the meta population and moves only the
+        migrants between the workers.
+        """
+        source_pops, source_indices, dest_pops, dest_indices = (
+            column.tolist()
+            for column in self.meta_population.migration_plan(self._sizes))
+        moves = list(zip(dest_pops, dest_indices,
+                         zip(source_pops, source_indices)))
+        if not moves:
+            return
+        if self.arena is not None:
+            self._migrate_in_arena(moves)
+            return
+        origins = sorted(set(origin for _, _, origin in moves))
+        taken = self._scatter("take", [(self._shard_of[origin[0]], origin)
+                                       for origin in origins])
+        positions = [0] * len(self._shards)
+        migrants = {}
+        for origin in origins:
+            shard = self._shard_of[origin[0]]
+            migrants[origin] = taken[shard][positions[shard]]
+            positions[shard] += 1
+        self._scatter("put", [(self._shard_of[dest],
+                               (dest, dest_index, migrants[origin]))
+                              for dest, dest_index, origin in moves])
+
+    def _migrate_in_arena(self, moves):
+        """
+        Copies the rows of the migrants (moved to distinct slots, as
+        planned) and has the workers read them.
+        """
+        self.arena.copy_rows([origin + (dest, dest_index)
+                              for dest, dest_index, origin in moves])
+        self._scatter("read", [(self._shard_of[dest], (dest, dest_index))
+                               for dest, dest_index, _ in sorted(moves)])
+
+    def _deme_fitnesses(self):
+        if self.arena is not None:
+            return [self.arena.fitnesses[index, :self.arena.sizes[index]]
+                    for index in range(len(self))]
+        return None
+
+    def max_fitness(self):
+        fitnesses = self._deme_fitnesses()
+        if fitnesses is not None:
+            return max(float(deme.max()) for deme in fitnesses)
+        return max(self._broadcast("call", "max_fitness").values())
+
+    def mean_fitness(self):
+        fitnesses = self._deme_fitnesses()
+        if fitnesses is not None:
+            fits = [float(deme.mean()) for deme in fitnesses]
+        else:
+            fits = list(self._broadcast("call", "mean_fitness").values())
+        return float(sum(fits)) / len(fits)
+
+    def map_demes(self, function):
+        """
+        Returns function (picklable, as a module level function) applied
+        to each subpopulation in the workers, in subpopulation order.
+        """
+        results = self._broadcast("map", function)
+        return [results[index] for index in range(len(self))]
+
+    def close(self):
+        """
+        Stops the workers and puts the advanced subpopulations back in
+        the meta population, which is returned.
+        """
+        demes = self._broadcast("close")
+        for shard in self._shards:
+            shard.join()
+        self._shards = []
+        self.meta_population.list_of_populations = [
+            demes[index].population for index in range(len(self))]
+        # Later organisms get ids none of the subpopulations gave
+        abstract_organism.reset_organism_ids(
+            max(deme.next_id for deme in demes.values()))
+        return self.meta_population
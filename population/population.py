@@ -8,16 +8,29 @@ Updates should:
 
 import random
 from structure_and_landscapes.utility import selection
+from structure_and_landscapes.organism.abstract_organism import \
+    evaluate_fitness_batch
+
+
+SELECTION_MODELS = ("Moran", "Wright-Fisher")
 
 
 class Population(object):
-    def __init__(self, init_pop, mutation_rate=1.0, carrying_capacity=None):
+    def __init__(self, init_pop, mutation_rate=1.0, carrying_capacity=None,
+                 selection_model="Moran"):
+        """
+        selection_model picks how advance_generation reproduces, one of
+        SELECTION_MODELS.
+        """
         self.population = list(init_pop)
         if carrying_capacity is None:
             self.carrying_capacity = len(self.population)
         else:
             self.carrying_capacity = carrying_capacity
         self.mutation_rate = mutation_rate
+        if selection_model not in SELECTION_MODELS:
+            raise ValueError("Not a valid selection model")
+        self.selection_model = selection_model
 
     def __iter__(self):
         return iter(self.population)
@@ -31,6 +44,14 @@ class Population(object):
     def __setitem__(self, key, item):
         self.population[key] = item
 
+    def replace(self, indices, orgs):
+        """
+        Puts each of orgs at the index paired with it (the last of the
+        orgs paired with an index repeated is the one kept).
+        """
+        for index, org in zip(indices, orgs):
+            self.population[index] = org
+
     def is_full(self):
         return len(self.population) == self.carrying_capacity
 
@@ -40,6 +61,7 @@ class Population(object):
         and adds them to the population
         """
         mutants = [org.mutate() for org in self.population]
+        evaluate_fitness_batch(mutants)
         self.population += mutants
 
     def remove_at_random(self):
@@ -47,15 +69,16 @@ class Population(object):
         Currently removes organisms from population at random
         in the future should look at a way to evaluate fitness
         and cull based off that
+
+        Keeps carrying_capacity orgs drawn at random (without replacement).
         """
         if len(self.population) > self.carrying_capacity:
-            self.population = [random.choice(self.population)
-                               for i in range(self.carrying_capacity)]
+            self.population = random.sample(self.population,
+                                            self.carrying_capacity)
 
     def remove_least_fit(self):
         """
-        Need to find way to choose based off of weighing the fitness values
-        then can remove the sorting of tuples
+        Keeps carrying_capacity orgs drawn by fitness (without replacement)
         """
         self.population = selection.select(self.population,
                                            self.carrying_capacity)
@@ -65,8 +88,16 @@ class Population(object):
             self.population, mutation_rate=self.mutation_rate,
             desired_number_of_orgs=self.carrying_capacity)
 
+    def wright_fisher_selection(self):
+        self.population = selection.wright_fisher(
+            self.population, mutation_rate=self.mutation_rate,
+            desired_number_of_orgs=self.carrying_capacity)
+
     def advance_generation(self):
-        self.moran_selection()
+        if self.selection_model == "Wright-Fisher":
+            self.wright_fisher_selection()
+        else:
+            self.moran_selection()
 
     def add_to_pop(self, org):
         self.population.append(org)
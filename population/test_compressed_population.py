@@ -0,0 +1,136 @@
+from unittest import TestCase as TC
+import numpy
+
+from compressed_population import CompressedPopulation
+from meta_population import MetaPopulation, StructuredPopulation
+from ..organism.integer.organism import Organism
+
+
+class TestCompressedPopulation(TC):
+    def setUp(self):
+        self.orgs = [Organism(1), Organism(1), Organism(2), Organism(1)]
+        self.pop = CompressedPopulation(self.orgs)
+
+    def test_init(self):
+        self.assertEqual(len(self.pop), 4)
+        self.assertEqual(self.pop.carrying_capacity, 4)
+        self.assertEqual(self.pop.number_of_genotypes(), 2)
+        self.assertTrue(self.pop.is_full())
+
+    def test_init_exception(self):
+        with self.assertRaises(ValueError):
+            CompressedPopulation(self.orgs, selection_model="Wrong")
+
+    def test_from_counts(self):
+        pop = CompressedPopulation.from_counts(
+            [(Organism(7), 1000), (Organism(8), 0)], mutation_rate=0.5)
+        self.assertEqual(len(pop), 1000)
+        self.assertEqual(pop.carrying_capacity, 1000)
+        self.assertEqual(pop.number_of_genotypes(), 1)
+        self.assertEqual(pop.mutation_rate, 0.5)
+
+    def test_iter(self):
+        self.assertEqual([org.value for org in self.pop], [1, 1, 1, 2])
+
+    def test_getitem(self):
+        self.assertEqual(self.pop[0].value, 1)
+        self.assertEqual(self.pop[2].value, 1)
+        self.assertEqual(self.pop[3].value, 2)
+        self.assertEqual(self.pop[-1].value, 2)
+        with self.assertRaises(IndexError):
+            self.pop[4]
+
+    def test_setitem(self):
+        self.pop[3] = Organism(5)
+        self.pop[0] = Organism(5)
+        self.assertEqual(sorted(org.value for org in self.pop), [1, 1, 5, 5])
+        self.assertEqual(len(self.pop), 4)
+        self.assertEqual(self.pop.number_of_genotypes(), 2)
+
+    def test_replace(self):
+        pop = CompressedPopulation(
+            [Organism(1), Organism(2), Organism(4), Organism(8)])
+        pop.replace([0, 3], [Organism(16), Organism(32)])
+        self.assertEqual(sorted(org.value for org in pop), [2, 4, 16, 32])
+        self.assertEqual(len(pop), 4)
+        # The last org put at an index repeated (-3 is 1 too) is kept
+        pop.replace([1, 1, -3], [Organism(1), Organism(5), Organism(7)])
+        self.assertEqual(sorted(org.value for org in pop), [2, 7, 16, 32])
+        self.assertEqual(len(pop), 4)
+
+    def test_fitness(self):
+        self.assertEqual(self.pop.max_fitness(), 3)
+        self.assertEqual(self.pop.mean_fitness(), 2.25)
+
+    def test_replicate(self):
+        self.pop.replicate()
+        self.assertEqual(len(self.pop), 8)
+
+    def test_remove(self):
+        self.pop.replicate()
+        self.pop.remove_at_random()
+        self.assertEqual(len(self.pop), 4)
+        # Orgs are kept without replacement, each genotype at most as
+        # many times as it was there
+        pop = CompressedPopulation(
+            [Organism(value) for value in range(20)], carrying_capacity=10)
+        pop.remove_at_random()
+        self.assertEqual(len(pop), 10)
+        self.assertEqual(pop.number_of_genotypes(), 10)
+        self.pop.replicate()
+        self.pop.remove_least_fit()
+        self.assertLessEqual(len(self.pop), 4)
+
+    def test_advance_generation(self):
+        self.pop.advance_generation()
+        self.assertEqual(len(self.pop), 4)
+        pop = CompressedPopulation.from_counts(
+            [(Organism(1), 10 ** 6)], mutation_rate=10 ** -6,
+            selection_model="Wright-Fisher")
+        pop.advance_generation()
+        self.assertEqual(len(pop), 10 ** 6)
+        self.assertLess(pop.number_of_genotypes(), 100)
+
+
+class TestCompressedMetaPopulation(TC):
+    def test_migrate(self):
+        pops = [CompressedPopulation.from_counts([(Organism(i), 10)])
+                for i in range(4)]
+        metapop = MetaPopulation(pops, 1.0, 0.5)
+        metapop.migrate()
+        self.assertEqual([len(pop) for pop in metapop], [10] * 4)
+        metapop.advance_generation()
+        self.assertEqual([len(pop) for pop in metapop], [10] * 4)
+
+    def test_migrate_several(self):
+        source = CompressedPopulation([Organism(i) for i in range(10, 14)])
+        dest = CompressedPopulation([Organism(i) for i in range(4)])
+        metapop = MetaPopulation([source, dest], 1.0, 0.5)
+        # Every org of source migrates to dest
+        metapop.migration_plan = lambda: tuple(
+            numpy.array(column) for column in
+            ([0] * 4, range(4), [1] * 4, range(4)))
+        metapop.migrate()
+        self.assertEqual(sorted(org.value for org in dest),
+                         range(10, 14))
+        source = CompressedPopulation([Organism(i) for i in range(10, 14)])
+        dest = CompressedPopulation([Organism(i) for i in range(4)])
+        metapop = MetaPopulation([source, dest], 1.0, 0.5)
+        metapop.subpop_migrate(source, dest)
+        values = sorted(org.value for org in dest)
+        self.assertEqual(len(values), 4)
+        self.assertEqual(len([value for value in values if value >= 10]), 2)
+
+    def test_structured_migrate(self):
+        # Neighbors on a 2 by 2 grid are often chosen by several sources
+        pops = [CompressedPopulation.from_counts([(Organism(i), 10)])
+                for i in range(4)]
+        metapop = StructuredPopulation(pops, 1.0, 0.5, 2, 2)
+        for _ in range(50):
+            metapop.migrate()
+            self.assertEqual([len(pop) for pop in metapop], [10] * 4)
+        metapop.migration_plan = lambda: tuple(
+            numpy.array(column) for column in
+            ([0, 2], [0, 0], [1, 1], [3, 3]))
+        metapop.migrate()
+        self.assertEqual(len(metapop[1]), 10)
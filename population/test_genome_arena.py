@@ -0,0 +1,105 @@
+from unittest import TestCase as TC
+import random
+
+from genome_arena import GenomeArena
+from meta_population import MetaPopulation
+from population import Population
+from parallel import ParallelMetaPopulation
+from ..organism.bitstring.bitstring import Bitstring
+from ..organism.bitstring.organism import Organism, random_organism
+from ..organism.bitstring.nk_model import nk_model
+from ..organism.bitstring.nk_model.organism import Organism as NKOrganism
+from ..organism.abstract_organism import reset_organism_ids
+
+
+def labelled(pops):
+    return [[(org.value, org.self_id, org.parent_id) for org in pop]
+            for pop in pops]
+
+
+class TestGenomeArena(TC):
+    def setUp(self):
+        self.orgs = [Organism(Bitstring("1011000011")),
+                     Organism(Bitstring("0000000001"))]
+        self.orgs.append(self.orgs[0].mutate())
+        self.arena = GenomeArena(2, 4, 10)
+
+    def test_read_write(self):
+        self.arena.write_deme(1, self.orgs)
+        self.assertEqual(self.arena.sizes.tolist(), [0, 3])
+        orgs = self.arena.read_deme(1)
+        self.assertEqual([org.value for org in orgs],
+                         [org.value for org in self.orgs])
+        self.assertEqual([org.self_id for org in orgs],
+                         [org.self_id for org in self.orgs])
+        self.assertEqual(orgs[2].parent_id, self.orgs[0].self_id)
+        self.assertIsNone(orgs[0].parent_id)
+        self.assertEqual(orgs[1]._fitness, 2)
+        self.assertIsInstance(orgs[0], Organism)
+        with self.assertRaises(IndexError):
+            self.arena.read_org(1, 3)
+
+    def test_nk_organisms(self):
+        model = nk_model.NKModelFactory().non_consecutive_dependencies(6, 2)
+        org = NKOrganism(Bitstring("110100"), nk_model=model)
+        arena = GenomeArena(1, 1, 6)
+        arena.write_deme(0, [org])
+        copy = arena.read_org(0, 0)
+        self.assertIs(copy.nk_model, model)
+        self.assertEqual(copy.fitness, org.fitness)
+        self.assertEqual(copy.contributions, org.contributions)
+
+    def test_write_exceptions(self):
+        with self.assertRaises(ValueError):
+            self.arena.write_deme(0, self.orgs * 2)
+        with self.assertRaises(ValueError):
+            self.arena.write_deme(0, [Organism(Bitstring("1"))])
+
+    def test_copy_rows(self):
+        self.arena.write_deme(0, self.orgs[:2])
+        self.arena.write_deme(1, self.orgs[2:])
+        self.arena.copy_rows([(0, 0, 0, 1), (0, 1, 0, 0), (0, 1, 1, 0)])
+        self.assertEqual([org.value for org in self.arena.read_deme(0)],
+                         [self.orgs[1].value, self.orgs[0].value])
+        self.assertEqual(self.arena.read_org(1, 0).self_id,
+                         self.orgs[1].self_id)
+
+    def test_memory(self):
+        self.assertEqual(self.arena.nbytes,
+                         GenomeArena.bytes_needed(2, 4, 10))
+        self.assertEqual(GenomeArena.bytes_needed(2, 4, 10),
+                         2 * (4 * (2 + 24) + 8))
+        with self.assertRaises(ValueError):
+            GenomeArena(2, 4, 10, max_bytes=100)
+
+    def test_for_meta_population(self):
+        pops = [Population(self.orgs[:2], carrying_capacity=3),
+                Population(self.orgs)]
+        arena = GenomeArena.for_meta_population(MetaPopulation(pops, 1, 1))
+        self.assertEqual(arena.deme_capacity, 3)
+        self.assertEqual(len(arena), 2)
+        self.assertEqual(arena.sizes.tolist(), [2, 3])
+
+
+class TestParallelArena(TC):
+    def run_parallel(self, workers, with_arena):
+        random.seed(3)
+        reset_organism_ids()
+        pops = [Population([random_organism(20) for _ in range(8)],
+                           mutation_rate=0.5)
+                for _ in range(6)]
+        metapop = MetaPopulation(pops, 0.5, 0.5)
+        arena = None
+        if with_arena:
+            arena = GenomeArena.for_meta_population(metapop)
+        parallel = ParallelMetaPopulation(metapop, workers=workers, seed=11,
+                                          arena=arena)
+        for _ in range(5):
+            parallel.advance_generation()
+        fitnesses = (parallel.max_fitness(), parallel.mean_fitness())
+        return labelled(parallel.close()), fitnesses
+
+    def test_serial_equivalence(self):
+        expected = self.run_parallel(0, False)
+        self.assertEqual(self.run_parallel(0, True), expected)
+        self.assertEqual(self.run_parallel(3, True), expected)
@@ -1,6 +1,8 @@
 from unittest import TestCase as TC
 import random
+import numpy
 
+import meta_population
 from meta_population import MetaPopulation, StructuredPopulation
 from population import Population
 from ..organism.integer.organism import Organism
@@ -93,12 +95,14 @@ class TestMetaPopulation(TC):
     @attr("probabilistic")
     def test_migrate(self):
         "Labels orgs in pop to check for migrations"
+        original_pop = {}
         for index, pop in enumerate(self.pops):
-            for org in pop:
-                org.original_pop = index
+            for org_index, org in enumerate(pop):
+                pop[org_index] = Organism(org.value)
+                original_pop[pop[org_index].self_id] = index
         self.metapop.migrate()
         migrations_took_place = any(
-            org.original_pop != index
+            original_pop[org.self_id] != index
             for index, pop in enumerate(self.pops)
             for org in pop)
         self.assertTrue(migrations_took_place)
@@ -106,6 +110,65 @@ class TestMetaPopulation(TC):
     def test_get(self):
         self.assertEqual(self.metapop[1], self.pops[1])
 
+    def test_migration_plan(self):
+        self.metapop.mig_rate = 1.0
+        source_pops, source_indices, dest_pops, dest_indices = \
+            self.metapop.migration_plan()
+        self.assertEqual(len(source_pops), 20)
+        self.assertEqual(sorted(set(source_pops.tolist())), list(range(10)))
+        for pop in range(10):
+            from_pop = source_indices[source_pops == pop].tolist()
+            self.assertEqual(len(set(from_pop)), 2)
+            self.assertTrue(set(from_pop) <= set(range(4)))
+        self.assertTrue(set(dest_indices.tolist()) <= set(range(4)))
+
+    def test_migration_plan_sizes(self):
+        self.metapop.mig_rate = 1.0
+        source_pops, source_indices, _, dest_indices = \
+            self.metapop.migration_plan(sizes=[2] * 10)
+        self.assertEqual(len(source_pops), 10)
+        self.assertTrue(set(source_indices.tolist()) <= {0, 1})
+
+    def test_migration_models(self):
+        self.metapop.mig_rate = 1.0
+        for model in ("Binomial", "Poisson"):
+            self.metapop.migration_model = model
+            plan = self.metapop.migration_plan()
+            self.assertTrue(len(plan[0]) <= 40)
+            self.metapop.migrate()
+        self.metapop.prop_miged = 0.0
+        self.assertEqual(len(self.metapop.migration_plan()[0]), 0)
+        with self.assertRaises(ValueError):
+            MetaPopulation(self.pops, 0.5, 0.5, migration_model="Wrong")
+
+    def test_sample_each(self):
+        sizes = numpy.array([5, 10 ** 9, 7, 1, 0, 40])
+        counts = numpy.array([5, 3, 2, 1, 0, 30])
+        samples = meta_population._sample_each(
+            sizes, counts, numpy.random.RandomState(4))
+        starts = numpy.cumsum(counts) - counts
+        for size, count, start in zip(sizes, counts, starts):
+            drawn = samples[start:start + count].tolist()
+            self.assertEqual(len(set(drawn)), count)
+            self.assertTrue(all(0 <= index < size for index in drawn))
+        self.assertEqual(len(samples), counts.sum())
+
+    def test_migration_plan_slots_distinct(self):
+        self.metapop.mig_rate = 1.0
+        for _ in range(20):
+            _, _, dest_pops, dest_indices = self.metapop.migration_plan()
+            slots = list(zip(dest_pops.tolist(), dest_indices.tolist()))
+            self.assertEqual(len(set(slots)), len(slots))
+
+    def test_last_of_each(self):
+        self.assertEqual(meta_population._last_of_each(
+            numpy.array([3, 1, 3, 2, 1])).tolist(), [2, 3, 4])
+
+    def test_subpop_migrate(self):
+        source = Population([Organism(5)] * 4)
+        self.metapop.subpop_migrate(source, self.pops[0])
+        self.assertEqual([org.value for org in self.pops[0]].count(5), 2)
+
 
 class TestStructuredPopulation(TestMetaPopulation):
     def setUp(self):
@@ -114,3 +177,20 @@ class TestStructuredPopulation(TestMetaPopulation):
 
         self.pops = [Population(self.orgs) for _ in range(10)]
         self.metapop = StructuredPopulation(self.pops, 0.5, 0.5, 2, 5)
+
+    def test_migration_plan(self):
+        # Sources migrating to the same neighbor may draw the same dest
+        # orgs, of which only the last migrant is kept
+        self.metapop.mig_rate = 1.0
+        source_pops, source_indices, dest_pops, dest_indices = \
+            self.metapop.migration_plan()
+        self.assertTrue(0 < len(source_pops) <= 20)
+        self.assertTrue(set(source_indices.tolist()) <= set(range(4)))
+        self.assertTrue(set(dest_indices.tolist()) <= set(range(4)))
+
+    def test_migration_plan_sizes(self):
+        self.metapop.mig_rate = 1.0
+        source_pops, source_indices, _, dest_indices = \
+            self.metapop.migration_plan(sizes=[2] * 10)
+        self.assertTrue(0 < len(source_pops) <= 10)
+        self.assertTrue(set(source_indices.tolist()) <= {0, 1})
@@ -0,0 +1,84 @@
+from unittest import TestCase as TC
+import random
+
+from meta_population import MetaPopulation, StructuredPopulation
+from population import Population
+from parallel import ParallelMetaPopulation
+from ..organism.integer.organism import Organism
+from ..organism.abstract_organism import reset_organism_ids
+
+
+def labelled(pops):
+    return [[(org.value, org.self_id, org.parent_id) for org in pop]
+            for pop in pops]
+
+
+class TestParallelMetaPopulation(TC):
+    def make_metapop(self, structured=False):
+        random.seed(3)
+        reset_organism_ids()
+        pops = [Population([Organism(value) for value in range(8)],
+                           mutation_rate=0.5)
+                for _ in range(6)]
+        if structured:
+            return StructuredPopulation(pops, 0.5, 0.25, 3, 2)
+        return MetaPopulation(pops, 0.5, 0.25)
+
+    def run_parallel(self, workers, structured=False, generations=5):
+        metapop = self.make_metapop(structured)
+        parallel = ParallelMetaPopulation(metapop, workers=workers, seed=11)
+        for _ in range(generations):
+            parallel.advance_generation()
+        return parallel.close()
+
+    def test_serial_equivalence(self):
+        serial = labelled(self.run_parallel(0))
+        self.assertEqual(labelled(self.run_parallel(2)), serial)
+        self.assertEqual(labelled(self.run_parallel(4)), serial)
+
+    def test_serial_equivalence_structured(self):
+        serial = labelled(self.run_parallel(0, structured=True))
+        self.assertEqual(
+            labelled(self.run_parallel(3, structured=True)), serial)
+
+    def test_seed(self):
+        metapop = self.make_metapop()
+        parallel = ParallelMetaPopulation(metapop, seed=12)
+        parallel.advance_generation()
+        self.assertNotEqual(labelled(parallel.close()),
+                            labelled(self.run_parallel(0, generations=1)))
+
+    def test_migrate(self):
+        metapop = self.make_metapop()
+        metapop.mig_rate, metapop.prop_miged = 1.0, 1.0
+        random.seed(5)
+        metapop.migrate()
+        expected = labelled(metapop)
+        metapop = self.make_metapop()
+        metapop.mig_rate, metapop.prop_miged = 1.0, 1.0
+        parallel = ParallelMetaPopulation(metapop, workers=2)
+        random.seed(5)
+        parallel.migrate()
+        self.assertEqual(labelled(parallel.close()), expected)
+
+    def test_ids(self):
+        metapop = self.run_parallel(2)
+        mutants = set((org.self_id, org.value, org.parent_id)
+                      for pop in metapop for org in pop
+                      if org.parent_id is not None)
+        ids = set(self_id for self_id, _, _ in mutants)
+        self.assertEqual(len(ids), len(mutants))
+        self.assertTrue(min(ids) > 48)
+        self.assertTrue(Organism(0).self_id > max(ids))
+
+    def test_fitness(self):
+        metapop = self.make_metapop()
+        parallel = ParallelMetaPopulation(metapop, workers=2)
+        self.assertAlmostEqual(parallel.max_fitness(), 8.0)
+        self.assertAlmostEqual(parallel.mean_fitness(), 4.5)
+        self.assertEqual(len(parallel), 6)
+        parallel.close()
+
+    def test_workers_exception(self):
+        with self.assertRaises(ValueError):
+            ParallelMetaPopulation(self.make_metapop(), workers=-1)
@@ -33,6 +33,7 @@ class TestPopulation(TC):
         population = Population([1, 2, 3], carrying_capacity=2)
         population.remove_at_random()
         self.assertEqual(len(population), 2)
+        self.assertEqual(len(set(population)), 2)
 
     def test_leastfit_removal(self):
         this_pop = Population([MockOrganism(1), MockOrganism(2),
@@ -55,6 +56,17 @@ class TestPopulation(TC):
         big_pop.advance_generation()
         self.assertLessEqual(len(big_pop), 3)
 
+    def test_wright_fisher(self):
+        wf_pop = Population(
+            [MockOrganism(1), MockOrganism(2), MockOrganism(90)],
+            carrying_capacity=5, selection_model="Wright-Fisher")
+        wf_pop.advance_generation()
+        self.assertEqual(len(wf_pop), 5)
+
+    def test_selection_model_exception(self):
+        with self.assertRaises(ValueError):
+            Population(self.orgs, selection_model="Wrong")
+
     def test_iter_len(self):
         self.assertEqual(4, len(self.pop))
 
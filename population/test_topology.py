@@ -0,0 +1,60 @@
+from unittest import TestCase as TC
+import numpy
+
+from topology import Topology, parse_edges
+from neighborhood import nearest_4_neighbors_by_linear_position
+
+
+class TestTopology(TC):
+    def test_grid_4(self):
+        topology = Topology.grid_4(4, 5)
+        self.assertEqual(len(topology), 20)
+        for deme in range(20):
+            self.assertEqual(
+                topology.neighbors(deme),
+                nearest_4_neighbors_by_linear_position(4, 5, deme))
+
+    def test_grid_8(self):
+        topology = Topology.grid_8(4, 5)
+        self.assertEqual(set(topology.neighbors(0)),
+                         {16, 17, 19, 1, 3, 4, 5, 7})
+        self.assertEqual(len(topology.targets), 8 * 20)
+
+    def test_ring(self):
+        topology = Topology.ring(5)
+        self.assertEqual(topology.neighbors(0), [4, 1])
+        self.assertEqual(topology.neighbors(4), [3, 0])
+
+    def test_islands(self):
+        topology = Topology.islands(3, 2)
+        self.assertEqual(topology.neighbors(0), [1, 2, 4])
+        self.assertEqual(topology.neighbors(1), [0])
+        self.assertEqual(topology.neighbors(4), [5, 0, 2])
+        with self.assertRaises(ValueError):
+            Topology.islands(1, 1)
+
+    def test_from_edges(self):
+        topology = Topology.from_edges(3, [(0, 1), (0, 2)])
+        self.assertEqual(topology.neighbors(0), [1, 2])
+        self.assertEqual(topology.neighbors(2), [0])
+        directed = Topology.from_edges(3, [(0, 1), (1, 2), (2, 0)],
+                                       directed=True)
+        self.assertEqual(directed.neighbors(1), [2])
+        with self.assertRaises(ValueError):
+            Topology.from_edges(3, [(0, 1)])
+        with self.assertRaises(ValueError):
+            Topology.from_edges(2, [(0, 2)])
+
+    def test_choose_neighbors(self):
+        topology = Topology.grid_4(100, 100)
+        demes = numpy.arange(10000)
+        chosen = topology.choose_neighbors(demes)
+        for deme, neighbor in zip(demes[:100], chosen[:100]):
+            self.assertIn(neighbor, topology.neighbors(deme))
+        self.assertEqual(topology.choose_neighbors([]).tolist(), [])
+
+    def test_parse_edges(self):
+        self.assertEqual(parse_edges("0-1; 1-2;2 - 0;"),
+                         [(0, 1), (1, 2), (2, 0)])
+        with self.assertRaises(ValueError):
+            parse_edges("0-1; 1")
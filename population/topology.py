@@ -0,0 +1,142 @@
+"""
+Which subpopulations (demes) migrants can go to from each deme.
+
+A Topology is compiled once into a compressed sparse row adjacency: the
+neighbors of deme d are targets[offsets[d]:offsets[d + 1]]. Drawing a
+neighbor for many demes at once is then array indexing, which keeps
+migration cheap on graphs of thousands of demes.
+
+Grids are toroidal (as in neighborhood), so on grids narrower than 3
+demes a neighbor may be listed twice or be the deme itself.
+"""
+import random
+import numpy
+
+
+class Topology(object):
+    def __init__(self, offsets, targets):
+        """
+        offsets (number of demes + 1 increasing positions into targets) and
+        targets (deme indices) as described above. Every deme needs a
+        neighbor.
+        """
+        self.offsets = numpy.asarray(offsets, dtype=numpy.intp)
+        self.targets = numpy.asarray(targets, dtype=numpy.intp)
+        number_of_demes = len(self.offsets) - 1
+        if number_of_demes < 0 or self.offsets[-1] != len(self.targets):
+            raise ValueError("offsets don't delimit the targets")
+        if (numpy.diff(self.offsets) <= 0).any():
+            raise ValueError("Every deme needs a neighbor")
+        if ((self.targets < 0) | (self.targets >= number_of_demes)).any():
+            raise ValueError("Neighbors must be demes of the topology")
+
+    def __len__(self):
+        """
+        Number of demes
+        """
+        return len(self.offsets) - 1
+
+    def neighbors(self, deme):
+        return self.targets[self.offsets[deme]:self.offsets[deme + 1]].tolist()
+
+    def choose_neighbors(self, demes, random_state=None):
+        """
+        Returns an array with a random neighbor of each of demes.
+        random_state is a numpy RandomState (seeded from random if None).
+        """
+        demes = numpy.asarray(demes, dtype=numpy.intp)
+        if random_state is None:
+            random_state = numpy.random.RandomState(random.getrandbits(32))
+        starts = self.offsets[demes]
+        degrees = self.offsets[demes + 1] - starts
+        choices = (random_state.random_sample(len(demes)) *
+                   degrees).astype(numpy.intp)
+        return self.targets[starts + choices]
+
+    @classmethod
+    def from_edges(cls, number_of_demes, edges, directed=False):
+        """
+        Makes a topology from (deme, neighbor) pairs, going both ways
+        unless directed.
+        """
+        edges = numpy.asarray(list(edges), dtype=numpy.intp).reshape(-1, 2)
+        if not directed:
+            edges = numpy.concatenate([edges, edges[:, ::-1]])
+        if ((edges < 0) | (edges >= number_of_demes)).any():
+            raise ValueError("Edges must be between demes of the topology")
+        edges = edges[numpy.argsort(edges[:, 0], kind="mergesort")]
+        offsets = numpy.zeros(number_of_demes + 1, dtype=numpy.intp)
+        numpy.cumsum(numpy.bincount(edges[:, 0], minlength=number_of_demes),
+                     out=offsets[1:])
+        return cls(offsets, edges[:, 1])
+
+    @classmethod
+    def _grid(cls, width, height, steps):
+        """
+        Toroidal grid where each deme neighbors the demes steps (dx, dy)
+        away, in the order of steps.
+        """
+        if width < 1 or height < 1:
+            raise ValueError("Grids need a positive width and height")
+        positions = numpy.arange(width * height)
+        x, y = positions % width, positions // width
+        targets = numpy.column_stack(
+            [(x + dx) % width + ((y + dy) % height) * width
+             for dx, dy in steps])
+        offsets = numpy.arange(0, targets.size + 1, len(steps))
+        return cls(offsets, targets.ravel())
+
+    @classmethod
+    def grid_4(cls, width, height):
+        """
+        Von Neumann neighborhood, as nearest_4_neighbors_by_linear_position
+        """
+        return cls._grid(width, height, [(0, -1), (0, 1), (-1, 0), (1, 0)])
+
+    @classmethod
+    def grid_8(cls, width, height):
+        """
+        Moore neighborhood: the 4 nearest and the 4 diagonal neighbors
+        """
+        return cls._grid(width, height,
+                         [(dx, dy) for dy in (-1, 0, 1) for dx in (-1, 0, 1)
+                          if dx or dy])
+
+    @classmethod
+    def ring(cls, number_of_demes):
+        """
+        Each deme neighbors the demes before and after it, the last
+        neighboring the first.
+        """
+        return cls._grid(number_of_demes, 1, [(-1, 0), (1, 0)])
+
+    @classmethod
+    def islands(cls, number_of_islands, demes_per_island):
+        """
+        Demes in groups (islands) of consecutive demes, each neighboring
+        the rest of its island. The first deme of each island also
+        neighbors the first deme of every other island.
+        """
+        if number_of_islands * demes_per_island < 2:
+            raise ValueError("Islands need at least two demes")
+        edges = []
+        for island in range(number_of_islands):
+            first = island * demes_per_island
+            for deme in range(first, first + demes_per_island):
+                edges.extend((deme, other) for other in
+                             range(deme + 1, first + demes_per_island))
+            edges.extend((first, other * demes_per_island) for other in
+                         range(island + 1, number_of_islands))
+        return cls.from_edges(number_of_islands * demes_per_island, edges)
+
+
+def parse_edges(text):
+    """
+    Parses edges written "0-1; 1-2; 2-0" into (deme, neighbor) pairs.
+    """
+    edges = []
+    for edge in text.split(";"):
+        if edge.strip():
+            deme, _, neighbor = edge.partition("-")
+            edges.append((int(deme), int(neighbor)))
+    return edges
@@ -1,9 +1,11 @@
 #!/usr/bin/env python2.7
 import random
 import argparse
+import sys
 from structure_and_landscapes.run_management.run import process_and_run
 from structure_and_landscapes.run_management.parameters \
     import get_parameter_settings
+from structure_and_landscapes.run_management.sweep import run_sweep
 import datetime
 
 
@@ -27,8 +29,23 @@ def parse_arguments():
         '-n',
         '--number_of_runs', default=1, type=int,
         help="the specified number of runs")
+    parser.add_argument(
+        '-j',
+        '--jobs', default=0, type=int,
+        help="run each (setting, run) as a job in a pool of this many "
+        "processes, each job seeded from the seed and its index")
+    parser.add_argument(
+        '--sweep_directory',
+        help="where the progress of the jobs is recorded, defaults to the "
+        "configuration file's location + '.sweep'")
+    parser.add_argument(
+        '--resume', action='store_true',
+        help="continue the run from its checkpoint (with --jobs, skip the "
+        "jobs already finished and continue those checkpointed)")
     args = parser.parse_args()
-    if args.seed != 0 and args.number_of_runs > 1:
+    if args.jobs < 0:
+        raise AssertionError("the number of jobs can't be negative")
+    if args.jobs == 0 and args.seed != 0 and args.number_of_runs > 1:
         raise AssertionError("cannot specify a seed and "
                              "more than one run at the same time")
     return args
@@ -36,13 +53,25 @@ def parse_arguments():
 
 def run_specified_configurations(args):
     """
-    Processes the configuration file and performs all runs
+    Processes the configuration file and performs all runs, returning
+    the indices of the jobs that failed when run as jobs
     """
     random.seed(args.seed)
     with open(args.parameters, "r") as parameters_file:
         parameters_file_contents = parameters_file.read()
 
     parameter_settings = get_parameter_settings(parameters_file_contents)
+    if args.jobs:
+        return run_sweep(
+            parameter_settings, args.number_of_runs,
+            args.sweep_directory or args.parameters + ".sweep",
+            jobs=args.jobs, seed=args.seed or None, resume=args.resume)
+    if args.resume:
+        if len(parameter_settings) * args.number_of_runs > 1:
+            raise AssertionError("only a single run can be resumed "
+                                 "without --jobs")
+        parameter_settings[0]['Time Started'] = datetime.datetime.now()
+        return process_and_run(parameter_settings[0], resume=True)
     for _ in range(args.number_of_runs):
         for setting in parameter_settings:
             setting['Time Started'] = datetime.datetime.now()
@@ -51,4 +80,5 @@ def run_specified_configurations(args):
 
 if __name__ == '__main__':
     args = parse_arguments()
-    run_specified_configurations(args)
+    if run_specified_configurations(args):
+        sys.exit(1)
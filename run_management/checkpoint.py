@@ -0,0 +1,90 @@
+"""
+Checkpoints of a run in progress, to continue it after a crash or
+pre-emption as if it never stopped.
+
+A checkpoint holds the population, the initial population, the
+generation reached, random's state and the organism id counter (with
+the statistics recorded so far). It is a npz written as a run_store run:
+genomes packed into bytes with columns of fitnesses and ids, landscapes
+(as NK tables) once, so its cost follows the population's size and
+genome length rather than the object graph's.
+
+Checkpoints are written aside and renamed over the last one, so there is
+always a whole checkpoint to resume from.
+"""
+import os
+import random
+import tempfile
+import numpy
+import run_store
+from structure_and_landscapes.organism.abstract_organism import \
+    next_organism_id, reset_organism_ids
+
+
+def save_checkpoint(path, state):
+    """
+    Saves state (a dict) to path with random's state and the organism id
+    counter.
+    """
+    next_id = next_organism_id()
+    # Taking the id moved the counter on, put it back
+    reset_organism_ids(next_id)
+    state = dict(state, random_state=random.getstate(),
+                 next_organism_id=next_id)
+    directory = os.path.dirname(os.path.abspath(path))
+    handle, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(handle, "wb") as temp_file:
+        numpy.savez(temp_file, **run_store.encode_run(state))
+        temp_file.flush()
+        os.fsync(temp_file.fileno())
+    os.rename(temp_path, path)
+
+
+def restore_checkpoint(path):
+    """
+    Returns the state saved at path, restoring random's state and the
+    organism id counter.
+    """
+    with numpy.load(path) as arrays:
+        state = run_store.decode_run(dict(arrays))
+    random.setstate(state.pop("random_state"))
+    reset_organism_ids(state.pop("next_organism_id"))
+    return state
+
+
+class Checkpointer(object):
+    def __init__(self, path, interval, initial_population=None,
+                 parameters=None, statistics_recorder=None):
+        """
+        Checkpoints every interval generations to path, along with the
+        run's initial_population, parameters and statistics_recorder.
+        """
+        if interval < 1:
+            raise ValueError("The interval must be at least a generation")
+        self.path = path
+        self.interval = interval
+        self.initial_population = initial_population
+        self.parameters = parameters
+        self.statistics_recorder = statistics_recorder
+
+    def record_generation(self, population, generation):
+        """
+        Checkpoints population if generation is a multiple of the interval.
+        """
+        if generation % self.interval == 0:
+            self.save(population, generation)
+
+    def save(self, population, generation):
+        save_checkpoint(self.path, {
+            "population": population,
+            "generation": generation,
+            "initial_population": self.initial_population,
+            "parameters": self.parameters,
+            "statistics_recorder": self.statistics_recorder})
+
+    def remove(self):
+        """
+        Removes the checkpoint (once the run is saved).
+        """
+        if os.path.exists(self.path):
+            os.remove(self.path)
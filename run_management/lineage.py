@@ -0,0 +1,244 @@
+"""
+Records the genealogy of a run: for every founder and every mutant, its
+id, its parent's id, the generation and deme it was born in and its
+fitness, kept in numpy columns.
+
+Records are pruned every generation (as in the simplification of a tree
+sequence) to the ancestors of the living organisms, and the records of
+their most recent common ancestor and its ancestors, which can't be
+pruned anymore, are moved out of memory in chunks (npz files when a
+directory is given). Memory so stays bounded by the genealogy of the
+living population.
+
+Organisms born without mutation are the same organism as their parent,
+so only mutants (new ids) are births here.
+"""
+import glob
+import os
+import numpy
+from structure_and_landscapes.organism.abstract_organism import \
+    set_birth_listener
+
+COLUMNS = (("self_id", numpy.int64),
+           ("parent_id", numpy.int64),
+           ("generation", numpy.int32),
+           ("deme", numpy.int32),
+           ("fitness", numpy.float64))
+
+# parent_id of founders and deme of organisms whose deme isn't known
+NO_ID = -1
+
+
+class LineageRecorder(object):
+    def __init__(self, directory=None, capacity=2 ** 16, chunk_size=2 ** 16):
+        """
+        directory is where chunks are written (kept in memory when None).
+        capacity is the initial number of rows (grown when needed) and
+        chunk_size the number of settled rows written per chunk.
+        """
+        self.directory = directory
+        self.chunk_size = chunk_size
+        self._columns = dict((name, numpy.zeros(capacity, dtype=dtype))
+                             for name, dtype in COLUMNS)
+        self._size = 0
+        self._settled = []
+        self._settled_size = 0
+        self._chunks = []
+        self._number_of_chunks = 0
+        self._pending = []
+        self._deme_of = {}
+        self._generation = 0
+        if directory is not None and not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_pending"] = []
+        return state
+
+    def start(self, population):
+        """
+        Records the founders of population (generation 0) and starts
+        recording births.
+        """
+        founders = []
+        for deme, org in _orgs_by_deme(population):
+            if org.self_id not in self._deme_of:
+                self._deme_of[org.self_id] = deme
+                founders.append((org.self_id, NO_ID, 0, deme, org.fitness))
+        self._append(founders)
+        set_birth_listener(self._pending.append)
+
+    def record_generation(self, population, generation):
+        """
+        Records the births since the last call (as of the given generation)
+        and prunes the records to the ancestors of population.
+        """
+        rows = []
+        for child in self._pending:
+            deme = self._deme_of.get(child.parent_id, NO_ID)
+            self._deme_of[child.self_id] = deme
+            rows.append((child.self_id, child.parent_id, generation, deme,
+                         child.fitness))
+        self._pending[:] = []
+        self._append(rows)
+        self._deme_of = {}
+        for deme, org in _orgs_by_deme(population):
+            self._deme_of[org.self_id] = deme
+        self.simplify(self._deme_of)
+
+    def stop(self):
+        """
+        Stops recording births and writes the settled records.
+        """
+        set_birth_listener(None)
+        self._write_settled()
+
+    def _append(self, rows):
+        if not rows:
+            return
+        needed = self._size + len(rows)
+        if needed > len(self._columns["self_id"]):
+            capacity = max(needed, 2 * len(self._columns["self_id"]))
+            for name, dtype in COLUMNS:
+                grown = numpy.zeros(capacity, dtype=dtype)
+                grown[:self._size] = self._columns[name][:self._size]
+                self._columns[name] = grown
+        for i, (name, _) in enumerate(COLUMNS):
+            self._columns[name][self._size:needed] = [row[i] for row in rows]
+        self._size = needed
+
+    def _live_columns(self):
+        return dict((name, self._columns[name][:self._size])
+                    for name, _ in COLUMNS)
+
+    def simplify(self, alive_ids):
+        """
+        Drops the records that aren't ancestors of alive_ids (or the alive
+        themselves) and settles the records of their most recent common
+        ancestor and its ancestors.
+        """
+        columns = self._live_columns()
+        row_of = dict((org_id, row) for row, org_id in
+                      enumerate(columns["self_id"].tolist()))
+        parents = columns["parent_id"].tolist()
+        kept = numpy.zeros(self._size, dtype=bool)
+        for org_id in alive_ids:
+            row = row_of.get(org_id)
+            while row is not None and not kept[row]:
+                kept[row] = True
+                row = row_of.get(parents[row])
+        settled = numpy.zeros(self._size, dtype=bool)
+        ancestor = _most_recent_common_ancestor(
+            list(alive_ids), row_of, parents)
+        row = row_of.get(ancestor)
+        while row is not None:
+            settled[row] = True
+            row = row_of.get(parents[row])
+        if settled.any():
+            self._settled.append(dict(
+                (name, column[settled]) for name, column in columns.items()))
+            self._settled_size += int(settled.sum())
+        kept &= ~settled
+        for name, column in columns.items():
+            remaining = column[kept]
+            self._columns[name][:len(remaining)] = remaining
+        self._size = int(kept.sum())
+        if self._settled_size >= self.chunk_size:
+            self._write_settled()
+
+    def _write_settled(self):
+        if not self._settled:
+            return
+        chunk = dict((name, numpy.concatenate(
+            [settled[name] for settled in self._settled]))
+            for name, _ in COLUMNS)
+        if self.directory is None:
+            self._chunks.append(chunk)
+        else:
+            path = os.path.join(self.directory, "lineage_{:06d}.npz".format(
+                self._number_of_chunks))
+            numpy.savez(path, **chunk)
+        self._number_of_chunks += 1
+        self._settled = []
+        self._settled_size = 0
+
+    def records(self):
+        """
+        Returns every record kept (settled ones first) as a dict of columns.
+        """
+        parts = list(self._chunks)
+        if self.directory is not None:
+            for path in sorted(glob.glob(
+                    os.path.join(self.directory, "lineage_*.npz"))):
+                with numpy.load(path) as chunk:
+                    parts.append(dict((name, chunk[name])
+                                      for name, _ in COLUMNS))
+        parts.extend(self._settled)
+        parts.append(self._live_columns())
+        return dict((name, numpy.concatenate([part[name] for part in parts]))
+                    for name, _ in COLUMNS)
+
+    def _parent_map(self):
+        records = self.records()
+        return dict(zip(records["self_id"].tolist(),
+                        records["parent_id"].tolist()))
+
+    def line_of_descent(self, org_id):
+        """
+        Returns the ids from org_id back to its founder.
+        """
+        parent_of = self._parent_map()
+        line = [org_id]
+        while parent_of.get(line[-1], NO_ID) != NO_ID:
+            line.append(parent_of[line[-1]])
+        return line
+
+    def most_recent_common_ancestor(self, org_ids):
+        """
+        Returns the id of the latest common ancestor of org_ids (an org is
+        its own ancestor), None if they descend from different founders.
+        """
+        parent_of = self._parent_map()
+        ids = list(parent_of)
+        row_of = dict((org_id, row) for row, org_id in enumerate(ids))
+        parents = [parent_of[org_id] for org_id in ids]
+        return _most_recent_common_ancestor(list(org_ids), row_of, parents)
+
+
+def _orgs_by_deme(population):
+    """
+    Yields (deme index, org) for each org of a population or of each
+    subpopulation of a meta population.
+    """
+    demes = getattr(population, "list_of_populations", [population])
+    for deme, pop in enumerate(demes):
+        orgs = getattr(pop, "counts", pop)
+        for org in orgs:
+            yield deme, org
+
+
+def _most_recent_common_ancestor(org_ids, row_of, parents):
+    """
+    Latest common ancestor of org_ids through the rows in row_of (None if
+    there's none among them).
+    """
+    if not org_ids:
+        return None
+    line = [org_ids[0]]
+    row = row_of.get(org_ids[0])
+    while row is not None and parents[row] != NO_ID:
+        line.append(parents[row])
+        row = row_of.get(parents[row])
+    position = dict((org_id, i) for i, org_id in enumerate(line))
+    deepest = 0
+    visited = set(line)
+    for org_id in org_ids[1:]:
+        while org_id not in visited:
+            visited.add(org_id)
+            row = row_of.get(org_id)
+            if row is None or parents[row] == NO_ID:
+                return None
+            org_id = parents[row]
+        deepest = max(deepest, position.get(org_id, deepest))
+    return line[deepest]
@@ -7,16 +7,35 @@ Population Structure
 Number of generations
 Fitness distribution each generation
 Final population
+
+Next to each shelf is an index (filepath + INDEX_SUFFIX), a JSON object
+per line with the key, parameters and a fitness summary of each Run
+saved, so runs can be picked without unpickling all of them. Lines are
+appended whole as runs are saved; shelves written before the index (or
+whose index was lost) are indexed again from their runs.
 """
+import json
+import os
 import shelve
 import pickle
+import tempfile
 import uuid
+from collections import OrderedDict
 from contextlib import closing
 
+INDEX_SUFFIX = ".index.jsonl"
+JSON_TYPES = (basestring, int, long, float, bool, type(None))
+
 
 def save(filepath, key, value):
     with get_shelf(filepath) as shelf:
         shelf[key] = value
+        unindexed = len(shelf) > 1 and not os.path.exists(
+            index_path(filepath))
+    if unindexed:
+        rebuild_index(filepath)
+    else:
+        _append_index(filepath, [index_entry(key, value)])
 
 
 def load(filepath, key):
@@ -40,23 +59,135 @@ def save_with_unique_key(filepath, value):
     save(filepath, key, value)
 
 
-def values(filepath):
+def values(filepath, keys=None):
     """
     Given a filepath to a shelve object.
-    Returns an iterable of the values contained therein.
+    Returns an iterable of the values contained therein (only those of
+    keys if given, loaded one at a time).
     """
     with get_shelf(filepath) as shelf:
-        for key in shelf:
+        for key in (shelf if keys is None else keys):
             yield shelf[key]
 
 
+def index_path(filepath):
+    return filepath + INDEX_SUFFIX
+
+
+def index_entry(key, value):
+    """
+    Returns the index entry of value saved under key (None unless value
+    is a Run, having parameters).
+    """
+    parameters = getattr(value, "parameters", None)
+    if parameters is None:
+        return None
+    # Values JSON lacks (as the datetime 'Time Started') are written as str
+    parameters = dict(
+        (name, setting if isinstance(setting, JSON_TYPES) else str(setting))
+        for name, setting in parameters.items())
+    summary = {}
+    final_population = getattr(value, "final_population", None)
+    if hasattr(final_population, "mean_fitness"):
+        summary = {"Mean Fitness": final_population.mean_fitness(),
+                   "Max Fitness": final_population.max_fitness()}
+    return {"key": key, "parameters": parameters, "summary": summary}
+
+
+def append_entries(path, entries):
+    """
+    Appends entries (skipping None) to the file of entries at path, a
+    JSON object per line.
+    """
+    lines = "".join(json.dumps(entry) + "\n"
+                    for entry in entries if entry is not None)
+    # Each save is a single write, so a crash leaves at most a partial
+    # last line, which read_entries skips; it is ended before appending
+    # so the next entry isn't taken for part of it
+    with open(path, "a+") as entries_file:
+        entries_file.seek(0, os.SEEK_END)
+        if entries_file.tell():
+            entries_file.seek(-1, os.SEEK_END)
+            if entries_file.read(1) != "\n":
+                lines = "\n" + lines
+        entries_file.seek(0, os.SEEK_END)
+        entries_file.write(lines)
+
+
+def read_entries(path):
+    """
+    Returns the entries of the file at path (as append_entries writes
+    them), in the order saved, the latest for keys saved more than once.
+    Partial lines (of a crash while appending) are skipped.
+    """
+    entries = OrderedDict()
+    with open(path) as entries_file:
+        for line in entries_file:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            entries.pop(entry["key"], None)
+            entries[entry["key"]] = entry
+    return list(entries.values())
+
+
+def _append_index(filepath, entries):
+    append_entries(index_path(filepath), entries)
+
+
+def rebuild_index(filepath):
+    """
+    Indexes every run of the shelf again, replacing its index at once.
+    """
+    directory = os.path.dirname(os.path.abspath(filepath))
+    handle, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(handle, "w") as temp_file:
+        with get_shelf(filepath) as shelf:
+            for key in shelf:
+                entry = index_entry(key, shelf[key])
+                if entry is not None:
+                    temp_file.write(json.dumps(entry) + "\n")
+    os.rename(temp_path, index_path(filepath))
+
+
+def index(filepath):
+    """
+    Returns the index entries (dicts of key, parameters and summary) of
+    the runs of the shelf, in the order saved, the latest for keys saved
+    more than once. The index is rebuilt if missing.
+    """
+    if not os.path.exists(index_path(filepath)):
+        rebuild_index(filepath)
+    return read_entries(index_path(filepath))
+
+
+def matching_keys(filepath, parameters):
+    """
+    Returns the keys of the runs of the shelf whose parameters include
+    parameters (a dict), using the index.
+    """
+    return [entry["key"] for entry in index(filepath)
+            if all(entry["parameters"].get(name) == value
+                   for name, value in parameters.items())]
+
+
 def consolidate(shelf_paths, new_shelf_path):
     """
     Combine contents from iterable of file paths in shelf_paths
     into new_shelf_path.
     """
+    entries = []
     with get_shelf(new_shelf_path) as new_shelf:
+        unindexed = len(new_shelf) > 0 and not os.path.exists(
+            index_path(new_shelf_path))
         for shelf_path in shelf_paths:
             with get_shelf(shelf_path) as old_shelf:
                 for key in old_shelf:
-                    new_shelf[key] = old_shelf[key]
+                    value = old_shelf[key]
+                    new_shelf[key] = value
+                    entries.append(index_entry(key, value))
+    if unindexed:
+        rebuild_index(new_shelf_path)
+    else:
+        _append_index(new_shelf_path, entries)
@@ -2,16 +2,36 @@
 This module contains a class (Run) that encapsulate the
 parameters and results of a single evolutionary simulation.
 """
+import os
+import random
+import tempfile
 import persistence
+import run_store
+from lineage import LineageRecorder
+from statistics import StatisticsRecorder
+from checkpoint import Checkpointer, restore_checkpoint
 
 from ..organism.bitstring import organism as bitstring_organism
 from ..organism.bitstring.bitstring import Bitstring
 from ..population.population import Population
+from ..population.compressed_population import CompressedPopulation
 from ..population.meta_population import MetaPopulation, StructuredPopulation
+from ..population.parallel import ParallelMetaPopulation
+from ..population.genome_arena import GenomeArena
+from ..population.topology import Topology, parse_edges
 from ..organism.bitstring.nk_model import nk_model as nk_model
 from ..organism.bitstring import bitstring
 from ..organism.bitstring.nk_model import organism as nk_organism
 from ..organism.rna import organism as rna_organism
+from ..utility.fitness_cache import FitnessCache
+from ..organism.abstract_organism import AbstractOrganism, \
+    reset_organism_ids
+
+
+OUTPUT_FORMATS = ("Shelf", "Store")
+
+# Checkpoints go to the Output File Path with this suffix by default
+CHECKPOINT_SUFFIX = ".checkpoint.npz"
 
 
 class Run(object):
@@ -24,18 +44,59 @@ class Run(object):
             final_population,
             parameters,
             shelf_filepath,
-            other_data=None):
+            other_data=None,
+            output_format="Shelf",
+            key=None):
+        """
+        The run is saved to shelf_filepath, a shelf or (when output_format
+        is "Store") a run_store directory, under key (a new unique key if
+        None).
+        """
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError("Not a valid output format")
         self.initial_population = initial_population
         self.final_population = final_population
         self.parameters = parameters
         self.shelf_filepath = shelf_filepath
         self.other_data = other_data
-        persistence.save_with_unique_key(self.shelf_filepath, self)
+        if output_format == "Store":
+            run_store.save_run(self.shelf_filepath, self, key=key)
+        elif key is None:
+            persistence.save_with_unique_key(self.shelf_filepath, self)
+        else:
+            persistence.save(self.shelf_filepath, key, self)
 
 
-def run_population(population, number_of_generations):
-    for _ in range(number_of_generations):
-        population.advance_generation()
+def run_population(population, number_of_generations,
+                   lineage_recorder=None, statistics_recorder=None,
+                   checkpointer=None, start_generation=0):
+    """
+    Advances population number_of_generations times, recording its
+    genealogy in lineage_recorder (a LineageRecorder), its statistics
+    in statistics_recorder (a StatisticsRecorder) and checkpoints with
+    checkpointer (a Checkpointer) if given.
+    start_generation is the generation population has reached already
+    (as when resumed from a checkpoint).
+    """
+    if lineage_recorder is not None:
+        lineage_recorder.start(population)
+    if statistics_recorder is not None and start_generation == 0:
+        statistics_recorder.record(population, 0)
+    try:
+        for generation in range(start_generation + 1,
+                                number_of_generations + 1):
+            population.advance_generation()
+            if lineage_recorder is not None:
+                lineage_recorder.record_generation(population, generation)
+            if statistics_recorder is not None:
+                statistics_recorder.record_generation(population, generation)
+            if checkpointer is not None:
+                checkpointer.record_generation(population, generation)
+    finally:
+        if lineage_recorder is not None:
+            lineage_recorder.stop()
+        if statistics_recorder is not None:
+            statistics_recorder.flush()
     return population
 
 
@@ -52,7 +113,12 @@ def process_initial_org(parameter_settings):
     elif parameter_settings["Organism Type"] == "NK Model":
         length = int(parameter_settings["Length of Org"])
         b = bitstring.random_string(length)
-        nk_fac = nk_model.NKModelFactory()
+        tables = parameter_settings.get("NK Contribution Tables", "Lazy")
+        if tables not in {"Lazy", "Dense"}:
+            raise OrgException("Not a valid NK contribution table type")
+        nk_fac = nk_model.NKModelFactory(
+            random_generator=random.Random(random.getrandbits(32)),
+            dense_tables=(tables == "Dense"))
         if "Number of Genes" not in parameter_settings:
             number_of_genes = 1
         else:
@@ -73,14 +139,59 @@ def process_initial_org(parameter_settings):
         org = nk_organism.Organism(value=b, nk_model=unique_nk_model)
     else:
         raise OrgException("Not a valid org type")
+    process_organism_type(org, parameter_settings)
     return org
 
 
+def process_organism_type(org, parameter_settings):
+    """
+    Sets up what organisms like org share but don't pickle: RNA folding
+    threads and the fitness cache of org's landscape.
+    """
+    if parameter_settings["Organism Type"] == "RNA":
+        folding_threads = int(parameter_settings.get("Folding Threads", 1))
+        if folding_threads < 1:
+            raise OrgException("Folding needs at least one thread")
+        if (folding_threads > 1 and
+                not rna_organism.vienna_distance.PARALLEL_FOLDING):
+            raise OrgException("Folding on several threads needs a "
+                               "ViennaRNA built with OpenMP")
+        rna_organism.Organism.folding_threads = folding_threads
+    attach_fitness_cache(org, parameter_settings)
+
+
+def attach_fitness_cache(org, parameter_settings):
+    """
+    Gives the landscape of org a FitnessCache of 'Fitness Cache Size'
+    genotypes (no cache when unspecified or 0).
+    NK landscapes each have their own, others are shared by the type.
+    """
+    cache_size = int(parameter_settings.get("Fitness Cache Size", 0))
+    cache = FitnessCache(cache_size) if cache_size > 0 else None
+    if isinstance(org, nk_organism.Organism):
+        org.nk_model.fitness_cache = cache
+    else:
+        type(org).fitness_cache = cache
+
+
 def process_initial_population(parameter_settings):
     org = process_initial_org(parameter_settings)
     orgs_per_population = int(parameter_settings["Orgs per Population"])
-    org_list = [org for _ in range(orgs_per_population)]
     mutation_rate = float(parameter_settings["Mutation Rate"])
+    selection_model = parameter_settings.get("Selection Model", "Moran")
+    representation = parameter_settings.get(
+        "Population Representation", "List")
+    if representation not in {"List", "Compressed"}:
+        raise ValueError("Not a valid population representation")
+
+    def new_population():
+        if representation == "Compressed":
+            return CompressedPopulation.from_counts(
+                [(org, orgs_per_population)], mutation_rate=mutation_rate,
+                selection_model=selection_model)
+        return Population([org for _ in range(orgs_per_population)],
+                          mutation_rate=mutation_rate,
+                          selection_model=selection_model)
 
     if ("Number of Subpopulations in Width" in parameter_settings and
             "Number of Subpopulations in Height" in parameter_settings):
@@ -94,14 +205,14 @@ def process_initial_population(parameter_settings):
     else:
         number_of_pops = 1
     if number_of_pops <= 1:
-        return Population(org_list, mutation_rate=mutation_rate)
+        return new_population()
 
     mig_rate = float(parameter_settings["Migration Rate"])
     prop_miged = float(parameter_settings[
         "Proportion of Population Migrated"])
+    migration_model = parameter_settings.get("Migration Model", "Proportion")
 
-    pop_list = [Population(org_list, mutation_rate=mutation_rate)
-                for _ in range(number_of_pops)]
+    pop_list = [new_population() for _ in range(number_of_pops)]
     if "Migration Type" in parameter_settings:
         assert(parameter_settings["Migration Type"] in
                {"Local", "Global", "Restricted", "Unrestricted"})
@@ -110,24 +221,165 @@ def process_initial_population(parameter_settings):
                 pop_list,
                 migration_rate=mig_rate,
                 proportion_of_pop_migrated=prop_miged,
-                width=width,
-                height=height)
+                topology=process_topology(parameter_settings,
+                                          number_of_pops),
+                migration_model=migration_model)
     return MetaPopulation(
         pop_list,
         migration_rate=mig_rate,
-        proportion_of_pop_migrated=prop_miged)
+        proportion_of_pop_migrated=prop_miged,
+        migration_model=migration_model)
 
 
-def process_and_run(parameter_settings):
-    initial_population = process_initial_population(parameter_settings)
+def process_topology(parameter_settings, number_of_pops):
+    """
+    Returns the Topology of 'Deme Topology' (Grid4 by default) for
+    number_of_pops subpopulations.
+    """
+    topology = parameter_settings.get("Deme Topology", "Grid4")
+    if topology in {"Grid4", "Grid8"}:
+        width = int(parameter_settings["Number of Subpopulations in Width"])
+        height = int(
+            parameter_settings["Number of Subpopulations in Height"])
+        if topology == "Grid4":
+            return Topology.grid_4(width, height)
+        return Topology.grid_8(width, height)
+    elif topology == "Ring":
+        return Topology.ring(number_of_pops)
+    elif topology == "Islands":
+        demes_per_island = int(parameter_settings["Demes per Island"])
+        if demes_per_island < 1 or number_of_pops % demes_per_island:
+            raise ValueError("Demes per Island must divide the demes")
+        return Topology.islands(number_of_pops // demes_per_island,
+                                demes_per_island)
+    elif topology == "Edges":
+        return Topology.from_edges(
+            number_of_pops, parse_edges(parameter_settings["Deme Edges"]))
+    raise ValueError("Not a valid deme topology")
+
+
+def process_and_run(parameter_settings, shelf_filepath=None,
+                    checkpoint_path=None, resume=False, run_key=None):
+    """
+    Runs the population parameter_settings describe and saves the Run to
+    shelf_filepath (the Output File Path if None), under run_key (a new
+    unique key if None).
+    Every 'Checkpoint Interval' generations the run is checkpointed to
+    checkpoint_path (the Output File Path + CHECKPOINT_SUFFIX if None),
+    and if resume it continues from the checkpoint there (if any).
+    """
+    if shelf_filepath is None:
+        shelf_filepath = parameter_settings["Output File Path"]
+    if checkpoint_path is None:
+        checkpoint_path = (parameter_settings["Output File Path"] +
+                           CHECKPOINT_SUFFIX)
+    checkpoint_interval = int(
+        parameter_settings.get("Checkpoint Interval", 0))
+    workers = int(parameter_settings.get("Parallel Workers", 0))
+    if workers < 0:
+        raise ValueError("The number of parallel workers can't be negative")
+    if checkpoint_interval > 0 and (
+            workers or parameter_settings.get("Lineage Directory")):
+        raise ValueError("Runs with parallel workers or lineages can't be "
+                         "checkpointed")
+    state = None
+    if resume and os.path.exists(checkpoint_path):
+        state = restore_checkpoint(checkpoint_path)
+        if (_without_start_time(state["parameters"]) !=
+                _without_start_time(parameter_settings)):
+            raise ValueError("The checkpoint is of a run with other "
+                             "parameters")
+    if state is None:
+        reset_organism_ids()
+        initial_population = process_initial_population(parameter_settings)
+        population = initial_population
+        start_generation = 0
+        statistics_recorder = None
+        statistics_interval = int(
+            parameter_settings.get("Statistics Interval", 0))
+        if statistics_interval > 0:
+            statistics_recorder = StatisticsRecorder(statistics_interval)
+    else:
+        # The parameters (and time started) of the run checkpointed
+        parameter_settings = state["parameters"]
+        initial_population = state["initial_population"]
+        population = state["population"]
+        start_generation = state["generation"]
+        statistics_recorder = state["statistics_recorder"]
+        process_organism_type(_first_org(population), parameter_settings)
     number_of_generations = int(
         parameter_settings["Number of Generations"])
-    final_population = run_population(
-        initial_population,
-        number_of_generations)
-    shelf_filepath = parameter_settings["Output File Path"]
+    other_data = {}
+    lineage_recorder = None
+    if parameter_settings.get("Lineage Directory"):
+        lineage_directory = parameter_settings["Lineage Directory"]
+        if not os.path.isdir(lineage_directory):
+            os.makedirs(lineage_directory)
+        # Each run writes to its own directory within it
+        lineage_recorder = LineageRecorder(
+            tempfile.mkdtemp(prefix="run_", dir=lineage_directory))
+        other_data["Lineage"] = lineage_recorder
+    if statistics_recorder is not None:
+        other_data["Statistics"] = statistics_recorder
+    checkpointer = None
+    if checkpoint_interval > 0:
+        checkpointer = Checkpointer(
+            checkpoint_path, checkpoint_interval,
+            initial_population=initial_population,
+            parameters=parameter_settings,
+            statistics_recorder=statistics_recorder)
+    if workers and isinstance(initial_population, MetaPopulation):
+        if lineage_recorder is not None:
+            raise ValueError("Lineages can't be recorded by parallel workers")
+        if (parameter_settings["Organism Type"] == "NK Model" and
+                parameter_settings.get("NK Contribution Tables") != "Dense"):
+            raise OrgException("Parallel workers need Dense NK tables")
+        arena = None
+        if parameter_settings["Organism Type"] in {"Bitstring", "NK Model"}:
+            # Migrants are copied in shared memory rather than pickled
+            memory_limit = parameter_settings.get("Genome Arena Limit (MB)")
+            arena = GenomeArena.for_meta_population(
+                initial_population,
+                max_bytes=(int(float(memory_limit) * 2 ** 20)
+                           if memory_limit else None))
+            other_data["Genome Arena Bytes"] = arena.nbytes
+        parallel_population = ParallelMetaPopulation(
+            initial_population, workers=workers, arena=arena)
+        try:
+            run_population(parallel_population, number_of_generations,
+                           statistics_recorder=statistics_recorder)
+        finally:
+            final_population = parallel_population.close()
+    else:
+        final_population = run_population(
+            population,
+            number_of_generations,
+            lineage_recorder=lineage_recorder,
+            statistics_recorder=statistics_recorder,
+            checkpointer=checkpointer,
+            start_generation=start_generation)
     Run(
         initial_population=initial_population,
         final_population=final_population,
         parameters=parameter_settings,
-        shelf_filepath=shelf_filepath)
+        shelf_filepath=shelf_filepath,
+        other_data=other_data or None,
+        output_format=parameter_settings.get("Output Format", "Shelf"),
+        key=run_key)
+    if checkpointer is not None:
+        checkpointer.remove()
+
+
+def _without_start_time(parameter_settings):
+    return dict((name, value) for name, value in parameter_settings.items()
+                if name != "Time Started")
+
+
+def _first_org(population):
+    """
+    An organism of population (or of its first subpopulation).
+    """
+    org = next(iter(population))
+    while not isinstance(org, AbstractOrganism):
+        org = next(iter(org))
+    return org
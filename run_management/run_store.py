@@ -0,0 +1,240 @@
+"""
+Stores runs in a directory rather than a shelf of pickled Runs:
+
+metadata.jsonl has a line (a JSON object) per run with its key,
+parameters and fitness summary (as the index of a shelf), so runs can
+be listed and picked without loading them.
+
+runs/<key>.npz holds the run itself. Organisms are written as columns
+(genomes, bitstrings packed into bytes, with vectors of fitnesses and
+ids) and the landscape they share (an NK model) once per run; the rest
+of the Run (parameters, population structure, other data) is pickled
+with references to those columns.
+
+Organisms whose ids aren't integers (pickled before ids were), and
+mutants still to derive their contributions from their parent's (NK
+organisms), are pickled with the rest, sharing the stored landscapes.
+"""
+import cPickle
+import io
+import os
+import tempfile
+import uuid
+import numpy
+import persistence
+from structure_and_landscapes.organism.abstract_organism import \
+    AbstractOrganism
+from structure_and_landscapes.organism.bitstring.bitstring import \
+    Bitstring, as_byte_matrix, from_byte_matrix
+from structure_and_landscapes.population.genome_arena import SHARED_SLOTS
+
+METADATA = "metadata.jsonl"
+RUNS = "runs"
+
+# ids (and landscapes) of organisms without one
+NO_ID = -1
+
+
+def _storable(org):
+    return (isinstance(org.self_id, (int, long)) and
+            isinstance(org.parent_id, (int, long, type(None))) and
+            getattr(org, "_delta_source", None) is None)
+
+
+def _encode_values(values):
+    """
+    Returns the arrays holding values (bitstrings of the same length
+    packed, numbers and strings as such, anything else pickled).
+    """
+    if values and all(isinstance(value, Bitstring) for value in values):
+        length = len(values[0])
+        if all(len(value) == length for value in values):
+            return {"genomes": as_byte_matrix(values, length),
+                    "genome_length": numpy.array(length)}
+    array = numpy.array(values)
+    if array.ndim == 1 and array.dtype.kind in "iufS":
+        return {"values": array}
+    return {"pickled_values": _as_bytes(values)}
+
+
+def _decode_values(arrays):
+    if "genomes" in arrays:
+        return from_byte_matrix(arrays["genomes"],
+                                int(arrays["genome_length"]))
+    elif "values" in arrays:
+        return arrays["values"].tolist()
+    return _from_bytes(arrays["pickled_values"])
+
+
+def _as_bytes(obj):
+    return numpy.frombuffer(cPickle.dumps(obj, cPickle.HIGHEST_PROTOCOL),
+                            dtype=numpy.uint8)
+
+
+def _from_bytes(array):
+    return cPickle.loads(array.tobytes())
+
+
+def encode_run(run):
+    """
+    Returns the dict of arrays saving run (or any object holding
+    organisms).
+    """
+    orgs = []
+    org_index = {}
+    landscapes = []
+    landscape_index = {}
+
+    def persistent_id(obj):
+        if isinstance(obj, AbstractOrganism):
+            for name in SHARED_SLOTS:
+                shared = getattr(obj, name, None)
+                if shared is not None and id(shared) not in landscape_index:
+                    landscape_index[id(shared)] = len(landscapes)
+                    landscapes.append(shared)
+            if not _storable(obj):
+                return None
+            index = org_index.get(id(obj))
+            if index is None:
+                index = org_index[id(obj)] = len(orgs)
+                orgs.append(obj)
+            return ("org", index)
+        elif id(obj) in landscape_index:
+            return ("landscape", landscape_index[id(obj)])
+        return None
+
+    run_bytes = io.BytesIO()
+    pickler = cPickle.Pickler(run_bytes, cPickle.HIGHEST_PROTOCOL)
+    pickler.persistent_id = persistent_id
+    pickler.dump(run)
+
+    types = []
+    type_index = {}
+    type_columns, landscape_columns = [], []
+    for org in orgs:
+        if type(org) not in type_index:
+            type_index[type(org)] = len(types)
+            types.append(type(org))
+        type_columns.append(type_index[type(org)])
+        landscape = NO_ID
+        for name in SHARED_SLOTS:
+            shared = getattr(org, name, None)
+            if shared is not None:
+                landscape = landscape_index[id(shared)]
+        landscape_columns.append(landscape)
+    arrays = _encode_values([org.value for org in orgs])
+    arrays.update(
+        run=numpy.frombuffer(run_bytes.getvalue(), dtype=numpy.uint8),
+        shared=_as_bytes((types, landscapes)),
+        org_type=numpy.array(type_columns, dtype=numpy.int32),
+        landscape=numpy.array(landscape_columns, dtype=numpy.int32),
+        fitness=numpy.array([numpy.nan if org._fitness is None
+                             else org._fitness for org in orgs],
+                            dtype=numpy.float64),
+        self_id=numpy.array([org.self_id for org in orgs],
+                            dtype=numpy.int64),
+        parent_id=numpy.array([NO_ID if org.parent_id is None
+                               else org.parent_id for org in orgs],
+                              dtype=numpy.int64))
+    return arrays
+
+
+def decode_run(arrays):
+    """
+    Inverse of encode_run.
+    """
+    types, landscapes = _from_bytes(arrays["shared"])
+    values = _decode_values(arrays)
+    org_types = arrays["org_type"].tolist()
+    landscape_columns = arrays["landscape"].tolist()
+    fitnesses = arrays["fitness"].tolist()
+    self_ids = arrays["self_id"].tolist()
+    parent_ids = arrays["parent_id"].tolist()
+    orgs = {}
+
+    def persistent_load(pid):
+        kind, index = pid
+        if kind == "landscape":
+            return landscapes[index]
+        if index not in orgs:
+            cls = types[org_types[index]]
+            state = {"value": values[index],
+                     "_fitness": (None if numpy.isnan(fitnesses[index])
+                                  else fitnesses[index]),
+                     "self_id": self_ids[index],
+                     "parent_id": (None if parent_ids[index] == NO_ID
+                                   else parent_ids[index])}
+            landscape = landscape_columns[index]
+            if landscape != NO_ID:
+                for name in SHARED_SLOTS:
+                    state[name] = landscapes[landscape]
+            org = cls.__new__(cls)
+            org.__setstate__(state)
+            orgs[index] = org
+        return orgs[index]
+
+    unpickler = cPickle.Unpickler(io.BytesIO(arrays["run"].tobytes()))
+    unpickler.persistent_load = persistent_load
+    return unpickler.load()
+
+
+def _run_path(store_path, key):
+    return os.path.join(store_path, RUNS, key + ".npz")
+
+
+def save_run(store_path, run, key=None):
+    """
+    Saves run in the store at store_path (made if needed) under key (a
+    new unique key if None), returning the key.
+    """
+    if key is None:
+        key = str(uuid.uuid4())
+    runs_path = os.path.join(store_path, RUNS)
+    if not os.path.isdir(runs_path):
+        os.makedirs(runs_path)
+    # Written aside then renamed so no partial run is ever listed
+    handle, temp_path = tempfile.mkstemp(dir=runs_path, suffix=".tmp")
+    with os.fdopen(handle, "wb") as temp_file:
+        numpy.savez(temp_file, **encode_run(run))
+    os.rename(temp_path, _run_path(store_path, key))
+    persistence.append_entries(os.path.join(store_path, METADATA),
+                               [persistence.index_entry(key, run)])
+    return key
+
+
+def load_run(store_path, key):
+    with numpy.load(_run_path(store_path, key)) as arrays:
+        return decode_run(dict(arrays))
+
+
+def metadata(store_path):
+    """
+    Returns a list of the metadata (dicts of key, parameters and summary)
+    of the runs in the store, in the order saved, the latest for keys
+    saved more than once (as the index of a shelf).
+    """
+    path = os.path.join(store_path, METADATA)
+    if not os.path.exists(path):
+        return []
+    return persistence.read_entries(path)
+
+
+def values(store_path, parameters=None):
+    """
+    Returns an iterable of the runs in the store, only loading those whose
+    parameters include parameters (a dict) if given.
+    """
+    for entry in metadata(store_path):
+        if parameters is None or all(
+                entry["parameters"].get(name) == value
+                for name, value in parameters.items()):
+            yield load_run(store_path, entry["key"])
+
+
+def import_shelf(shelf_path, store_path):
+    """
+    Saves every run of a shelf in the store, under the same keys.
+    """
+    with persistence.get_shelf(shelf_path) as shelf:
+        for key in shelf:
+            save_run(store_path, shelf[key], key=key)
@@ -0,0 +1,186 @@
+"""
+Records summaries of a population every interval generations of a run:
+the number of orgs, mean, max and variance of fitness, the number of
+distinct genotypes and their diversity (the Shannon entropy of genotype
+frequencies, in nats), for the whole population and, in a meta
+population, for each subpopulation.
+
+Each subpopulation is reduced to its genotypes and their counts first,
+so the reductions are over genotypes (numpy arrays) rather than orgs.
+Rows go to preallocated numpy columns, moved out in chunks (npz files
+when a directory is given) when full.
+"""
+import glob
+import os
+from collections import Counter
+import numpy
+
+COLUMNS = (("generation", numpy.int32),
+           ("deme", numpy.int32),
+           ("size", numpy.int64),
+           ("mean_fitness", numpy.float64),
+           ("max_fitness", numpy.float64),
+           ("fitness_variance", numpy.float64),
+           ("genotypes", numpy.int64),
+           ("diversity", numpy.float64))
+
+# deme of the rows summarizing the whole population
+WHOLE_POPULATION = -1
+
+
+def genotype_counts(population):
+    """
+    Returns a dict of the number of orgs of each genotype of population
+    (orgs with equal values being the same genotype).
+    """
+    counts = getattr(population, "counts", None)
+    if counts is not None:
+        return dict(counts)
+    return Counter(population)
+
+
+def summarize(counts):
+    """
+    Returns the (size, mean fitness, max fitness, fitness variance,
+    genotypes, diversity) of a dict of genotype counts.
+    """
+    return _summarize_demes([counts])[0]
+
+
+def _summarize_demes(deme_counts):
+    """
+    summarize for each of a list of dicts of genotype counts, reducing
+    all of them at once.
+    """
+    number_of_demes = len(deme_counts)
+    genotypes = numpy.array([len(counts) for counts in deme_counts])
+    demes = numpy.repeat(numpy.arange(number_of_demes), genotypes)
+    fitnesses = numpy.array([org.fitness for counts in deme_counts
+                             for org in counts], dtype=float)
+    weights = numpy.array([count for counts in deme_counts
+                           for count in counts.values()], dtype=float)
+
+    def deme_totals(values):
+        return numpy.bincount(demes, values,
+                              minlength=number_of_demes).astype(float)
+
+    sizes = deme_totals(weights)
+    with numpy.errstate(invalid="ignore", divide="ignore"):
+        frequencies = weights / sizes[demes]
+        means = deme_totals(frequencies * fitnesses)
+        variances = deme_totals(frequencies * (fitnesses - means[demes]) ** 2)
+        diversities = -deme_totals(frequencies * numpy.log(frequencies))
+    maxima = numpy.full(number_of_demes, numpy.nan)
+    filled = genotypes > 0
+    if filled.any():
+        starts = numpy.cumsum(genotypes) - genotypes
+        maxima[filled] = numpy.maximum.reduceat(fitnesses, starts[filled])
+    empty = ~filled
+    means[empty] = variances[empty] = diversities[empty] = numpy.nan
+    return list(zip(sizes.astype(int).tolist(), means.tolist(),
+                    maxima.tolist(), variances.tolist(), genotypes.tolist(),
+                    diversities.tolist()))
+
+
+def _deme_genotype_counts(population):
+    """
+    The genotype counts of each subpopulation (of population alone when
+    it isn't a meta population).
+    """
+    if hasattr(population, "map_demes"):
+        return population.map_demes(genotype_counts)
+    demes = getattr(population, "list_of_populations", [population])
+    return [genotype_counts(pop) for pop in demes]
+
+
+class StatisticsRecorder(object):
+    def __init__(self, interval=10, directory=None, capacity=2 ** 12):
+        """
+        interval is the number of generations between records.
+        directory is where chunks are written (kept in memory when None).
+        capacity is the number of rows kept before moving out a chunk.
+        """
+        if interval < 1:
+            raise ValueError("The interval must be at least a generation")
+        self.interval = interval
+        self.directory = directory
+        self._columns = dict((name, numpy.zeros(capacity, dtype=dtype))
+                             for name, dtype in COLUMNS)
+        self._size = 0
+        self._chunks = []
+        self._number_of_chunks = 0
+        if directory is not None and not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def record_generation(self, population, generation):
+        """
+        Records population if generation is a multiple of the interval.
+        """
+        if generation % self.interval == 0:
+            self.record(population, generation)
+
+    def record(self, population, generation):
+        """
+        Records the summaries of population (and of its subpopulations).
+        """
+        deme_counts = _deme_genotype_counts(population)
+        rows = []
+        if len(deme_counts) > 1:
+            total_counts = Counter()
+            for counts in deme_counts:
+                total_counts.update(counts)
+            summaries = _summarize_demes(deme_counts + [total_counts])
+            rows.extend((generation, deme) + summary
+                        for deme, summary in enumerate(summaries[:-1]))
+        else:
+            summaries = _summarize_demes(deme_counts)
+        rows.append((generation, WHOLE_POPULATION) + summaries[-1])
+        for row in rows:
+            if self._size == len(self._columns["generation"]):
+                self.flush()
+            for (name, _), value in zip(COLUMNS, row):
+                self._columns[name][self._size] = value
+            self._size += 1
+
+    def flush(self):
+        """
+        Moves the rows recorded out of the buffer as a chunk.
+        """
+        if not self._size:
+            return
+        chunk = dict((name, self._columns[name][:self._size].copy())
+                     for name, _ in COLUMNS)
+        if self.directory is None:
+            self._chunks.append(chunk)
+        else:
+            path = os.path.join(
+                self.directory, "statistics_{:06d}.npz".format(
+                    self._number_of_chunks))
+            numpy.savez(path, **chunk)
+        self._number_of_chunks += 1
+        self._size = 0
+
+    def records(self):
+        """
+        Returns every row recorded as a dict of columns.
+        """
+        parts = list(self._chunks)
+        if self.directory is not None:
+            for path in sorted(glob.glob(
+                    os.path.join(self.directory, "statistics_*.npz"))):
+                with numpy.load(path) as chunk:
+                    parts.append(dict((name, chunk[name])
+                                      for name, _ in COLUMNS))
+        parts.append(dict((name, self._columns[name][:self._size])
+                          for name, _ in COLUMNS))
+        return dict((name, numpy.concatenate([part[name] for part in parts]))
+                    for name, _ in COLUMNS)
+
+    def trajectory(self, column, deme=WHOLE_POPULATION):
+        """
+        Returns the generations recorded and the values of column for deme
+        (the whole population by default) at each of them.
+        """
+        records = self.records()
+        rows = records["deme"] == deme
+        return records["generation"][rows], records[column][rows]
@@ -0,0 +1,219 @@
+"""
+Runs the jobs of a parameter sweep (every setting of a configuration
+times a number of replicates) in a pool of worker processes.
+
+Each job's seed derives from the seed of the sweep and the job's index
+alone, so a job runs the same whichever worker runs it, and whenever.
+Jobs save their runs to shelves of their own (shards, as a shelf can't
+take writers from several processes), consolidated into each Output
+File Path once the jobs are done. Runs saved as a Store are written
+there directly. Every run is saved under its job's key (run_key), so a
+job run again replaces its run rather than adding another.
+
+The sweep directory holds the sweep's seed, a marker for each job
+finished (naming its shard and whether it was consolidated yet) and the
+traceback of each job that failed. Only shards not consolidated yet are
+merged, so resuming doesn't write runs consolidated before again.
+Resuming a sweep skips the jobs finished; the shard of a job run again
+is emptied first, so no run is saved twice. Jobs checkpointed (with a
+'Checkpoint Interval') continue from their checkpoint, in CHECKPOINTS.
+"""
+import datetime
+import hashlib
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import traceback
+import persistence
+from run import process_and_run
+
+SWEEP_FILE = "sweep.json"
+DONE = "done"
+FAILED = "failed"
+SHARDS = "shards"
+CHECKPOINTS = "checkpoints"
+
+
+def job_seed(seed, index):
+    """
+    Returns the seed of job index of a sweep seeded with seed.
+    """
+    digest = hashlib.sha1("{}:{}".format(seed, index)).hexdigest()
+    return int(digest[:8], 16)
+
+
+def run_key(seed, index):
+    """
+    Returns the key the run of job index of a sweep seeded with seed is
+    saved under.
+    """
+    return "{}-{}".format(seed, index)
+
+
+def make_jobs(parameter_settings, number_of_runs):
+    """
+    Returns the settings of every job, replicate by replicate.
+    """
+    return [dict(setting) for _ in range(number_of_runs)
+            for setting in parameter_settings]
+
+
+def _write_atomically(path, contents):
+    handle, temp_path = tempfile.mkstemp(dir=os.path.dirname(path),
+                                         suffix=".tmp")
+    with os.fdopen(handle, "w") as temp_file:
+        temp_file.write(contents)
+    os.rename(temp_path, path)
+
+
+def _marker(directory, kind, index):
+    return os.path.join(directory, kind, str(index))
+
+
+def _start(directory, seed, number_of_jobs, resume):
+    """
+    Returns the seed of the sweep, recording a new sweep in directory
+    unless resuming the one there.
+    """
+    path = os.path.join(directory, SWEEP_FILE)
+    if os.path.exists(path):
+        if not resume:
+            raise ValueError(
+                "{} holds a sweep already, resume it or remove it".format(
+                    directory))
+        with open(path) as sweep_file:
+            sweep = json.load(sweep_file)
+        if sweep["jobs"] != number_of_jobs:
+            raise ValueError("The sweep resumed had {} jobs, not {}".format(
+                sweep["jobs"], number_of_jobs))
+        return sweep["seed"]
+    if seed is None:
+        seed = random.SystemRandom().getrandbits(32)
+    for kind in (DONE, FAILED, SHARDS, CHECKPOINTS):
+        if not os.path.isdir(os.path.join(directory, kind)):
+            os.makedirs(os.path.join(directory, kind))
+    _write_atomically(path, json.dumps({"seed": seed,
+                                        "jobs": number_of_jobs}))
+    return seed
+
+
+def _done_markers(directory):
+    markers = {}
+    done_directory = os.path.join(directory, DONE)
+    if os.path.isdir(done_directory):
+        for name in os.listdir(done_directory):
+            if name.isdigit():
+                with open(os.path.join(done_directory, name)) as marker:
+                    markers[int(name)] = json.load(marker)
+    return markers
+
+
+def finished_jobs(directory):
+    """
+    Returns a dict of the shard (None for runs saved directly) of each
+    finished job of the sweep in directory.
+    """
+    return dict((index, marker["shard"])
+                for index, marker in _done_markers(directory).items())
+
+
+def _consolidate(directory, settings):
+    """
+    Merges the shards of the finished jobs not consolidated yet into their
+    Output File Paths, marking them consolidated.
+    """
+    shards = {}
+    for index, marker in sorted(_done_markers(directory).items()):
+        if marker["shard"] is not None and not marker.get("consolidated"):
+            shards.setdefault(settings[index]["Output File Path"],
+                              []).append((index, marker["shard"]))
+    for destination, destination_shards in sorted(shards.items()):
+        persistence.consolidate([shard for _, shard in destination_shards],
+                                destination)
+        for index, shard in destination_shards:
+            _write_atomically(_marker(directory, DONE, index),
+                              json.dumps({"shard": shard,
+                                          "consolidated": True}))
+
+
+def _run_job(job):
+    """
+    Runs a job, returning its index, whether it succeeded and the seconds
+    it took. Its failures are recorded rather than raised.
+    """
+    index, setting, seed, key, directory, sharded = job
+    started = time.time()
+    shard = None
+    if sharded:
+        shard_directory = os.path.join(directory, SHARDS, str(index))
+        if os.path.isdir(shard_directory):
+            shutil.rmtree(shard_directory)
+        os.makedirs(shard_directory)
+        shard = os.path.join(shard_directory, "runs.shelf")
+    try:
+        random.seed(seed)
+        setting["Time Started"] = datetime.datetime.now()
+        process_and_run(
+            setting, shelf_filepath=shard, resume=True, run_key=key,
+            checkpoint_path=os.path.join(directory, CHECKPOINTS,
+                                         "{}.npz".format(index)))
+    except Exception:
+        _write_atomically(_marker(directory, FAILED, index),
+                          traceback.format_exc())
+        return index, False, time.time() - started
+    _write_atomically(_marker(directory, DONE, index),
+                      json.dumps({"shard": shard, "consolidated": False}))
+    return index, True, time.time() - started
+
+
+def run_sweep(parameter_settings, number_of_runs, directory, jobs=1,
+              seed=None, resume=False, progress=sys.stderr):
+    """
+    Runs number_of_runs replicates of each of parameter_settings in jobs
+    processes (in this one if 1), recording the sweep in directory and
+    reporting each job to progress. seed is that of the sweep (drawn at
+    random if None). Returns the indices of the jobs that failed.
+    """
+    settings = make_jobs(parameter_settings, number_of_runs)
+    if jobs > 1 and any(int(setting.get("Parallel Workers", 0))
+                        for setting in settings):
+        raise ValueError("Parallel Workers can't be used in a pool of jobs")
+    seed = _start(directory, seed, len(settings), resume)
+    sharded = [setting.get("Output Format", "Shelf") == "Shelf"
+               for setting in settings]
+    finished = finished_jobs(directory)
+    pending = []
+    for index, setting in enumerate(settings):
+        if index in finished:
+            continue
+        failure_marker = _marker(directory, FAILED, index)
+        if os.path.exists(failure_marker):
+            os.remove(failure_marker)
+        pending.append((index, setting, job_seed(seed, index),
+                        run_key(seed, index), directory, sharded[index]))
+    pool = None
+    if jobs > 1 and pending:
+        pool = multiprocessing.Pool(jobs)
+        results = pool.imap_unordered(_run_job, pending)
+    else:
+        results = (_run_job(job) for job in pending)
+    failed = []
+    for count, (index, succeeded, seconds) in enumerate(results, 1):
+        if not succeeded:
+            failed.append(index)
+        progress.write("[{}/{}] job {} {} in {:.1f}s\n".format(
+            len(finished) + count, len(settings), index,
+            "finished" if succeeded else "failed", seconds))
+    if pool is not None:
+        pool.close()
+        pool.join()
+    _consolidate(directory, settings)
+    if failed:
+        progress.write("{} jobs failed, see {}\n".format(
+            len(failed), os.path.join(directory, FAILED)))
+    return sorted(failed)
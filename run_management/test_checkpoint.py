@@ -0,0 +1,67 @@
+from unittest import TestCase as TC
+import os
+import random
+import shutil
+import tempfile
+
+from structure_and_landscapes.organism.bitstring.bitstring import Bitstring
+from structure_and_landscapes.organism.bitstring.nk_model import nk_model
+from structure_and_landscapes.organism.bitstring.nk_model.organism import \
+    Organism as NKOrganism
+from structure_and_landscapes.organism.abstract_organism import \
+    next_organism_id
+from structure_and_landscapes.population.population import Population
+
+import checkpoint
+
+
+class TestCheckpoint(TC):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, "run.checkpoint.npz")
+        self.model = nk_model.NKModelFactory().non_consecutive_dependencies(
+            10, 2)
+        founder = NKOrganism(Bitstring("1011001110"), nk_model=self.model)
+        founder.fitness
+        # A mutant still to be evaluated from its parent's contributions
+        self.orgs = [founder, founder.mutate(), founder.mutate()]
+        self.orgs[1].fitness
+        self.population = Population(self.orgs)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_save_restore(self):
+        checkpoint.save_checkpoint(self.path, {"population": self.population,
+                                               "generation": 3})
+        # Lazy tables draw the contributions the mutant needs from random
+        expected_fitnesses = [org.fitness for org in self.orgs]
+        expected_random = random.random()
+        expected_id = next_organism_id()
+        state = checkpoint.restore_checkpoint(self.path)
+        self.assertEqual(state["generation"], 3)
+        orgs = list(state["population"])
+        self.assertEqual([org.value for org in orgs],
+                         [org.value for org in self.orgs])
+        self.assertIs(orgs[0].nk_model, orgs[2].nk_model)
+        self.assertIsNot(orgs[0].nk_model, self.model)
+        self.assertIsNotNone(orgs[2]._delta_source)
+        self.assertEqual([org.fitness for org in orgs], expected_fitnesses)
+        self.assertEqual(random.random(), expected_random)
+        self.assertEqual(next_organism_id(), expected_id)
+        self.assertEqual(os.listdir(self.temp_dir),
+                         ["run.checkpoint.npz"])
+
+    def test_checkpointer(self):
+        checkpointer = checkpoint.Checkpointer(self.path, 2,
+                                               parameters={"a": "1"})
+        checkpointer.record_generation(self.population, 1)
+        self.assertFalse(os.path.exists(self.path))
+        checkpointer.record_generation(self.population, 2)
+        state = checkpoint.restore_checkpoint(self.path)
+        self.assertEqual(state["generation"], 2)
+        self.assertEqual(state["parameters"], {"a": "1"})
+        checkpointer.remove()
+        self.assertFalse(os.path.exists(self.path))
+        with self.assertRaises(ValueError):
+            checkpoint.Checkpointer(self.path, 0)
@@ -0,0 +1,102 @@
+from unittest import TestCase as TC
+import os
+import pickle
+import shutil
+import tempfile
+
+from structure_and_landscapes.organism.integer.organism import Organism
+from structure_and_landscapes.population.population import Population
+
+from lineage import LineageRecorder, NO_ID
+
+
+class TestLineageRecorder(TC):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.a, self.b = Organism(1), Organism(5)
+        self.pop = Population([self.a, self.b])
+        self.recorder = LineageRecorder()
+        self.recorder.start(self.pop)
+
+    def tearDown(self):
+        self.recorder.stop()
+        shutil.rmtree(self.temp_dir)
+
+    def first_generation(self):
+        self.c = self.a.mutate()
+        self.d = self.c.mutate()
+        self.e = self.b.mutate()
+        self.pop[0], self.pop[1] = self.d, self.e
+        self.recorder.record_generation(self.pop, 1)
+
+    def second_generation(self):
+        self.d2 = self.d.mutate()
+        self.b.mutate()
+        self.pop[1] = self.d2
+        self.recorder.record_generation(self.pop, 2)
+
+    def test_founders(self):
+        records = self.recorder.records()
+        self.assertEqual(records["self_id"].tolist(),
+                         [self.a.self_id, self.b.self_id])
+        self.assertEqual(records["parent_id"].tolist(), [NO_ID, NO_ID])
+        self.assertEqual(records["fitness"].tolist(), [2, 6])
+
+    def test_record_generation(self):
+        self.first_generation()
+        records = self.recorder.records()
+        self.assertEqual(len(records["self_id"]), 5)
+        row = records["self_id"].tolist().index(self.d.self_id)
+        self.assertEqual(records["parent_id"][row], self.c.self_id)
+        self.assertEqual(records["generation"][row], 1)
+        self.assertEqual(records["deme"][row], 0)
+        self.assertEqual(records["fitness"][row], self.d.fitness)
+
+    def test_line_of_descent(self):
+        self.first_generation()
+        self.assertEqual(
+            self.recorder.line_of_descent(self.d.self_id),
+            [self.d.self_id, self.c.self_id, self.a.self_id])
+
+    def test_most_recent_common_ancestor(self):
+        self.first_generation()
+        self.assertIsNone(self.recorder.most_recent_common_ancestor(
+            [self.d.self_id, self.e.self_id]))
+        self.assertEqual(self.recorder.most_recent_common_ancestor(
+            [self.d.self_id, self.c.self_id]), self.c.self_id)
+
+    def test_simplify(self):
+        self.first_generation()
+        self.second_generation()
+        # The mutant of b died and b's line is extinct; d, c and a are
+        # settled as the ancestors of everyone alive
+        self.assertEqual(self.recorder._size, 1)
+        records = self.recorder.records()
+        self.assertEqual(
+            sorted(records["self_id"].tolist()),
+            sorted([self.a.self_id, self.c.self_id, self.d.self_id,
+                    self.d2.self_id]))
+        self.assertEqual(
+            self.recorder.line_of_descent(self.d2.self_id),
+            [self.d2.self_id, self.d.self_id, self.c.self_id,
+             self.a.self_id])
+
+    def test_chunks_on_disk(self):
+        self.recorder.stop()
+        self.recorder = LineageRecorder(self.temp_dir, capacity=1,
+                                        chunk_size=1)
+        self.recorder.start(self.pop)
+        self.first_generation()
+        self.second_generation()
+        self.assertTrue(os.listdir(self.temp_dir))
+        copy = pickle.loads(pickle.dumps(self.recorder, 2))
+        self.assertEqual(
+            copy.line_of_descent(self.d2.self_id),
+            [self.d2.self_id, self.d.self_id, self.c.self_id,
+             self.a.self_id])
+
+    def test_stop(self):
+        self.recorder.stop()
+        self.a.mutate()
+        self.recorder.record_generation(self.pop, 1)
+        self.assertEqual(len(self.recorder.records()["self_id"]), 2)
@@ -1,11 +1,13 @@
 from unittest import TestCase as TC
 import persistence
 import tempfile
+import datetime
 import os.path
 import shutil
 from contextlib import closing
 
 from ..organism.integer import organism as org
+from ..population.population import Population
 
 
 class TestModule(TC):
@@ -79,3 +81,75 @@ class TestModule(TC):
 
         stored_values = set(persistence.values(path_new))
         self.assertEqual(set([1, 2, 3, 4]), stored_values)
+
+    def test_values_keys(self):
+        persistence.save(self.temp_file, "a", 1)
+        persistence.save(self.temp_file, "b", 2)
+        self.assertEqual(list(persistence.values(self.temp_file, ["b"])), [2])
+
+
+class MockRun(object):
+    def __init__(self, parameters):
+        self.parameters = parameters
+        self.final_population = Population([org.Organism(3)])
+
+
+class TestIndex(TC):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.temp_file = os.path.join(self.temp_dir, "test.shelf")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_index(self):
+        persistence.save(self.temp_file, "a", MockRun({"N": "1"}))
+        persistence.save(self.temp_file, "b", MockRun({"N": "2"}))
+        persistence.save(self.temp_file, "c", 3)
+        persistence.save(self.temp_file, "a", MockRun({"N": "3"}))
+        entries = persistence.index(self.temp_file)
+        self.assertEqual([entry["key"] for entry in entries], ["b", "a"])
+        self.assertEqual(entries[1]["parameters"], {"N": "3"})
+        self.assertEqual(entries[1]["summary"],
+                         {"Mean Fitness": 4, "Max Fitness": 4})
+        self.assertEqual(persistence.matching_keys(self.temp_file,
+                                                   {"N": "2"}), ["b"])
+
+    def test_index_datetime(self):
+        started = datetime.datetime(2015, 3, 1, 12, 30)
+        persistence.save(self.temp_file, "a",
+                         MockRun({"N": "1", "Time Started": started}))
+        entry, = persistence.index(self.temp_file)
+        self.assertEqual(entry["parameters"]["Time Started"], str(started))
+
+    def test_partial_line(self):
+        persistence.save(self.temp_file, "a", MockRun({"N": "1"}))
+        with open(persistence.index_path(self.temp_file), "a") as index:
+            index.write('{"key": "b", "param')
+        self.assertEqual(persistence.matching_keys(self.temp_file, {}),
+                         ["a"])
+        # Saved after the partial line, a run is still indexed
+        persistence.save(self.temp_file, "c", MockRun({"N": "1"}))
+        self.assertEqual(persistence.matching_keys(self.temp_file, {}),
+                         ["a", "c"])
+
+    def test_rebuild(self):
+        # A shelf saved without an index
+        with persistence.get_shelf(self.temp_file) as shelf:
+            shelf["a"] = MockRun({"N": "1"})
+        self.assertEqual(persistence.matching_keys(self.temp_file,
+                                                   {"N": "1"}), ["a"])
+        os.remove(persistence.index_path(self.temp_file))
+        persistence.save(self.temp_file, "b", MockRun({"N": "1"}))
+        self.assertEqual(
+            sorted(persistence.matching_keys(self.temp_file, {"N": "1"})),
+            ["a", "b"])
+
+    def test_consolidate_index(self):
+        path_1 = self.temp_file + "1"
+        path_new = self.temp_file + "2"
+        persistence.save(path_1, "a", MockRun({"N": "1"}))
+        persistence.save(path_1, "b", MockRun({"N": "2"}))
+        persistence.consolidate([path_1], path_new)
+        self.assertEqual(persistence.matching_keys(path_new, {"N": "2"}),
+                         ["b"])
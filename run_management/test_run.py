@@ -1,14 +1,21 @@
 from unittest import TestCase as TC
 import tempfile
+import random
 import os
 import shutil
 
 from structure_and_landscapes.organism.integer.organism \
     import Organism as int_organism
 from structure_and_landscapes.population.population import Population
+from structure_and_landscapes.population.meta_population import \
+    MetaPopulation
+from structure_and_landscapes.organism import abstract_organism
 
 import run
 import persistence
+import run_store
+import checkpoint
+from lineage import LineageRecorder, NO_ID
 
 
 class TestRun(TC):
@@ -43,6 +50,83 @@ class TestRun(TC):
     def test_run_population(self):
         run.run_population(self.init_pop, 5)
 
+    def test_run_population_lineage(self):
+        pops = [Population([int_organism(i) for i in range(10)],
+                           mutation_rate=0.5)
+                for _ in range(3)]
+        meta_pop = MetaPopulation(pops, 1.0, 0.2)
+        recorder = LineageRecorder()
+        run.run_population(meta_pop, 10, lineage_recorder=recorder)
+        records = recorder.records()
+        founders = set(records["self_id"][records["parent_id"] == NO_ID])
+        for pop in meta_pop:
+            for org in pop:
+                self.assertIn(
+                    recorder.line_of_descent(org.self_id)[-1], founders)
+        self.assertTrue(set(records["deme"].tolist()) <= set([0, 1, 2]))
+        self.assertIsNone(abstract_organism._birth_listener)
+
+    def test_process_and_run_lineage(self):
+        lineage_directory = os.path.join(
+            os.path.dirname(self.temp_file), "lineage")
+        settings = {
+            'Organism Type': 'Bitstring',
+            'Mutation Rate': '0.5',
+            'Length of Org': '5',
+            'Orgs per Population': '10',
+            'Number of Generations': '3',
+            'Output File Path': self.temp_file,
+            'Lineage Directory': lineage_directory}
+        run.process_and_run(settings)
+        self.assertEqual(len(os.listdir(lineage_directory)), 1)
+        saved_run, = persistence.values(self.temp_file)
+        recorder = saved_run.other_data["Lineage"]
+        records = recorder.records()
+        founders = set(records["self_id"][records["parent_id"] == NO_ID])
+        for org in saved_run.final_population:
+            self.assertIn(
+                recorder.line_of_descent(org.self_id)[-1], founders)
+
+    def test_statistics_interval(self):
+        settings = {
+            'Organism Type': 'Bitstring',
+            'Mutation Rate': '0.5',
+            'Length of Org': '5',
+            'Orgs per Population': '10',
+            'Number of Generations': '4',
+            'Output File Path': self.temp_file,
+            'Statistics Interval': '2'}
+        run.process_and_run(settings)
+        # Configurations without the setting don't record statistics
+        del settings['Statistics Interval']
+        run.process_and_run(settings)
+        with_statistics, without_statistics = persistence.values(
+            self.temp_file)
+        if without_statistics.other_data is not None:
+            with_statistics, without_statistics = \
+                without_statistics, with_statistics
+        generations, _ = with_statistics.other_data["Statistics"].trajectory(
+            "mean_fitness")
+        self.assertEqual(generations.tolist(), [0, 2, 4])
+        self.assertIsNone(without_statistics.other_data)
+
+    def test_output_format(self):
+        store_path = os.path.join(os.path.dirname(self.temp_file), "store")
+        settings = {
+            'Organism Type': 'Bitstring',
+            'Mutation Rate': '0.5',
+            'Length of Org': '5',
+            'Orgs per Population': '10',
+            'Number of Generations': '2',
+            'Output File Path': store_path,
+            'Output Format': 'Store'}
+        run.process_and_run(settings)
+        saved_run, = run_store.values(store_path)
+        self.assertEqual(saved_run.parameters, settings)
+        self.assertEqual(len(saved_run.final_population), 10)
+        with self.assertRaises(ValueError):
+            run.process_and_run(dict(settings, **{'Output Format': 'Wrong'}))
+
     def test_process_initial_org(self):
         rna = {'Organism Type': 'RNA'}
         bitstring = {'Organism Type': 'Bitstring', 'Length of Org': '5'}
@@ -61,10 +145,49 @@ class TestRun(TC):
         run.process_initial_org(bitstring)
         run.process_initial_org(nk)
         run.process_initial_org(nk_genes)
+        nk_dense = dict(nk, **{'NK Contribution Tables': 'Dense'})
+        run.process_initial_org(nk_dense)
+        with self.assertRaises(run.OrgException):
+            run.process_initial_org(
+                dict(nk, **{'NK Contribution Tables': 'Wrong'}))
 
         with self.assertRaises(run.OrgException):
             run.process_initial_org({'Organism Type': 'Wrong'})
 
+    def test_folding_threads(self):
+        parallel_folding = run.rna_organism.vienna_distance.PARALLEL_FOLDING
+        try:
+            org = run.process_initial_org(
+                {'Organism Type': 'RNA', 'Folding Threads': '4'})
+            self.assertEqual(type(org).folding_threads, 4)
+            with self.assertRaises(run.OrgException):
+                run.process_initial_org(
+                    {'Organism Type': 'RNA', 'Folding Threads': '0'})
+            run.rna_organism.vienna_distance.PARALLEL_FOLDING = False
+            with self.assertRaises(run.OrgException):
+                run.process_initial_org(
+                    {'Organism Type': 'RNA', 'Folding Threads': '4'})
+        finally:
+            run.rna_organism.Organism.folding_threads = 1
+            run.rna_organism.vienna_distance.PARALLEL_FOLDING = \
+                parallel_folding
+
+    def test_attach_fitness_cache(self):
+        nk = {
+            'Organism Type': 'NK Model',
+            'Length of Org': '5',
+            'K-total': '3',
+            'Fitness Cache Size': '10'}
+        org = run.process_initial_org(nk)
+        self.assertEqual(org.nk_model.fitness_cache.max_size, 10)
+        bitstring = {'Organism Type': 'Bitstring', 'Length of Org': '5',
+                     'Fitness Cache Size': '10'}
+        org = run.process_initial_org(bitstring)
+        self.assertEqual(type(org).fitness_cache.max_size, 10)
+        del bitstring['Fitness Cache Size']
+        org = run.process_initial_org(bitstring)
+        self.assertIsNone(type(org).fitness_cache)
+
     def test_process_initial_population(self):
         single_pop = {
             'Organism Type': 'Bitstring',
@@ -85,6 +208,184 @@ class TestRun(TC):
         run.process_initial_population(meta_pops)
         run.process_initial_population(structured_pops)
 
+    def test_deme_topology(self):
+        settings = {
+            'Organism Type': 'Bitstring',
+            'Mutation Rate': '0.01',
+            'Length of Org': '5',
+            'Orgs per Population': '10',
+            'Number of Subpopulations in Width': '3',
+            'Number of Subpopulations in Height': '4',
+            'Migration Type': 'Local',
+            'Migration Rate': '0.5',
+            'Proportion of Population Migrated': '0.5'}
+        degrees = {'Grid4': 4, 'Grid8': 8, 'Ring': 2}
+        for topology, degree in degrees.items():
+            meta_pop = run.process_initial_population(
+                dict(settings, **{'Deme Topology': topology}))
+            self.assertEqual(len(meta_pop.topology.neighbors(5)), degree)
+        meta_pop = run.process_initial_population(dict(settings, **{
+            'Deme Topology': 'Islands', 'Demes per Island': '4'}))
+        self.assertEqual(meta_pop.topology.neighbors(4), [5, 6, 7, 8, 0])
+        meta_pop = run.process_initial_population(dict(settings, **{
+            'Deme Topology': 'Edges',
+            'Deme Edges': '; '.join('{}-{}'.format(deme, (deme + 1) % 12)
+                                    for deme in range(12))}))
+        self.assertEqual(meta_pop.topology.neighbors(0), [1, 11])
+        meta_pop.migrate()
+        with self.assertRaises(ValueError):
+            run.process_initial_population(dict(settings, **{
+                'Deme Topology': 'Islands', 'Demes per Island': '5'}))
+        with self.assertRaises(ValueError):
+            run.process_initial_population(
+                dict(settings, **{'Deme Topology': 'Wrong'}))
+
+    def test_selection_model(self):
+        settings = {
+            'Organism Type': 'Bitstring',
+            'Mutation Rate': '0.01',
+            'Length of Org': '5',
+            'Orgs per Population': '10',
+            'Number of Populations': '2',
+            'Migration Rate': '0.5',
+            'Proportion of Population Migrated': '0.5',
+            'Selection Model': 'Wright-Fisher'}
+        meta_pop = run.process_initial_population(settings)
+        for pop in meta_pop:
+            self.assertEqual(pop.selection_model, 'Wright-Fisher')
+        meta_pop.advance_generation()
+        self.assertEqual([len(pop) for pop in meta_pop], [10, 10])
+        with self.assertRaises(ValueError):
+            run.process_initial_population(
+                dict(settings, **{'Selection Model': 'Wrong'}))
+
+    def test_migration_model(self):
+        settings = {
+            'Organism Type': 'Bitstring',
+            'Mutation Rate': '0.01',
+            'Length of Org': '5',
+            'Orgs per Population': '10',
+            'Number of Populations': '2',
+            'Migration Rate': '0.5',
+            'Proportion of Population Migrated': '0.5',
+            'Migration Model': 'Poisson'}
+        meta_pop = run.process_initial_population(settings)
+        self.assertEqual(meta_pop.migration_model, 'Poisson')
+        meta_pop.advance_generation()
+        with self.assertRaises(ValueError):
+            run.process_initial_population(
+                dict(settings, **{'Migration Model': 'Wrong'}))
+
+    def test_population_representation(self):
+        settings = {
+            'Organism Type': 'Bitstring',
+            'Mutation Rate': '0.01',
+            'Length of Org': '5',
+            'Orgs per Population': '10',
+            'Population Representation': 'Compressed'}
+        pop = run.process_initial_population(settings)
+        self.assertEqual(len(pop), 10)
+        self.assertEqual(pop.number_of_genotypes(), 1)
+        run.run_population(pop, 2)
+        self.assertEqual(len(pop), 10)
+        with self.assertRaises(ValueError):
+            run.process_initial_population(
+                dict(settings, **{'Population Representation': 'Wrong'}))
+
+    def test_parallel_workers(self):
+        settings = {
+            'Organism Type': 'Bitstring',
+            'Mutation Rate': '0.5',
+            'Length of Org': '5',
+            'Orgs per Population': '10',
+            'Number of Populations': '4',
+            'Migration Rate': '0.5',
+            'Proportion of Population Migrated': '0.5',
+            'Number of Generations': '3',
+            'Output File Path': self.temp_file,
+            'Statistics Interval': '10',
+            'Parallel Workers': '2'}
+        run.process_and_run(settings)
+        saved_run, = persistence.values(self.temp_file)
+        self.assertEqual([len(pop) for pop in saved_run.final_population],
+                         [10] * 4)
+        generations, sizes = saved_run.other_data["Statistics"].trajectory(
+            "size")
+        self.assertEqual(generations.tolist(), [0])
+        self.assertEqual(sizes.tolist(), [40])
+        self.assertEqual(saved_run.other_data["Genome Arena Bytes"],
+                         4 * (10 * 25 + 8))
+        with self.assertRaises(ValueError):
+            run.process_and_run(dict(settings, **{'Parallel Workers': '-1'}))
+        with self.assertRaises(ValueError):
+            run.process_and_run(dict(settings, **{
+                'Genome Arena Limit (MB)': '0.0001'}))
+        nk_settings = dict(settings, **{
+            'Organism Type': 'NK Model', 'K-total': '2'})
+        with self.assertRaises(run.OrgException):
+            run.process_and_run(nk_settings)
+        nk_settings['NK Contribution Tables'] = 'Dense'
+        run.process_and_run(nk_settings)
+
+    def test_checkpoint_resume(self):
+        settings = {
+            'Organism Type': 'NK Model',
+            'K-total': '3',
+            'Mutation Rate': '0.2',
+            'Length of Org': '12',
+            'Orgs per Population': '8',
+            'Number of Subpopulations in Width': '2',
+            'Number of Subpopulations in Height': '2',
+            'Migration Type': 'Local',
+            'Migration Rate': '0.5',
+            'Proportion of Population Migrated': '0.25',
+            'Statistics Interval': '3',
+            'Number of Generations': '12',
+            'Checkpoint Interval': '5',
+            'Output File Path': self.temp_file}
+        checkpoint_path = self.temp_file + run.CHECKPOINT_SUFFIX
+
+        def saved_run():
+            saved, = persistence.values(self.temp_file)
+            os.remove(persistence.index_path(self.temp_file))
+            with persistence.get_shelf(self.temp_file) as shelf:
+                shelf.clear()
+            return ([[(org.value, org.fitness, org.self_id, org.parent_id)
+                      for org in pop] for pop in saved.final_population],
+                    saved.other_data["Statistics"].records()["mean_fitness"]
+                    .tolist())
+
+        random.seed(5)
+        run.process_and_run(dict(settings))
+        uninterrupted = saved_run()
+        self.assertFalse(os.path.exists(checkpoint_path))
+
+        class Crash(Exception):
+            pass
+
+        def crash_after_checkpoint(checkpointer, population, generation):
+            save(checkpointer, population, generation)
+            if generation == 10:
+                raise Crash()
+
+        save = checkpoint.Checkpointer.save
+        checkpoint.Checkpointer.save = crash_after_checkpoint
+        random.seed(5)
+        try:
+            with self.assertRaises(Crash):
+                run.process_and_run(dict(settings))
+        finally:
+            checkpoint.Checkpointer.save = save
+        random.seed(123)
+        with self.assertRaises(ValueError):
+            run.process_and_run(dict(settings, **{'Mutation Rate': '0.1'}),
+                                resume=True)
+        run.process_and_run(dict(settings), resume=True)
+        self.assertEqual(saved_run(), uninterrupted)
+        self.assertFalse(os.path.exists(checkpoint_path))
+        with self.assertRaises(ValueError):
+            run.process_and_run(dict(settings, **{'Parallel Workers': '2'}))
+
     def test_process_and_run(self):
         settings = {
             'Organism Type': 'Bitstring',
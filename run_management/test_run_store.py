@@ -0,0 +1,120 @@
+from unittest import TestCase as TC
+import os
+import shutil
+import tempfile
+
+from structure_and_landscapes.organism.integer.organism import \
+    Organism as IntOrganism
+from structure_and_landscapes.organism.bitstring.bitstring import Bitstring
+from structure_and_landscapes.organism.bitstring.nk_model import nk_model
+from structure_and_landscapes.organism.bitstring.nk_model.organism import \
+    Organism as NKOrganism
+from structure_and_landscapes.population.population import Population
+from structure_and_landscapes.population.meta_population import \
+    MetaPopulation
+
+import persistence
+import run_store
+
+
+class MockRun(object):
+    def __init__(self, initial_population, final_population, parameters,
+                 other_data=None):
+        self.initial_population = initial_population
+        self.final_population = final_population
+        self.parameters = parameters
+        self.other_data = other_data
+
+
+class TestRunStore(TC):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.store = os.path.join(self.temp_dir, "store")
+        self.model = nk_model.NKModelFactory(
+            dense_tables=True).non_consecutive_dependencies(8, 3)
+        founder = NKOrganism(Bitstring("10110010"), nk_model=self.model)
+        self.orgs = [founder, founder.mutate(), founder]
+        self.run = MockRun(
+            Population(self.orgs[:1]),
+            MetaPopulation([Population(self.orgs),
+                            Population(self.orgs[1:])], 0.5, 0.5),
+            {"Organism Type": "NK Model", "Mutation Rate": "0.01"},
+            {"note": "hi"})
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_save_load(self):
+        key = run_store.save_run(self.store, self.run)
+        loaded = run_store.load_run(self.store, key)
+        self.assertEqual(loaded.parameters, self.run.parameters)
+        self.assertEqual(loaded.other_data, {"note": "hi"})
+        self.assertEqual(loaded.final_population.mig_rate, 0.5)
+        orgs = [org for pop in loaded.final_population for org in pop]
+        self.assertEqual([org.value for org in orgs],
+                         [org.value for org in self.orgs + self.orgs[1:]])
+        self.assertEqual([org.self_id for org in orgs],
+                         [org.self_id for org in self.orgs + self.orgs[1:]])
+        self.assertEqual(orgs[1].parent_id, self.orgs[0].self_id)
+        self.assertIsNone(orgs[0].parent_id)
+        # Shared objects stay shared, the landscape is stored once
+        self.assertIs(orgs[0], orgs[2])
+        self.assertIs(orgs[0], loaded.initial_population[0])
+        self.assertIs(orgs[0].nk_model, orgs[1].nk_model)
+        self.assertEqual(orgs[1].fitness, self.orgs[1].fitness)
+
+    def test_fitness_not_evaluated(self):
+        self.run.initial_population = Population([NKOrganism(
+            Bitstring("00000000"), nk_model=self.model)])
+        key = run_store.save_run(self.store, self.run)
+        org, = run_store.load_run(self.store, key).initial_population
+        self.assertIsNone(org._fitness)
+
+    def test_other_values(self):
+        self.run.initial_population = Population(
+            [IntOrganism(3), IntOrganism(-2)])
+        key = run_store.save_run(self.store, self.run)
+        loaded = run_store.load_run(self.store, key)
+        self.assertEqual([org.value for org in loaded.initial_population],
+                         [3, -2])
+
+    def test_legacy_ids(self):
+        org = IntOrganism(3)
+        org.self_id = "7c9e6679-7425-40de-944b-e07fc1f90ae7"
+        self.run.initial_population = Population([org])
+        key = run_store.save_run(self.store, self.run)
+        loaded_org, = run_store.load_run(self.store, key).initial_population
+        self.assertEqual(loaded_org.self_id, org.self_id)
+
+    def test_metadata_values(self):
+        keys = [run_store.save_run(self.store, self.run) for _ in range(2)]
+        self.run.parameters = {"Organism Type": "RNA"}
+        run_store.save_run(self.store, self.run, key="rna")
+        # Saved again under its key, a run replaces the one saved before
+        run_store.save_run(self.store, self.run, key="rna")
+        self.assertEqual([entry["key"] for entry in
+                          run_store.metadata(self.store)], keys + ["rna"])
+        self.assertEqual(len(list(run_store.values(self.store))), 3)
+        rna_runs = list(run_store.values(
+            self.store, {"Organism Type": "RNA"}))
+        self.assertEqual(len(rna_runs), 1)
+        self.assertEqual(list(run_store.metadata(self.temp_dir)), [])
+
+    def test_partial_line(self):
+        run_store.save_run(self.store, self.run, key="a")
+        with open(os.path.join(self.store, run_store.METADATA), "a") as \
+                metadata_file:
+            metadata_file.write('{"key": "b", "param')
+        self.assertEqual([entry["key"] for entry in
+                          run_store.metadata(self.store)], ["a"])
+        run_store.save_run(self.store, self.run, key="c")
+        self.assertEqual([entry["key"] for entry in
+                          run_store.metadata(self.store)], ["a", "c"])
+        self.assertEqual(len(list(run_store.values(self.store))), 2)
+
+    def test_import_shelf(self):
+        shelf_path = os.path.join(self.temp_dir, "runs.shelf")
+        persistence.save(shelf_path, "a", self.run)
+        run_store.import_shelf(shelf_path, self.store)
+        loaded = run_store.load_run(self.store, "a")
+        self.assertEqual(loaded.parameters, self.run.parameters)
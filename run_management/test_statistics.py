@@ -0,0 +1,96 @@
+from unittest import TestCase as TC
+import math
+import shutil
+import tempfile
+
+from structure_and_landscapes.organism.integer.organism import Organism
+from structure_and_landscapes.population.population import Population
+from structure_and_landscapes.population.compressed_population import \
+    CompressedPopulation
+from structure_and_landscapes.population.meta_population import \
+    MetaPopulation
+from structure_and_landscapes.population.parallel import \
+    ParallelMetaPopulation
+
+from statistics import StatisticsRecorder, WHOLE_POPULATION, summarize, \
+    genotype_counts
+
+
+class TestModule(TC):
+    def test_genotype_counts(self):
+        pop = Population([Organism(1), Organism(2), Organism(1)])
+        self.assertEqual(genotype_counts(pop), {Organism(1): 2,
+                                                Organism(2): 1})
+        compressed = CompressedPopulation(pop)
+        self.assertEqual(genotype_counts(compressed), genotype_counts(pop))
+
+    def test_summarize(self):
+        size, mean, max_fitness, variance, genotypes, diversity = summarize(
+            {Organism(1): 2, Organism(3): 2})
+        self.assertEqual(size, 4)
+        self.assertAlmostEqual(mean, 3)
+        self.assertAlmostEqual(max_fitness, 4)
+        self.assertAlmostEqual(variance, 1)
+        self.assertEqual(genotypes, 2)
+        self.assertAlmostEqual(diversity, math.log(2))
+        self.assertEqual(summarize({})[0], 0)
+
+
+class TestStatisticsRecorder(TC):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.pops = [Population([Organism(1), Organism(3)]),
+                     Population([Organism(3), Organism(3)])]
+        self.meta_pop = MetaPopulation(self.pops, 0.5, 0.5)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_record(self):
+        recorder = StatisticsRecorder()
+        recorder.record(self.meta_pop, 0)
+        records = recorder.records()
+        self.assertEqual(records["deme"].tolist(), [0, 1, WHOLE_POPULATION])
+        self.assertEqual(records["size"].tolist(), [2, 2, 4])
+        self.assertEqual(records["genotypes"].tolist(), [2, 1, 2])
+        self.assertAlmostEqual(records["mean_fitness"][2], 3.5)
+        self.assertAlmostEqual(records["diversity"][1], 0)
+
+    def test_record_population(self):
+        recorder = StatisticsRecorder()
+        recorder.record(self.pops[0], 0)
+        self.assertEqual(recorder.records()["deme"].tolist(),
+                         [WHOLE_POPULATION])
+
+    def test_record_generation(self):
+        recorder = StatisticsRecorder(interval=2)
+        for generation in range(5):
+            recorder.record_generation(self.pops[0], generation)
+        generations, max_fitnesses = recorder.trajectory("max_fitness")
+        self.assertEqual(generations.tolist(), [0, 2, 4])
+        self.assertEqual(max_fitnesses.tolist(), [4, 4, 4])
+        with self.assertRaises(ValueError):
+            StatisticsRecorder(interval=0)
+
+    def test_chunks(self):
+        recorder = StatisticsRecorder(directory=self.temp_dir, capacity=2)
+        for generation in range(3):
+            recorder.record(self.meta_pop, generation)
+        self.assertEqual(len(recorder.records()["generation"]), 9)
+        recorder.flush()
+        self.assertEqual(recorder.records()["generation"].tolist(),
+                         [0, 0, 0, 1, 1, 1, 2, 2, 2])
+        in_memory = StatisticsRecorder(capacity=2)
+        in_memory.record(self.meta_pop, 0)
+        self.assertEqual(len(in_memory.records()["generation"]), 3)
+
+    def test_parallel(self):
+        recorder = StatisticsRecorder()
+        recorder.record(self.meta_pop, 0)
+        parallel = ParallelMetaPopulation(self.meta_pop, workers=2)
+        recorder.record(parallel, 0)
+        parallel.close()
+        records = recorder.records()
+        for name in ("size", "mean_fitness", "genotypes"):
+            self.assertEqual(records[name][:3].tolist(),
+                             records[name][3:].tolist())
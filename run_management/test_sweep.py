@@ -0,0 +1,132 @@
+from unittest import TestCase as TC
+import glob
+import io
+import json
+import os
+import shutil
+import tempfile
+
+import persistence
+import run_store
+import sweep
+
+
+class TestSweep(TC):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.directory = os.path.join(self.temp_dir, "sweep")
+        self.output = os.path.join(self.temp_dir, "runs.shelf")
+        self.settings = [{'Organism Type': 'Bitstring',
+                          'Mutation Rate': rate,
+                          'Length of Org': '8',
+                          'Orgs per Population': '6',
+                          'Number of Generations': '3',
+                          'Output File Path': self.output}
+                         for rate in ('0.1', '0.5')]
+        self.progress = io.BytesIO()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def saved(self, output=None):
+        """
+        (Mutation Rate, final genomes) of each run saved, sorted
+        """
+        return sorted(
+            (run.parameters['Mutation Rate'],
+             [str(org.value) for org in run.final_population])
+            for run in persistence.values(output or self.output))
+
+    def test_job_seed(self):
+        self.assertEqual(sweep.job_seed(3, 1), sweep.job_seed(3, 1))
+        seeds = set(sweep.job_seed(3, index) for index in range(100))
+        seeds.add(sweep.job_seed(4, 0))
+        self.assertEqual(len(seeds), 101)
+
+    def test_make_jobs(self):
+        jobs = sweep.make_jobs(self.settings, 2)
+        self.assertEqual([job['Mutation Rate'] for job in jobs],
+                         ['0.1', '0.5', '0.1', '0.5'])
+        self.assertIsNot(jobs[0], self.settings[0])
+
+    def test_run_sweep(self):
+        failed = sweep.run_sweep(self.settings, 2, self.directory, seed=7,
+                                 progress=self.progress)
+        self.assertEqual(failed, [])
+        self.assertEqual(len(self.saved()), 4)
+        self.assertEqual(sorted(sweep.finished_jobs(self.directory)),
+                         [0, 1, 2, 3])
+        self.assertIn("[4/4]", self.progress.getvalue())
+        # The same seed runs the same jobs, in any number of processes
+        other_output = os.path.join(self.temp_dir, "other.shelf")
+        for setting in self.settings:
+            setting['Output File Path'] = other_output
+        sweep.run_sweep(self.settings, 2,
+                        os.path.join(self.temp_dir, "other"), jobs=2,
+                        seed=7, progress=self.progress)
+        self.assertEqual(self.saved(other_output), self.saved())
+
+    def test_resume(self):
+        sweep.run_sweep(self.settings, 1, self.directory, seed=7,
+                        progress=self.progress)
+        with self.assertRaises(ValueError):
+            sweep.run_sweep(self.settings, 1, self.directory,
+                            progress=self.progress)
+        with self.assertRaises(ValueError):
+            sweep.run_sweep(self.settings, 2, self.directory, resume=True,
+                            progress=self.progress)
+        # As if job 1 was cut short, before consolidating
+        os.remove(os.path.join(self.directory, sweep.DONE, "1"))
+        for path in glob.glob(self.output + "*"):
+            os.remove(path)
+        shard = sweep.finished_jobs(self.directory)[0]
+        with open(os.path.join(self.directory, sweep.DONE, "0"), "w") as \
+                marker:
+            marker.write(json.dumps({"shard": shard, "consolidated": False}))
+        sweep.run_sweep(self.settings, 1, self.directory, resume=True,
+                        progress=self.progress)
+        self.assertIn("[2/2] job 1 finished", self.progress.getvalue())
+        self.assertEqual(len(self.saved()), 2)
+        # Shards consolidated already aren't merged again
+        sweep.run_sweep(self.settings, 1, self.directory, resume=True,
+                        progress=self.progress)
+        with open(persistence.index_path(self.output)) as index_file:
+            self.assertEqual(len(index_file.readlines()), 2)
+
+    def test_failure_isolated(self):
+        self.settings[0]['Organism Type'] = 'Not a type'
+        failed = sweep.run_sweep(self.settings, 1, self.directory,
+                                 progress=self.progress)
+        self.assertEqual(failed, [0])
+        self.assertEqual([rate for rate, _ in self.saved()], ['0.5'])
+        with open(os.path.join(self.directory, sweep.FAILED, "0")) as trace:
+            self.assertIn("Traceback", trace.read())
+        self.settings[0]['Organism Type'] = 'Bitstring'
+        failed = sweep.run_sweep(self.settings, 1, self.directory,
+                                 resume=True, progress=self.progress)
+        self.assertEqual(failed, [])
+        self.assertFalse(os.listdir(os.path.join(self.directory,
+                                                 sweep.FAILED)))
+        self.assertEqual(len(self.saved()), 2)
+
+    def test_parallel_workers_refused(self):
+        self.settings[0]['Parallel Workers'] = '2'
+        with self.assertRaises(ValueError):
+            sweep.run_sweep(self.settings, 1, self.directory, jobs=2,
+                            progress=self.progress)
+
+    def test_store_job_saved_once(self):
+        store = os.path.join(self.temp_dir, "store")
+        for setting in self.settings:
+            setting['Output Format'] = 'Store'
+            setting['Output File Path'] = store
+        sweep.run_sweep(self.settings, 1, self.directory, seed=7,
+                        progress=self.progress)
+        # As if job 0 was cut short after saving its run
+        os.remove(os.path.join(self.directory, sweep.DONE, "0"))
+        sweep.run_sweep(self.settings, 1, self.directory, resume=True,
+                        progress=self.progress)
+        self.assertEqual(
+            sorted(entry['key'] for entry in run_store.metadata(store)),
+            [sweep.run_key(7, 0), sweep.run_key(7, 1)])
+        self.assertEqual(len(list(run_store.values(store))), 2)
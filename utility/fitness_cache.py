@@ -0,0 +1,68 @@
+"""
+Bounded cache of fitnesses keyed on genotype (an organism's value).
+
+Shared by every organism on the same landscape, so identical genotypes
+arising independently (e.g. in different subpopulations) are evaluated
+once. Once full, the least recently used genotype is evicted.
+"""
+from collections import OrderedDict
+
+
+class FitnessCache(object):
+    def __init__(self, max_size):
+        """
+        max_size is the most genotypes held at once.
+        """
+        if max_size < 1:
+            raise ValueError("Fitness caches must hold at least one entry")
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._fitnesses = OrderedDict()
+
+    def __len__(self):
+        return len(self._fitnesses)
+
+    def __contains__(self, genotype):
+        return genotype in self._fitnesses
+
+    def get(self, genotype):
+        """
+        Returns the cached fitness of genotype (or None if absent),
+        counting the lookup as a hit or a miss.
+        """
+        try:
+            fitness = self._fitnesses.pop(genotype)
+        except KeyError:
+            self.misses += 1
+            return None
+        self._fitnesses[genotype] = fitness
+        self.hits += 1
+        return fitness
+
+    def store(self, genotype, fitness):
+        """
+        Caches the fitness of genotype, evicting the least recently used
+        genotype if over capacity.
+        """
+        self._fitnesses.pop(genotype, None)
+        self._fitnesses[genotype] = fitness
+        if len(self._fitnesses) > self.max_size:
+            self._fitnesses.popitem(last=False)
+
+    def hit_rate(self):
+        """
+        Returns the proportion of lookups that were hits.
+        """
+        lookups = self.hits + self.misses
+        if not lookups:
+            return 0.0
+        return float(self.hits) / lookups
+
+    def clear(self):
+        """
+        Empties the cache and resets the counters.
+        """
+        self._fitnesses.clear()
+        self.hits = 0
+        self.misses = 0
@@ -2,6 +2,8 @@ import functools
 
 
 class KeyedEqualityMixin(object):
+    __slots__ = ()
+
     def __eq__(self, other):
         if type(self) != type(other):
             return False
@@ -13,6 +15,8 @@ class KeyedEqualityMixin(object):
 
 @functools.total_ordering
 class KeyedComparisonMixin(KeyedEqualityMixin):
+    __slots__ = ()
+
     def __lt__(self, other):
         if type(self) != type(other):
             return id(self) < id(other)
@@ -20,5 +24,7 @@ class KeyedComparisonMixin(KeyedEqualityMixin):
 
 
 class KeyedHashingMixin(KeyedEqualityMixin):
+    __slots__ = ()
+
     def __hash__(self):
         return hash(self.__key__())
@@ -1,30 +1,82 @@
 """
 Module to perform fitness proportional selection
-Selection is based off number line proportionally
-If random number is selected in area that has already been selected
-   the space in the population will be returned unfilled
+Selection draws from the cumulative fitness of the organisms (a
+FitnessSampler), with or without replacement
 
 Birth-death models:
 Moran: Random death, among neighbors (well mixed for everyone) pick organism
 to give birth into that slot do it 1,000 times for a population size of 1,000.
 This is termed a "generation"
+
+Wright-Fisher: The whole population is replaced at once, every offspring
+choosing its parent in proportion to fitness (non-overlapping generations).
 """
 import random
+from collections import OrderedDict
+import numpy
 import fitness_tree
+from structure_and_landscapes.organism.abstract_organism import \
+    evaluate_fitness_batch
+
+
+class FitnessSampler(object):
+    """
+    Draws orgs in proportion to fitness from a cumulative sum of their
+    fitnesses, built once.
+    """
+
+    def __init__(self, orgs):
+        self.orgs = list(orgs)
+        self._fitnesses = numpy.array(
+            [org.fitness for org in self.orgs], dtype=float)
+        self._cumulative = numpy.cumsum(self._fitnesses)
+        self._random_state = numpy.random.RandomState(
+            random.getrandbits(32))
+
+    def __len__(self):
+        return len(self.orgs)
+
+    def sample(self, number_of_draws, replace=True):
+        """
+        Returns the indices of number_of_draws orgs drawn by fitness.
+        Without replacement each draw is among the orgs not yet drawn.
+        """
+        if not number_of_draws:
+            return []
+        if replace:
+            total = self._cumulative[-1] if len(self) else 0.0
+            if total <= 0:
+                raise ValueError("Can't draw by fitness without fitness.")
+            draws = self._random_state.random_sample(number_of_draws)
+            indices = numpy.searchsorted(
+                self._cumulative, draws * total, side="right")
+            return numpy.minimum(indices, len(self) - 1).tolist()
+        if number_of_draws > len(self):
+            raise ValueError("Can't draw more orgs than there are.")
+        # The largest of u ** (1 / fitness) are a weighted draw without
+        # replacement (Efraimidis and Spirakis); compared as logarithms
+        with numpy.errstate(divide="ignore"):
+            keys = (numpy.log(self._random_state.random_sample(len(self))) /
+                    self._fitnesses)
+        return numpy.argsort(-keys, kind="mergesort")[
+            :number_of_draws].tolist()
+
+    def choose(self):
+        """
+        Returns an org drawn by fitness.
+        """
+        return self.orgs[self.sample(1)[0]]
 
 
 def select(organisms, number_of_draws):
-    new_population = []
-    numberlined = numberline(organisms)
-    already_added = object()
-    for n in range(number_of_draws):
-        for (i, (org, cum_fit)) in enumerate(numberlined):
-            if random.random() < cum_fit:
-                if org is not already_added:
-                    new_population.append(org)
-                    numberlined[i][0] = already_added
-                break
-    return new_population
+    """
+    Returns number_of_draws different organisms (or all of them if there
+    are fewer), drawn one after another in proportion to fitness.
+    """
+    sampler = FitnessSampler(organisms)
+    number_of_draws = min(number_of_draws, len(sampler))
+    return [sampler.orgs[index]
+            for index in sampler.sample(number_of_draws, replace=False)]
 
 
 def numberline(orgs):
@@ -57,43 +109,59 @@ def moran_death_birth(orgs, mutation_rate, desired_number_of_orgs=None):
     """
     Method to execute the replacement of organism in a death-birth
     fashion using fecundity to replace the randomly selected death organism
+
+    Orgs not yet evaluated are evaluated together up front; a newborn is
+    evaluated at birth since later births are weighted by its fitness.
+    orgs is updated in place (and returned).
     """
-    tree = fitness_tree.build_tree(orgs)
+    evaluate_fitness_batch(orgs)
     if desired_number_of_orgs is None:
         desired_number_of_orgs = len(orgs)
-    tree = _bring_orgs_to_desired_number_in_tree(
-        tree, mutation_rate, desired_number_of_orgs - len(orgs))
-    for _ in range(desired_number_of_orgs):
-        tree, removed_org = fitness_tree.remove_leaf_uniformly(tree)
-        tree = _add_child_by_fitness_to_tree(tree, mutation_rate)
-    return fitness_tree.tree_to_list(tree)
+    survivors = orgs
+    if desired_number_of_orgs < len(orgs):
+        survivors = random.sample(orgs, desired_number_of_orgs)
+    tree = fitness_tree.FitnessTree(desired_number_of_orgs, survivors)
+    while len(tree) < tree.capacity:
+        tree.add(_child_by_fitness(tree, mutation_rate))
+    _moran_events(tree, mutation_rate, desired_number_of_orgs)
+    orgs[:] = tree.to_list()
+    return orgs
 
 
-def _bring_orgs_to_desired_number_in_tree(tree, mutation_rate,
-                                          delta_number_of_orgs):
+def _moran_events(tree, mutation_rate, number_of_events):
     """
-    Adds (by fitness) or removes (uniformily) orgs from tree by delta number
-    of orgs (positive adds, negative removes).
-    Returns modified tree
+    Replaces an org of the (full) tree number_of_events times, one after
+    the other, by the child of an org chosen by fitness among the others.
+    The random draws for all of the events are made up front.
     """
-    while delta_number_of_orgs > 0:
-        tree = _add_child_by_fitness_to_tree(tree, mutation_rate)
-        delta_number_of_orgs -= 1
-    while delta_number_of_orgs < 0:
-        tree, removed_org = fitness_tree.remove_leaf_uniformly(tree)
-        delta_number_of_orgs += 1
-    return tree
+    if not number_of_events:
+        return
+    random_state = numpy.random.RandomState(random.getrandbits(32))
+    deaths = random_state.randint(tree.capacity, size=number_of_events)
+    births = random_state.random_sample(number_of_events)
+    mutations = random_state.random_sample(number_of_events) < mutation_rate
+    for slot_to_kill, birth, mutates in zip(
+            deaths.tolist(), births.tolist(), mutations.tolist()):
+        if tree.total_fitness <= tree[slot_to_kill].fitness:
+            raise ValueError("No org left to give birth.")
+        # Emptied, the dead's slot weighs nothing, so a single draw
+        # chooses in proportion to fitness among the others
+        tree[slot_to_kill] = None
+        child = tree[tree.choose_slot_by_fitness(birth)]
+        if mutates:
+            child = child.mutate()
+        tree[slot_to_kill] = child
 
 
-def _add_child_by_fitness_to_tree(tree, mutation_rate):
+def _child_by_fitness(tree, mutation_rate):
     """
     Takes a fitness tree and a mutation rate.
-    Returns a tree with a new org (chosen by fitness and possibly mutated)
+    Returns a new org (parent chosen by fitness and possibly mutated)
     """
-    chosen_to_give_birth = fitness_tree.choose_leaf_by_fitness(tree)
+    chosen_to_give_birth = tree[tree.choose_slot_by_fitness()]
     if random.random() < mutation_rate:
         chosen_to_give_birth = chosen_to_give_birth.mutate()
-    return fitness_tree.add_to_tree(tree, chosen_to_give_birth)
+    return chosen_to_give_birth
 
 
 def moran_death_birth_numberline(orgs, mutation_rate,
@@ -101,36 +169,89 @@ def moran_death_birth_numberline(orgs, mutation_rate,
     """
     Method to execute the replacement of organism in a death-birth
     fashion using fecundity to replace the randomly selected death organism
+
+    Unlike moran_death_birth the parent is chosen among all of the orgs,
+    the dying one included. The orgs are held in a fitness tree, so each
+    birth takes time logarithmic in the size of the population.
+    orgs is updated in place (and returned).
     """
     if desired_number_of_orgs is None:
         desired_number_of_orgs = len(orgs)
-
-    while desired_number_of_orgs > len(orgs):
-        _add_child_by_fitness_to_list(orgs, mutation_rate)
-    while desired_number_of_orgs < len(orgs):
-        index_to_kill = random.randrange(len(orgs))
-        del orgs[index_to_kill]
-
+    evaluate_fitness_batch(orgs)
+    survivors = orgs
+    if desired_number_of_orgs < len(orgs):
+        survivors = random.sample(orgs, desired_number_of_orgs)
+    tree = fitness_tree.FitnessTree(desired_number_of_orgs, survivors)
+    while len(tree) < tree.capacity:
+        tree.add(_fit_child(tree, mutation_rate))
     for _ in range(desired_number_of_orgs):
-        index_to_kill = random.randrange(len(orgs))
-        chosen_to_give_birth = fecundity_birth_selection(orgs)
-        if random.random() < mutation_rate:
-            chosen_to_give_birth = chosen_to_give_birth.mutate()
-        orgs[index_to_kill] = chosen_to_give_birth
+        slot_to_kill = tree.choose_slot_uniformly()
+        tree[slot_to_kill] = _fit_child(tree, mutation_rate)
+    orgs[:] = tree.to_list()
     return orgs
 
 
-def _add_child_by_fitness_to_list(orgs, mutation_rate):
-    chosen_to_give_birth = fecundity_birth_selection(orgs)
-    if random.random() < mutation_rate:
-        chosen_to_give_birth = chosen_to_give_birth.mutate()
-    orgs.append(chosen_to_give_birth)
+def _fit_child(tree, mutation_rate):
+    """
+    _child_by_fitness, refusing trees without fitness to draw by.
+    """
+    if tree.total_fitness <= 0:
+        raise ValueError("Can't draw by fitness without fitness.")
+    return _child_by_fitness(tree, mutation_rate)
 
 
 def fecundity_birth_selection(orgs):
     """Method to select an organism based off its fitness
     to replace death organism"""
-    numberlined = numberline(orgs)
-    for (i, (org, cum_fit)) in enumerate(numberlined):
-        if random.random() < cum_fit:
-            return org
+    return FitnessSampler(orgs).choose()
+
+
+def wright_fisher(orgs, mutation_rate, desired_number_of_orgs=None):
+    """
+    Returns the next (non-overlapping) generation of orgs.
+    The number of offspring of each genotype is a single multinomial draw
+    weighted by count times fitness, then the number of mutants among
+    them is a binomial draw; only the mutants are created individually.
+    Work is per distinct genotype (and per mutant), not per org.
+    """
+    if desired_number_of_orgs is None:
+        desired_number_of_orgs = len(orgs)
+    counts = OrderedDict()
+    for org in orgs:
+        counts[org] = counts.get(org, 0) + 1
+    next_generation = []
+    for org, count in wright_fisher_counts(
+            counts, mutation_rate, desired_number_of_orgs):
+        next_generation.extend([org] * count)
+    return next_generation
+
+
+def wright_fisher_counts(counts, mutation_rate, desired_number_of_orgs):
+    """
+    Wright-Fisher generation over genotype counts: takes a mapping of
+    org to count and returns a list of (org, count) pairs (mutants each
+    with a count of 1) totalling desired_number_of_orgs.
+    """
+    if not desired_number_of_orgs:
+        return []
+    if not counts:
+        raise ValueError("Can't reproduce from an empty population.")
+    genotypes = list(counts)
+    evaluate_fitness_batch(genotypes)
+    weights = numpy.array([counts[org] * org.fitness for org in genotypes],
+                          dtype=float)
+    random_state = numpy.random.RandomState(random.getrandbits(32))
+    offspring = random_state.multinomial(
+        desired_number_of_orgs, weights / weights.sum())
+    mutant_counts = random_state.binomial(
+        offspring, min(max(mutation_rate, 0.0), 1.0))
+    next_generation = []
+    mutants = []
+    for org, number, number_mutated in zip(
+            genotypes, offspring.tolist(), mutant_counts.tolist()):
+        if number > number_mutated:
+            next_generation.append((org, number - number_mutated))
+        mutants.extend(org.mutate() for _ in range(number_mutated))
+    evaluate_fitness_batch(mutants)
+    next_generation.extend((mutant, 1) for mutant in mutants)
+    return next_generation
@@ -0,0 +1,38 @@
+from unittest import TestCase as TC
+
+from fitness_cache import FitnessCache
+
+
+class TestFitnessCache(TC):
+    def setUp(self):
+        self.cache = FitnessCache(2)
+
+    def test_init_exception(self):
+        with self.assertRaises(ValueError):
+            FitnessCache(0)
+
+    def test_get_store(self):
+        self.assertIsNone(self.cache.get("a"))
+        self.cache.store("a", 1.5)
+        self.assertEqual(self.cache.get("a"), 1.5)
+        self.assertEqual(self.cache.hits, 1)
+        self.assertEqual(self.cache.misses, 1)
+        self.assertAlmostEqual(self.cache.hit_rate(), 0.5)
+
+    def test_least_recently_used_evicted(self):
+        self.cache.store("a", 1)
+        self.cache.store("b", 2)
+        self.cache.get("a")
+        self.cache.store("c", 3)
+        self.assertEqual(len(self.cache), 2)
+        self.assertIn("a", self.cache)
+        self.assertNotIn("b", self.cache)
+        self.assertIn("c", self.cache)
+
+    def test_clear(self):
+        self.cache.store("a", 1)
+        self.cache.get("a")
+        self.cache.clear()
+        self.assertEqual(len(self.cache), 0)
+        self.assertEqual(self.cache.hits, 0)
+        self.assertEqual(self.cache.hit_rate(), 0.0)
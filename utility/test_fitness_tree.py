@@ -19,77 +19,103 @@ class MockOrganism(object):
         return not self == other
 
 
-class TestModule(TC):
+class TestFitnessTree(TC):
     def setUp(self):
         self.orgs = [MockOrganism(1, "a"),
                      MockOrganism(2, "b"),
                      MockOrganism(3, "c")]
-        self.tree = build_tree(self.orgs)
+        self.tree = FitnessTree(5, self.orgs)
 
-    def test_build_tree(self):
+    def test_init(self):
         self.assertEqual(self.tree.total_fitness, 6)
-        self.assertEqual(self.tree.total_leaves, 3)
+        self.assertEqual(len(self.tree), 3)
+        self.assertEqual(self.tree.capacity, 5)
+        self.assertEqual(self.tree[1], self.orgs[1])
+        self.assertIsNone(self.tree[4])
 
-    def test_tree_to_list(self):
-        list_of_orgs = tree_to_list(self.tree)
-        self.assertEqual(set(list_of_orgs), set(self.orgs))
-
-    def test_add_to_tree(self):
+    def test_init_exception(self):
+        with self.assertRaises(ValueError):
+            FitnessTree(2, self.orgs)
+
+    def test_to_list(self):
+        self.assertEqual(self.tree.to_list(), self.orgs)
+
+    def test_setitem(self):
+        org_d = MockOrganism(4, "d")
+        self.tree[0] = org_d
+        self.assertEqual(self.tree.total_fitness, 9)
+        self.assertEqual(len(self.tree), 3)
+        self.tree[1] = None
+        self.assertEqual(self.tree.total_fitness, 7)
+        self.assertEqual(len(self.tree), 2)
+        self.tree[4] = self.orgs[1]
+        self.assertEqual(self.tree.total_fitness, 9)
+        self.assertEqual(self.tree.to_list(),
+                         [org_d, self.orgs[2], self.orgs[1]])
+        with self.assertRaises(IndexError):
+            self.tree[5] = org_d
+
+    def test_add(self):
         org_added = MockOrganism(4, "d")
-        new_tree = add_to_tree(self.tree, org_added)
-        new_list = tree_to_list(new_tree)
-
-        self.assertEqual(set(new_list), set(self.orgs + [org_added]))
-        self.assertEqual(self.tree.total_fitness, 10)
-        self.assertEqual(self.tree.total_leaves, 4)
-
-    def test_remove_leaf_uniformly_all(self):
-        removed_orgs = []
-        tree = self.tree
-        for _ in range(len(self.orgs)):
-            tree, org = remove_leaf_uniformly(tree)
-            removed_orgs.append(org)
-        self.assertEqual([], tree_to_list(self.tree))
-        self.assertEqual(set(removed_orgs), set(self.orgs))
+        self.tree[0] = None
+        slots = set([self.tree.add(org_added), self.tree.add(org_added),
+                     self.tree.add(org_added)])
+        self.assertEqual(slots, set([0, 3, 4]))
+        self.assertEqual(self.tree.total_fitness, 17)
+        with self.assertRaises(ValueError):
+            self.tree.add(org_added)
 
-    def test_remove_leaf_uniformly_exception(self):
+    def test_choose_slot_uniformly_all(self):
+        emptied = []
         for _ in range(len(self.orgs)):
-            self.tree, _ = remove_leaf_uniformly(self.tree)
+            slot = self.tree.choose_slot_uniformly()
+            emptied.append(self.tree[slot])
+            self.tree[slot] = None
+        self.assertEqual([], self.tree.to_list())
+        self.assertEqual(set(emptied), set(self.orgs))
+        self.assertEqual(self.tree.total_fitness, 0)
         with self.assertRaises(ValueError):
-            print(remove_leaf_uniformly(self.tree))
+            self.tree.choose_slot_uniformly()
 
-    def test_choose_leaf_by_fitness(self):
-        org = choose_leaf_by_fitness(self.tree)
-        self.assertIn(org, self.orgs)
+    def test_choose_slot_by_fitness(self):
+        slot = self.tree.choose_slot_by_fitness()
+        self.assertIn(self.tree[slot], self.orgs)
 
-    def test_choose_leaf_by_fitness_singleton(self):
-        single_tree = singleton_tree(self.orgs[0])
-        org = choose_leaf_by_fitness(single_tree)
-        self.assertEqual(org, self.orgs[0])
+    def test_choose_slot_by_fitness_uniform(self):
+        self.assertEqual(self.tree.choose_slot_by_fitness(0.0), 0)
+        self.assertEqual(self.tree.choose_slot_by_fitness(0.4), 1)
+        self.assertEqual(self.tree.choose_slot_by_fitness(0.99), 2)
 
-    def test_choose_leaf_by_fitness_error(self):
+    def test_choose_slot_by_fitness_singleton(self):
+        single_tree = FitnessTree(1, self.orgs[:1])
+        self.assertEqual(single_tree.choose_slot_by_fitness(), 0)
+
+    def test_choose_slot_by_fitness_skips_empty(self):
+        self.tree[0] = None
+        self.tree[2] = None
+        for _ in range(20):
+            self.assertEqual(self.tree.choose_slot_by_fitness(), 1)
+
+    def test_choose_slot_by_fitness_error(self):
+        with self.assertRaises(ValueError):
+            FitnessTree(3).choose_slot_by_fitness()
         with self.assertRaises(ValueError):
-            choose_leaf_by_fitness(empty_tree())
+            FitnessTree(0).choose_slot_by_fitness()
 
     @attr("probabilistic")
-    def test_choose_leaf_by_fitness_random(self):
+    def test_choose_slot_by_fitness_random(self):
         high_fit_org = MockOrganism(12, "high fit")
-        tree = add_to_tree(self.tree, high_fit_org)
-        draws = [choose_leaf_by_fitness(tree) for _ in range(100)]
+        self.tree.add(high_fit_org)
+        draws = [self.tree[self.tree.choose_slot_by_fitness()]
+                 for _ in range(100)]
         self.assertTrue(draws.count(high_fit_org) > 40)
         self.assertEqual(len(set(draws)), 4)
 
     @attr("probabilistic")
-    def test_remove_leaf_uniformly_random(self):
+    def test_choose_slot_uniformly_random(self):
         high_fit_org = MockOrganism(99, "high fit")
-        self.orgs.append(high_fit_org)
-        trees = [build_tree(self.orgs) for _ in range(40)]
-        removed_orgs = [remove_leaf_uniformly(tree)[1] for tree in trees]
-        self.assertEqual(len(set(removed_orgs)), 4)
-        self.assertTrue(removed_orgs.count(high_fit_org) < 20)
-
-    @attr("probabilistic")
-    def test_should_choose_first_weighted_bias(self):
-        outcomes = [None for _ in range(10)
-                    if should_choose_first_weighted(9, 1)]
-        self.assertTrue(len(outcomes) > 5)
+        self.tree.add(high_fit_org)
+        draws = [self.tree[self.tree.choose_slot_uniformly()]
+                 for _ in range(40)]
+        self.assertEqual(len(set(draws)), 4)
+        self.assertTrue(draws.count(high_fit_org) < 20)
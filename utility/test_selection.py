@@ -1,5 +1,6 @@
 import unittest
 from unittest import TestCase as TC
+from nose.plugins.attrib import attr
 
 import selection
 from selection import *
@@ -40,6 +41,10 @@ class TestSelection(TC):
 
         self.assertLessEqual(len(new_pop), number_draws)
 
+    def test_draws_all_asked(self):
+        self.assertEqual(len(select(self.pop, 2)), 2)
+        self.assertEqual(len(select(self.pop, 5)), 3)
+
     def test_no_duplicates(self):
         new_pop = select(self.pop, 2)
         new_pop_set = set(new_pop)
@@ -50,6 +55,38 @@ class TestSelection(TC):
         self.assertIsInstance(new_org, MockOrganism)
 
 
+class TestFitnessSampler(TC):
+    def setUp(self):
+        self.pop = [MockOrganism(1, 'A'), MockOrganism(0, 'B'),
+                    MockOrganism(2, 'C')]
+        self.sampler = FitnessSampler(self.pop)
+
+    def test_sample(self):
+        draws = self.sampler.sample(50)
+        self.assertEqual(len(draws), 50)
+        self.assertEqual(set(draws) - set([0, 2]), set())
+        self.assertEqual(self.sampler.sample(0), [])
+
+    def test_sample_without_replacement(self):
+        self.assertEqual(sorted(self.sampler.sample(3, replace=False)),
+                         [0, 1, 2])
+        draws = self.sampler.sample(2, replace=False)
+        self.assertEqual(sorted(draws), [0, 2])
+        with self.assertRaises(ValueError):
+            self.sampler.sample(4, replace=False)
+
+    def test_no_fitness(self):
+        with self.assertRaises(ValueError):
+            FitnessSampler([MockOrganism(0, 'A')]).sample(1)
+        with self.assertRaises(ValueError):
+            FitnessSampler([]).choose()
+
+    @attr("probabilistic")
+    def test_proportional(self):
+        draws = self.sampler.sample(3000)
+        self.assertAlmostEqual(draws.count(2) / 3000.0, 2 / 3.0, places=1)
+
+
 class TestNormalize(TC):
     def test_multiple(self):
         nums = [1, 2, 3]
@@ -109,8 +146,84 @@ class TestMoran(TC):
         self.assertEqual(len(new_new_pop), 2)
 
 
+class TestMoranEngine(TC):
+    def setUp(self):
+        self.pop = [MockOrganism(1, 'A'), MockOrganism(3, 'B'),
+                    MockOrganism(2, 'C')]
+
+    def test_in_place(self):
+        new_pop = moran_death_birth(self.pop, .5)
+        self.assertIs(new_pop, self.pop)
+        new_pop = moran_death_birth(self.pop, .5, desired_number_of_orgs=2)
+        self.assertIs(new_pop, self.pop)
+        self.assertEqual(len(self.pop), 2)
+
+    def test_parent_is_not_the_dead(self):
+        # With two orgs each birth copies the survivor into the dead slot
+        for _ in range(20):
+            pop = [MockOrganism(1, 'A'), MockOrganism(1000, 'B')]
+            moran_death_birth(pop, -1, desired_number_of_orgs=2)
+            self.assertEqual(len(set(org.identifier for org in pop)), 1)
+
+    def test_dead_holding_most_fitness(self):
+        # Redrawing until the dead isn't chosen would take ~10 ** 15 draws
+        pop = [MockOrganism(10 ** 15, 'A'), MockOrganism(1, 'B')]
+        moran_death_birth(pop, -1, desired_number_of_orgs=2)
+        self.assertEqual(len(set(org.identifier for org in pop)), 1)
+
+    def test_single_org(self):
+        with self.assertRaises(ValueError):
+            moran_death_birth(self.pop[:1], .5)
+
+
 class TestMoranNumberline(TestMoran):
     def setUp(self):
         self.pop = [MockOrganism(1, 'A'), MockOrganism(3, 'B'),
                     MockOrganism(2, 'C')]
         self.function = moran_death_birth_numberline
+
+    def test_in_place(self):
+        new_pop = self.function(self.pop, .5, desired_number_of_orgs=2)
+        self.assertIs(new_pop, self.pop)
+        self.assertEqual(len(self.pop), 2)
+
+    def test_no_fitness(self):
+        with self.assertRaises(ValueError):
+            self.function([MockOrganism(0, 'A'), MockOrganism(0, 'B')], .5)
+
+
+class TestWrightFisher(TC):
+    def setUp(self):
+        self.pop = [MockOrganism(1, 'A'), MockOrganism(3, 'B'),
+                    MockOrganism(2, 'C')]
+
+    def test_size(self):
+        self.assertEqual(len(wright_fisher(self.pop, .5)), 3)
+        self.assertEqual(
+            len(wright_fisher(self.pop, .5, desired_number_of_orgs=7)), 7)
+        self.assertEqual(
+            wright_fisher(self.pop, .5, desired_number_of_orgs=0), [])
+
+    def test_mutation_rate(self):
+        new_pop = wright_fisher(self.pop, -1, desired_number_of_orgs=20)
+        for org in new_pop:
+            self.assertIn(org, self.pop)
+        new_pop = wright_fisher(self.pop, 1, desired_number_of_orgs=20)
+        for org in new_pop:
+            self.assertEqual(org.identifier[-1], "'")
+
+    def test_counts(self):
+        counts = {self.pop[0]: 5, self.pop[1]: 1}
+        next_counts = wright_fisher_counts(counts, -1, 10)
+        self.assertEqual(sum(count for _, count in next_counts), 10)
+        for org, _ in next_counts:
+            self.assertIn(org, counts)
+
+    def test_only_fit_reproduce(self):
+        pop = [MockOrganism(0, 'A'), MockOrganism(1, 'B')]
+        new_pop = wright_fisher(pop, -1, desired_number_of_orgs=10)
+        self.assertEqual(new_pop, [pop[1]] * 10)
+
+    def test_empty(self):
+        with self.assertRaises(ValueError):
+            wright_fisher([], .5, desired_number_of_orgs=3)